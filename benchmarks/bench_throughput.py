@@ -0,0 +1,100 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+pytest-benchmark scenarios of :mod:`benchmarks.throughput`, run against a
+:class:`benchmarks.coordinator.FakeCoordinator`.
+
+The file is not collected with the tests, run it explicitly: ::
+
+    $ pytest benchmarks/bench_throughput.py --benchmark-autosave
+    $ pytest benchmarks/bench_throughput.py --benchmark-compare --benchmark-compare-fail=mean:10%
+
+The rows per second, CPU per row and peak memory are added to the
+``extra_info`` of the benchmarks.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import pytest
+
+from benchmarks.coordinator import FakeCoordinator
+from benchmarks.throughput import METHODS, measure, read_first_row, read_rows
+
+pytest.importorskip("pytest_benchmark")
+
+
+ROWS = 50000
+PAGE_ROWS = 1000
+
+
+@pytest.fixture(scope="module")
+def coordinator():
+    with FakeCoordinator(rows=ROWS, page_rows=PAGE_ROWS) as coordinator:
+        yield coordinator
+
+
+@pytest.fixture(scope="module")
+def typed_coordinator():
+    columns = ["bigint", "integer", "double", "boolean", "varchar", "date", "timestamp", "decimal"]
+    with FakeCoordinator(rows=ROWS, page_rows=PAGE_ROWS, columns=columns) as coordinator:
+        yield coordinator
+
+
+@pytest.fixture(scope="module")
+def flaky_coordinator():
+    with FakeCoordinator(rows=ROWS, page_rows=PAGE_ROWS, latency=0.001, jitter=0.002, error_rate=0.02) as coordinator:
+        yield coordinator
+
+
+def _add_metrics(benchmark, coordinator, method, **kwargs):
+    metrics = measure(coordinator, method, **kwargs)
+    assert metrics["rows"] == ROWS
+    benchmark.extra_info.update(metrics)
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_rows_per_second(benchmark, coordinator, method):
+    rows = benchmark.pedantic(read_rows, args=(coordinator, method), rounds=5, warmup_rounds=1)
+    assert rows == ROWS
+    _add_metrics(benchmark, coordinator, method)
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_rows_per_second_stream_rows(benchmark, coordinator, method):
+    rows = benchmark.pedantic(
+        read_rows, args=(coordinator, method), kwargs={"stream_rows": True}, rounds=5, warmup_rounds=1
+    )
+    assert rows == ROWS
+    _add_metrics(benchmark, coordinator, method, stream_rows=True)
+
+
+@pytest.mark.parametrize("method", ["fetchmany", "result"])
+def test_rows_per_second_python_types(benchmark, typed_coordinator, method):
+    kwargs = {"experimental_python_types": True}
+    rows = benchmark.pedantic(read_rows, args=(typed_coordinator, method), kwargs=kwargs, rounds=3, warmup_rounds=1)
+    assert rows == ROWS
+    _add_metrics(benchmark, typed_coordinator, method, **kwargs)
+
+
+@pytest.mark.parametrize("stream_rows", [False, True])
+def test_time_to_first_row(benchmark, coordinator, stream_rows):
+    row = benchmark.pedantic(
+        read_first_row, args=(coordinator,), kwargs={"stream_rows": stream_rows}, rounds=20, warmup_rounds=1
+    )
+    assert row is not None
+
+
+def test_rows_per_second_with_latency_and_errors(benchmark, flaky_coordinator):
+    rows = benchmark.pedantic(read_rows, args=(flaky_coordinator, "fetchmany"), rounds=3)
+    assert rows == ROWS
+    assert flaky_coordinator.errors > 0
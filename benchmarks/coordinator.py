@@ -0,0 +1,291 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+In-process HTTP server answering statements like a coordinator, to measure
+the client end to end without a Trino cluster.
+
+Every statement returns the same result: ``rows`` rows of the given column
+types, split into pages of ``page_rows`` rows that are followed through
+``nextUri``. The responses can be delayed, stalled or fail with a 503 error.
+The bodies of the pages are encoded once, so that serving them costs little
+compared to the client. ::
+
+    with FakeCoordinator(rows=100000, page_rows=1000, columns=["bigint", "varchar"]) as coordinator:
+        conn = trino.dbapi.connect(host=coordinator.host, port=coordinator.port, user="bench")
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import datetime
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+
+STATEMENT_PATH = "/v1/statement"
+EXECUTING_PATH = "/v1/statement/executing/"
+QUERY_PATH = "/v1/query/"
+
+
+def _signature(raw_type, *arguments):
+    return {
+        "rawType": raw_type,
+        "arguments": [{"kind": "LONG", "value": value} for value in arguments],
+    }
+
+
+def _date(rng, width):
+    return (datetime.date(1992, 1, 1) + datetime.timedelta(days=rng.randint(0, 2500))).isoformat()
+
+
+def _timestamp(rng, width):
+    return "{} {:02d}:{:02d}:{:02d}.{:03d}".format(
+        _date(rng, width), rng.randint(0, 23), rng.randint(0, 59), rng.randint(0, 59), rng.randint(0, 999)
+    )
+
+
+def _varchar(rng, width):
+    return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz ") for _ in range(width))
+
+
+# type of a column: (type, signature, function returning a random value of a
+# given width)
+COLUMN_TYPES = {
+    "bigint": ("bigint", _signature("bigint"), lambda rng, width: rng.randint(0, 2 ** 62)),
+    "integer": ("integer", _signature("integer"), lambda rng, width: rng.randint(0, 2 ** 30)),
+    "double": ("double", _signature("double"), lambda rng, width: rng.uniform(0, 1e6)),
+    "boolean": ("boolean", _signature("boolean"), lambda rng, width: rng.random() < 0.5),
+    "varchar": ("varchar", _signature("varchar", 2147483647), _varchar),
+    "date": ("date", _signature("date"), _date),
+    "timestamp": ("timestamp(3)", _signature("timestamp", 3), _timestamp),
+    "decimal": (
+        "decimal(18, 2)",
+        _signature("decimal", 18, 2),
+        lambda rng, width: "{:.2f}".format(rng.uniform(0, 1e9)),
+    ),
+}
+
+
+def make_columns(types):
+    columns = []
+    for index, name in enumerate(types):
+        column_type, signature, _ = COLUMN_TYPES[name]
+        columns.append({"name": "c{}_{}".format(index, name), "type": column_type, "typeSignature": signature})
+    return columns
+
+
+def make_rows(types, row_count, width, seed=0):
+    rng = random.Random(seed)
+    generators = [COLUMN_TYPES[name][2] for name in types]
+    return [[generate(rng, width) for generate in generators] for _ in range(row_count)]
+
+
+class FakeCoordinator(ThreadingMixIn, HTTPServer):
+    """
+    Fake coordinator listening on a free port of the local host.
+
+    :param rows: rows of the result of each statement.
+    :param page_rows: rows per page. The response to the statement itself
+                      has no rows, like that of a query that is queued.
+    :param columns: types of the columns, keys of :data:`COLUMN_TYPES`.
+    :param width: length of the ``varchar`` values.
+    :param latency: seconds before answering each request.
+    :param jitter: maximum seconds added at random to ``latency``.
+    :param error_rate: probability of answering the fetch of a page with a
+                       503 error. The page can be fetched again.
+    :param stall_probability: probability of delaying the fetch of a page by
+                              ``stall`` seconds.
+    :param seed: of the values and of the random delays and errors.
+
+    ``statements``, ``pages``, ``errors``, ``stalls`` and ``cancelled``
+    count the requests served.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        rows=10000,
+        page_rows=1000,
+        columns=("bigint", "varchar", "double", "date"),
+        width=32,
+        latency=0.0,
+        jitter=0.0,
+        error_rate=0.0,
+        stall_probability=0.0,
+        stall=0.5,
+        seed=0,
+    ):
+        HTTPServer.__init__(self, ("127.0.0.1", 0), FakeCoordinatorHandler)
+        if page_rows < 1:
+            raise ValueError("page_rows must be at least 1")
+        self.row_count = rows
+        self.page_rows = page_rows
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.stall_probability = stall_probability
+        self.stall = stall
+        self.columns = make_columns(columns)
+        self.page_count = (rows + page_rows - 1) // page_rows
+        self.statements = 0
+        self.pages = 0
+        self.errors = 0
+        self.stalls = 0
+        self.cancelled = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None  # type: threading.Thread
+        full_page = make_rows(columns, min(rows, page_rows), width, seed)
+        self._data = json.dumps(full_page)
+        last_rows = rows - (self.page_count - 1) * page_rows
+        self._last_data = json.dumps(full_page[:last_rows])
+        self._columns = json.dumps(self.columns)
+
+    @property
+    def host(self):
+        return self.server_address[0]
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    @property
+    def url(self):
+        return "http://{}:{}".format(self.host, self.port)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-coordinator")
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def handle_error(self, request, client_address):
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            # the client closed a connection it no longer needed
+            return
+        HTTPServer.handle_error(self, request, client_address)
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def new_query(self):
+        with self._lock:
+            self.statements += 1
+            return "20210101_000000_{:05d}_bench".format(self.statements)
+
+    def delay(self, fetch):
+        """Return the seconds to wait before answering a request, and whether
+        to fail it"""
+        with self._lock:
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+            if not fetch:
+                return delay, False
+            if self.stall_probability and self._random.random() < self.stall_probability:
+                self.stalls += 1
+                delay += self.stall
+            failed = bool(self.error_rate) and self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        return delay, failed
+
+    def page(self, query_id, token):
+        """Return the body of the page ``token`` of a query, 0 being the
+        response to the statement"""
+        members = [
+            '"id": "{}"'.format(query_id),
+            '"infoUri": "{}/ui/query.html?{}"'.format(self.url, query_id),
+        ]
+        if token < self.page_count:
+            members.append('"nextUri": "{}{}{}/{}"'.format(self.url, EXECUTING_PATH, query_id, token + 1))
+        if token == 0:
+            state = "QUEUED" if self.page_count else "FINISHED"
+        else:
+            members.append('"columns": ' + self._columns)
+            members.append('"data": ' + (self._data if token < self.page_count else self._last_data))
+            state = "RUNNING" if token < self.page_count else "FINISHED"
+        processed = min(token * self.page_rows, self.row_count)
+        members.append(
+            '"stats": {{"state": "{}", "queued": {}, "scheduled": {}, "progressPercentage": {:.1f}, '
+            '"processedRows": {}, "processedBytes": {}, "cpuTimeMillis": {}, "queuedTimeMillis": 1}}'.format(
+                state,
+                "true" if token == 0 else "false",
+                "false" if token == 0 else "true",
+                100.0 * token / max(self.page_count, 1),
+                processed,
+                processed * 100,
+                token,
+            )
+        )
+        return ("{" + ", ".join(members) + "}").encode("utf-8")
+
+
+class FakeCoordinatorHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if not self.path.startswith(STATEMENT_PATH):
+            return self._send(404, b"")
+        delay, _ = self.server.delay(fetch=False)
+        if delay:
+            time.sleep(delay)
+        self._send(200, self.server.page(self.server.new_query(), 0))
+
+    def do_GET(self):
+        if not self.path.startswith(EXECUTING_PATH):
+            return self._send(404, b"")
+        query_id, token = self.path[len(EXECUTING_PATH):].split("/")
+        delay, failed = self.server.delay(fetch=True)
+        if delay:
+            time.sleep(delay)
+        if failed:
+            return self._send(503, b"")
+        self.server._count("pages")
+        self._send(200, self.server.page(query_id, int(token)))
+
+    def do_DELETE(self):
+        if self.path.startswith(QUERY_PATH):
+            self.server._count("cancelled")
+        self._send(204, b"")
+
+    def _send(self, status, body):
+        try:
+            self.send_response(status)
+            if body:
+                self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # the client closed the connection, e.g. of a hedged request
+            pass
+
+    def log_message(self, *args):
+        pass
@@ -0,0 +1,99 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Synthetic query results shaped like the responses of a coordinator"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import json
+import random
+
+
+QUERY_ID = "20210101_000000_00000_bench"
+
+
+def _column(name, raw_type, *arguments):
+    return {
+        "name": name,
+        "type": raw_type,
+        "typeSignature": {
+            "rawType": raw_type,
+            "arguments": [{"kind": "LONG", "value": value} for value in arguments],
+        },
+    }
+
+
+COLUMNS = [
+    _column("orderkey", "bigint"),
+    _column("custkey", "bigint"),
+    _column("orderstatus", "varchar", 1),
+    _column("totalprice", "double"),
+    _column("orderdate", "date"),
+    _column("orderpriority", "varchar", 15),
+    _column("shippriority", "integer"),
+    _column("comment", "varchar", 79),
+]
+
+
+def make_row(index, rng):
+    return [
+        index,
+        rng.randint(1, 150000),
+        rng.choice("OFP"),
+        round(rng.uniform(800.0, 600000.0), 2),
+        "199{}-{:02d}-{:02d}".format(rng.randint(2, 8), rng.randint(1, 12), rng.randint(1, 28)),
+        rng.choice(["1-URGENT", "2-HIGH", "3-MEDIUM", "4-NOT SPECIFIED", "5-LOW"]),
+        0,
+        "".join(rng.choice("abcdefghijklmnopqrstuvwxyz ") for _ in range(rng.randint(20, 79))),
+    ]
+
+
+def make_rows(row_count, seed=0):
+    rng = random.Random(seed)
+    return [make_row(index, rng) for index in range(row_count)]
+
+
+def make_status(rows, columns=COLUMNS, next_uri=None):
+    status = {
+        "id": QUERY_ID,
+        "infoUri": "http://coordinator:8080/ui/query.html?" + QUERY_ID,
+        "columns": columns,
+        "data": rows,
+        "stats": {
+            "state": "RUNNING",
+            "queued": False,
+            "scheduled": True,
+            "nodes": 1,
+            "totalSplits": 10,
+            "queuedSplits": 0,
+            "runningSplits": 1,
+            "completedSplits": 9,
+            "cpuTimeMillis": 100,
+            "wallTimeMillis": 100,
+            "queuedTimeMillis": 1,
+            "elapsedTimeMillis": 100,
+            "processedRows": len(rows),
+            "processedBytes": 1000,
+            "peakMemoryBytes": 1000,
+        },
+        "warnings": [],
+    }
+    if next_uri is not None:
+        status["nextUri"] = next_uri
+    return status
+
+
+def make_page(row_count, seed=0):
+    """Return the JSON body of a page of ``row_count`` rows as ``bytes``"""
+    return json.dumps(
+        make_status(make_rows(row_count, seed), next_uri="http://coordinator:8080/v1/statement/1")
+    ).encode("utf-8")
@@ -0,0 +1,82 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compare the latency of the queries with and without hedged fetches of the
+pages, against a :class:`benchmarks.coordinator.FakeCoordinator` that
+stalls some of the requests.
+
+Usage: ::
+
+    $ python -m benchmarks.hedging --queries 50 --pages 20 --stall-probability 0.02
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import time
+
+import trino.dbapi
+from benchmarks.coordinator import FakeCoordinator
+from trino.hedging import HedgingPolicy
+
+
+def run_queries(coordinator, queries, hedging):
+    conn = trino.dbapi.connect(
+        host="127.0.0.1", port=coordinator.server_address[1], user="bench", hedging=hedging
+    )
+    latencies = []
+    for _ in range(queries):
+        start = time.time()
+        cur = conn.cursor()
+        cur.execute("SELECT * FROM bench")
+        cur.fetchall()
+        latencies.append(time.time() - start)
+    return sorted(latencies)
+
+
+def percentile(latencies, percent):
+    return latencies[min(len(latencies) - 1, int(len(latencies) * percent / 100.0))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--queries", type=int, default=50, help="queries run per mode")
+    parser.add_argument("--pages", type=int, default=20, help="pages per query")
+    parser.add_argument("--rows", type=int, default=100, help="rows per page")
+    parser.add_argument("--stall-probability", type=float, default=0.02, help="probability of a stalled fetch")
+    parser.add_argument("--stall", type=float, default=0.5, help="seconds of a stall")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for name in ("no hedging", "hedging"):
+        coordinator = FakeCoordinator(
+            rows=args.pages * args.rows,
+            page_rows=args.rows,
+            columns=["bigint", "varchar"],
+            width=8,
+            stall_probability=args.stall_probability,
+            stall=args.stall,
+            seed=args.seed,
+        )
+        hedging = HedgingPolicy() if name == "hedging" else None
+        with coordinator:
+            latencies = run_queries(coordinator, args.queries, hedging)
+        print("{:<12} p50 {:7.3f}s p99 {:7.3f}s max {:7.3f}s total {:7.2f}s".format(
+            name, percentile(latencies, 50), percentile(latencies, 99), latencies[-1], sum(latencies)
+        ))
+        if hedging is not None:
+            print("{:<12} {}".format("", hedging.metrics))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Measure how many pages per second ``TrinoRequest.process`` decodes with each
+JSON decoder of :mod:`trino.jsonlib` that is installed, compared to
+``requests.Response.json``.
+
+Usage: ::
+
+    $ python -m benchmarks.json_decoder --rows 10000 --pages 50
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import timeit
+
+import requests
+
+from benchmarks.data import make_page
+from trino import jsonlib
+from trino.client import TrinoRequest
+
+
+def make_response(content):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = content
+    return response
+
+
+def measure(request, content, pages):
+    # a new response per page as requests caches the decoded text
+    responses = [make_response(content) for _ in range(pages)]
+    responses.reverse()
+    seconds = timeit.timeit(lambda: request.process(responses.pop()), number=pages)
+    return pages / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=10000, help="rows per page")
+    parser.add_argument("--pages", type=int, default=50, help="pages to decode")
+    args = parser.parse_args()
+
+    content = make_page(args.rows)
+    print("page of {} rows, {:.1f} MB".format(args.rows, len(content) / 1e6))
+
+    decoders = [("requests.Response.json", None)]
+    for name in jsonlib.DECODERS:
+        try:
+            decoders.append((name, jsonlib.get_decoder(name)))
+        except RuntimeError:
+            print("{:<24} not installed".format(name))
+
+    for name, decoder in decoders:
+        request = TrinoRequest("coordinator", 8080, "bench", json_decoder=decoder)
+        pages_per_second = measure(request, content, args.pages)
+        print("{:<24} {:8.1f} pages/s {:8.1f} MB/s".format(
+            name, pages_per_second, pages_per_second * len(content) / 1e6
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Measure the rows per second and CPU per row of reading the results of a
+recording made with :class:`trino.recording.RecordingSession`, replayed by a
+:class:`trino.recording.ReplaySession` without a cluster.
+
+The statements of the recording are executed again in their order and all
+their rows are fetched. Without a recording, one is made first against a
+:class:`benchmarks.coordinator.FakeCoordinator`.
+
+Usage: ::
+
+    $ python -m benchmarks.replay traffic.jsonl.gz --rounds 5 --stream-rows
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import time
+
+import trino.dbapi
+from benchmarks.coordinator import FakeCoordinator
+from benchmarks.throughput import thread_time
+from trino.recording import RecordingSession, ReplaySession, load
+
+
+def record_fake_coordinator(rows, page_rows):
+    session = RecordingSession()
+    with FakeCoordinator(rows=rows, page_rows=page_rows) as coordinator:
+        conn = trino.dbapi.connect(
+            host=coordinator.host, port=coordinator.port, user="bench", http_session=session
+        )
+        cur = conn.cursor()
+        cur.execute("SELECT * FROM bench")
+        cur.fetchall()
+    return session.exchanges
+
+
+def replay(session, statements, **kwargs):
+    """Execute ``statements`` against ``session`` and return the number of
+    rows fetched"""
+    session.reset()
+    conn = trino.dbapi.connect(host="replay", user="bench", http_session=session, **kwargs)
+    count = 0
+    for statement in statements:
+        cur = conn.cursor()
+        cur.execute(statement)
+        count += len(cur.fetchall())
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("path", nargs="?", help="recording, made against a fake coordinator if omitted")
+    parser.add_argument("--rounds", type=int, default=5, help="replays of the recording")
+    parser.add_argument("--speed", type=float, help="replay at the recorded timing divided by this factor")
+    parser.add_argument("--rows", type=int, default=100000, help="rows of the fake coordinator")
+    parser.add_argument("--page-rows", type=int, default=1000, help="rows per page of the fake coordinator")
+    parser.add_argument("--stream-rows", action="store_true", help="parse the rows as they are received")
+    parser.add_argument("--python-types", action="store_true", help="convert the values into Python types")
+    args = parser.parse_args()
+
+    if args.path:
+        exchanges = load(args.path)
+    else:
+        exchanges = record_fake_coordinator(args.rows, args.page_rows)
+    statements = [exchange.data for exchange in exchanges if exchange.method == "POST"]
+    size = sum(len(exchange.body) for exchange in exchanges)
+    print("{} statements, {} exchanges, {:.1f} MB".format(len(statements), len(exchanges), size / 1e6))
+
+    session = ReplaySession(exchanges, speed=args.speed)
+    for _ in range(args.rounds):
+        start = time.time()
+        cpu_start = thread_time()
+        rows = replay(
+            session, statements, stream_rows=args.stream_rows, experimental_python_types=args.python_types
+        )
+        cpu = thread_time() - cpu_start
+        elapsed = time.time() - start
+        print("{} rows in {:.3f}s, {:.0f} rows/s, {:.2f} us CPU/row".format(
+            rows, elapsed, rows / elapsed, cpu / max(rows, 1) * 1e6
+        ))
+
+
+if __name__ == "__main__":
+    main()
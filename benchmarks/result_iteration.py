@@ -0,0 +1,121 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compare the rows per second iterated and fetched from a
+:class:`trino.client.TrinoResult` with the former row by row implementation.
+
+No request is sent: the pages are returned by a fake query.
+
+Usage: ::
+
+    $ python -m benchmarks.result_iteration --rows 1000000 --page-rows 5000
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import itertools
+import logging
+import time
+
+from benchmarks.data import make_rows
+from trino.client import TrinoResult
+
+
+logger = logging.getLogger("benchmarks.result_iteration")
+
+
+class PagedQuery(object):
+    """Fake :class:`trino.client.TrinoQuery` returning one page per fetch"""
+
+    prefetch_pages = 0
+
+    def __init__(self, pages):
+        self._pages = list(pages)
+
+    def fetch(self):
+        return self._pages.pop(0)
+
+    def is_finished(self):
+        return not self._pages
+
+    def map_rows(self, rows):
+        return rows
+
+
+def make_result(pages):
+    return TrinoResult(PagedQuery(pages[1:]), pages[0])
+
+
+class RowByRowResult(TrinoResult):
+    """Iteration of the result before rows were counted per page"""
+
+    def __iter__(self):
+        for rows in self._iter_all_pages():
+            rows = self._query.map_rows(rows)
+            for row in rows:
+                self._rownumber += 1
+                logger.debug("row %s", row)
+                yield row
+
+
+def fetchmany_row_by_row(iterator, size):
+    # Cursor.fetchmany() calling fetchone() for each row
+    result = []
+    for _ in range(size):
+        try:
+            row = next(iterator)
+        except StopIteration:
+            row = None
+        if row is None:
+            break
+        result.append(row)
+    return result
+
+
+def fetchmany_in_bulk(iterator, size):
+    return list(itertools.islice(iterator, size))
+
+
+def drain(fetchmany, iterator, size):
+    while fetchmany(iterator, size):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=1000000, help="rows of the result")
+    parser.add_argument("--page-rows", type=int, default=5000, help="rows per page")
+    parser.add_argument("--arraysize", type=int, default=1000, help="rows per fetchmany() call")
+    args = parser.parse_args()
+
+    rows = make_rows(args.page_rows)
+    pages = [rows] * (args.rows // args.page_rows)
+    row_count = len(pages) * args.page_rows
+    candidates = [
+        ("iterate, row by row", lambda: list(RowByRowResult(PagedQuery(pages[1:]), pages[0]))),
+        ("iterate, per page", lambda: list(make_result(pages))),
+        ("fetchmany, row by row", lambda: drain(
+            fetchmany_row_by_row, iter(RowByRowResult(PagedQuery(pages[1:]), pages[0])), args.arraysize
+        )),
+        ("fetchmany, in bulk", lambda: drain(fetchmany_in_bulk, iter(make_result(pages)), args.arraysize)),
+    ]
+    for name, run in candidates:
+        start = time.time()
+        run()
+        elapsed = time.time() - start
+        print("{:<24} {:12.0f} rows/s".format(name, row_count / elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compare the rows per second converted by :class:`trino.mapper.RowMapper`
+with a naive conversion that dispatches on the type of each value.
+
+Usage: ::
+
+    $ python -m benchmarks.row_mapper --rows 100000
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import copy
+import datetime
+import decimal
+import random
+import time
+
+from trino import mapper
+
+
+def _column(name, raw_type, *arguments):
+    return {
+        "name": name,
+        "type": raw_type,
+        "typeSignature": {
+            "rawType": raw_type,
+            "arguments": [{"kind": "LONG", "value": value} for value in arguments],
+        },
+    }
+
+
+COLUMNS = [
+    _column("id", "bigint"),
+    _column("name", "varchar", 20),
+    _column("price", "decimal", 12, 2),
+    _column("ratio", "double"),
+    _column("day", "date"),
+    _column("created", "timestamp", 3),
+]
+
+
+def make_rows(row_count, seed=0):
+    rng = random.Random(seed)
+    return [
+        [
+            index,
+            "name-{}".format(index),
+            "{:.2f}".format(rng.uniform(0, 10000)),
+            rng.random(),
+            "2021-{:02d}-{:02d}".format(rng.randint(1, 12), rng.randint(1, 28)),
+            "2021-{:02d}-{:02d} {:02d}:{:02d}:{:02d}.{:03d}".format(
+                rng.randint(1, 12), rng.randint(1, 28), rng.randint(0, 23),
+                rng.randint(0, 59), rng.randint(0, 59), rng.randint(0, 999),
+            ),
+        ]
+        for index in range(row_count)
+    ]
+
+
+def convert_value(raw_type, value):
+    if value is None:
+        return None
+    if raw_type in ("real", "double"):
+        return float(value)
+    if raw_type == "decimal":
+        return decimal.Decimal(value)
+    if raw_type == "date":
+        return datetime.datetime.strptime(value, "%Y-%m-%d").date()
+    if raw_type == "timestamp":
+        return datetime.datetime.strptime(value, "%Y-%m-%d %H:%M:%S.%f")
+    return value
+
+
+def naive_map_rows(columns, rows):
+    return [
+        [
+            convert_value(column["typeSignature"]["rawType"], value)
+            for column, value in zip(columns, row)
+        ]
+        for row in rows
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=100000, help="rows to convert")
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    candidates = [
+        ("per value dispatch", lambda rows: naive_map_rows(COLUMNS, rows)),
+        ("RowMapper", lambda rows: mapper.create_row_mapper(COLUMNS).map_rows(rows)),
+    ]
+    for name, map_rows in candidates:
+        # the row mapper converts in place
+        page = copy.deepcopy(rows)
+        start = time.time()
+        map_rows(page)
+        elapsed = time.time() - start
+        print("{:<20} {:10.0f} rows/s".format(name, args.rows / elapsed))
+
+
+if __name__ == "__main__":
+    main()
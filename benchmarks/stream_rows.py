@@ -0,0 +1,78 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compare the time to the first row, the time to the last row and the peak
+memory of processing one large page with and without ``stream_rows``.
+
+Usage: ::
+
+    $ python -m benchmarks.stream_rows --rows 200000
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import io
+import time
+import tracemalloc
+
+import requests
+
+from benchmarks.data import make_page
+from trino.client import TrinoRequest
+
+
+def make_response(content):
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = io.BytesIO(content)
+    return response
+
+
+def read_rows(content, stream_rows):
+    request = TrinoRequest("coordinator", 8080, "bench", stream_rows=stream_rows)
+    start = time.time()
+    rows = iter(request.process(make_response(content)).rows)
+    next(rows)
+    first_row = time.time() - start
+    for _ in rows:
+        pass
+    return first_row, time.time() - start
+
+
+def measure(content, stream_rows):
+    first_row, last_row = read_rows(content, stream_rows)
+    # tracing allocations slows down the parsing, measure memory separately
+    tracemalloc.start()
+    read_rows(content, stream_rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return first_row, last_row, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=200000, help="rows of the page")
+    args = parser.parse_args()
+
+    content = make_page(args.rows)
+    print("page of {} rows, {:.1f} MB".format(args.rows, len(content) / 1e6))
+    for stream_rows in (False, True):
+        first_row, last_row, peak = measure(content, stream_rows)
+        print("stream_rows={:<5} first row {:7.3f}s last row {:7.3f}s peak memory {:7.1f} MB".format(
+            str(stream_rows), first_row, last_row, peak / 1e6
+        ))
+
+
+if __name__ == "__main__":
+    main()
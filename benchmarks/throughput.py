@@ -0,0 +1,183 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Measure the rows per second, time to the first row, CPU per row and peak
+memory of reading a result with ``fetchone``, ``fetchmany``, ``fetchall``
+and a raw :class:`trino.client.TrinoResult`, against a
+:class:`benchmarks.coordinator.FakeCoordinator`.
+
+The CPU time is that of the thread reading the rows, and the peak memory
+that of the Python allocations of the whole process, fake coordinator
+included.
+
+Usage: ::
+
+    $ python -m benchmarks.throughput --rows 200000 --page-rows 2000 --columns bigint varchar double
+
+The same scenarios run with pytest-benchmark to compare runs: ::
+
+    $ pytest benchmarks/bench_throughput.py --benchmark-autosave
+    $ pytest benchmarks/bench_throughput.py --benchmark-compare --benchmark-compare-fail=mean:10%
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import time
+import tracemalloc
+
+import trino.client
+import trino.dbapi
+from benchmarks.coordinator import COLUMN_TYPES, FakeCoordinator
+
+
+METHODS = ("fetchone", "fetchmany", "fetchall", "result")
+
+# CPU time of the current thread, not available before Python 3.7
+thread_time = getattr(time, "thread_time", time.process_time)
+
+
+def read_rows(coordinator, method, arraysize=1000, on_first_row=None, experimental_python_types=False, **kwargs):
+    """Run a statement against ``coordinator`` and read all its rows with
+    ``method``. ``kwargs`` are given to the connection or to the request.
+    Return the number of rows read."""
+    on_first_row = on_first_row or (lambda: None)
+    if method == "result":
+        request = trino.client.TrinoRequest(coordinator.host, coordinator.port, "bench", **kwargs)
+        query = trino.client.TrinoQuery(request, "SELECT 1", experimental_python_types=experimental_python_types)
+        count = 0
+        for count, _ in enumerate(query.execute(), start=1):
+            if count == 1:
+                on_first_row()
+        return count
+
+    conn = trino.dbapi.connect(
+        host=coordinator.host,
+        port=coordinator.port,
+        user="bench",
+        experimental_python_types=experimental_python_types,
+        **kwargs
+    )
+    cur = conn.cursor()
+    cur.arraysize = arraysize
+    cur.execute("SELECT 1")
+    if method == "fetchone":
+        count = 0
+        row = cur.fetchone()
+        if row is not None:
+            on_first_row()
+        while row is not None:
+            count += 1
+            row = cur.fetchone()
+        return count
+    if method == "fetchmany":
+        rows = cur.fetchmany()
+        count = len(rows)
+        if rows:
+            on_first_row()
+        while rows:
+            rows = cur.fetchmany()
+            count += len(rows)
+        return count
+    if method == "fetchall":
+        count = len(cur.fetchall())
+        if count:
+            on_first_row()
+        return count
+    raise ValueError("method must be one of {}".format(", ".join(METHODS)))
+
+
+def read_first_row(coordinator, experimental_python_types=False, **kwargs):
+    """Run a statement against ``coordinator``, return its first row and
+    cancel it"""
+    conn = trino.dbapi.connect(
+        host=coordinator.host,
+        port=coordinator.port,
+        user="bench",
+        experimental_python_types=experimental_python_types,
+        **kwargs
+    )
+    cur = conn.cursor()
+    cur.execute("SELECT 1")
+    row = cur.fetchone()
+    cur.cancel()
+    return row
+
+
+def measure(coordinator, method, **kwargs):
+    """Return the rows per second, time to the first row, CPU per row and
+    peak memory of reading the result with ``method``"""
+    first_row = []
+    start = time.time()
+    cpu_start = thread_time()
+    rows = read_rows(coordinator, method, on_first_row=lambda: first_row.append(time.time() - start), **kwargs)
+    cpu = thread_time() - cpu_start
+    elapsed = time.time() - start
+    # tracing allocations slows down the client, measure memory separately
+    tracemalloc.start()
+    try:
+        read_rows(coordinator, method, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "rows": rows,
+        "rows_per_second": rows / elapsed,
+        "time_to_first_row": first_row[0] if first_row else None,
+        "cpu_per_row": cpu / rows if rows else None,
+        "peak_memory": peak,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=100000, help="rows of the result")
+    parser.add_argument("--page-rows", type=int, default=1000, help="rows per page")
+    parser.add_argument("--columns", nargs="+", default=["bigint", "varchar", "double", "date"],
+                        choices=sorted(COLUMN_TYPES), help="types of the columns")
+    parser.add_argument("--width", type=int, default=32, help="length of the varchar values")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before each response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="maximum seconds added to the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of a 503 response")
+    parser.add_argument("--stream-rows", action="store_true", help="parse the rows as they are received")
+    parser.add_argument("--python-types", action="store_true", help="convert the values into Python types")
+    args = parser.parse_args()
+
+    coordinator = FakeCoordinator(
+        rows=args.rows,
+        page_rows=args.page_rows,
+        columns=args.columns,
+        width=args.width,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+    )
+    with coordinator:
+        print("{:<10} {:>12} {:>14} {:>14} {:>12}".format(
+            "method", "rows/s", "first row (s)", "CPU/row (us)", "peak (MB)"
+        ))
+        for method in METHODS:
+            metrics = measure(
+                coordinator, method, stream_rows=args.stream_rows, experimental_python_types=args.python_types
+            )
+            print("{:<10} {:12.0f} {:14.4f} {:14.2f} {:12.1f}".format(
+                method,
+                metrics["rows_per_second"],
+                metrics["time_to_first_row"],
+                metrics["cpu_per_row"] * 1e6,
+                metrics["peak_memory"] / 1e6,
+            ))
+
+
+if __name__ == "__main__":
+    main()
@@ -29,9 +29,19 @@ with open("trino/__init__.py", "rb") as f:
 
 kerberos_require = ["requests_kerberos"]
 
+async_require = ['aiohttp; python_version >= "3.6"']
+
+numpy_require = ["numpy"]
+
+arrow_require = ["pyarrow"]
+
+zstd_require = ["zstandard"]
+
 all_require = [kerberos_require]
 
-tests_require = all_require + ["httpretty", "pytest", "pytest-runner", "mock", "pytz"]
+tests_require = all_require + async_require + numpy_require + arrow_require + zstd_require + ["httpretty", "pytest", "pytest-runner", "mock", "pytz"]
+
+benchmark_require = ["pytest", "pytest-benchmark"]
 
 py27_require = ["ipaddress", "typing"]
 
@@ -71,8 +81,13 @@ setup(
     install_requires=["click", "requests", "six"],
     extras_require={
         "all": all_require,
+        "arrow": arrow_require,
+        "async": async_require,
+        "benchmark": benchmark_require,
         "kerberos": kerberos_require,
+        "numpy": numpy_require,
         "tests": tests_require,
+        "zstd": zstd_require,
         ':python_version=="2.7"': py27_require,
     },
 )
@@ -0,0 +1,177 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import io
+import json
+import sys
+import threading
+
+import pytest
+import requests
+
+from trino import constants
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+
+# the asyncio client and its tests use the async/await syntax, and aiohttp
+# requires Python 3.6
+collect_ignore = []
+if sys.version_info < (3, 6):
+    collect_ignore.append("test_aio.py")
+
+
+def signature(raw_type, *arguments):
+    return {"rawType": raw_type, "arguments": list(arguments)}
+
+
+def column(name, raw_type, *arguments):
+    """Column of a query result, as sent by the coordinator"""
+    return {"name": name, "type": raw_type, "typeSignature": signature(raw_type, *arguments)}
+
+
+def long_argument(value):
+    return {"kind": "LONG", "value": value}
+
+
+def type_argument(raw_type, *arguments):
+    return {"kind": "TYPE", "value": signature(raw_type, *arguments)}
+
+
+def field_argument(name, raw_type, kind="NAMED_TYPE"):
+    return {"kind": kind, "value": {"fieldName": {"name": name}, "typeSignature": signature(raw_type)}}
+
+
+class FakeQuery(object):
+    """Query with the given columns, for the conversions of results"""
+
+    def __init__(self, columns):
+        self.columns = columns
+
+
+def make_page(number, rows=None, last=False, query_id="query", **extra):
+    """Response of the coordinator to the request ``number`` of a query on a
+    ``bigint`` column ``x``, the page with ``rows`` when given. The last page
+    has no ``nextUri``."""
+    page = {
+        "id": query_id,
+        "infoUri": "http://coordinator:8080/ui/query.html?" + query_id,
+        "columns": [column("x", "bigint")],
+        "stats": {"state": "FINISHED" if last else "RUNNING", "queuedTimeMillis": 20},
+    }
+    if rows is not None:
+        page["data"] = [[row] for row in rows]
+    if not last:
+        page["nextUri"] = "http://coordinator:8080/v1/statement/executing/{}/{}".format(query_id, number + 1)
+    page.update(extra)
+    return page
+
+
+def make_response(status_code, body=None):
+    """``requests.Response`` with ``body`` encoded in JSON"""
+    response = requests.Response()
+    response.status_code = status_code
+    content = json.dumps(body).encode("utf-8") if body is not None else b""
+    response.headers["Content-Length"] = str(len(content))
+    response.raw = io.BytesIO(content)
+    return response
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    # the connections are kept alive by the sessions of the clients
+    daemon_threads = True
+
+
+class StatementHandler(BaseHTTPRequestHandler):
+    """
+    Answer statements like a coordinator, with a queued response to the
+    statement followed by one page. ``PREPARE`` and ``DEALLOCATE PREPARE``
+    statements return the headers of the prepared statements and the other
+    statements return ``[[1]]``.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        sql = self.rfile.read(int(self.headers["Content-Length"])).decode("utf-8")
+        server = self.server
+        with server.lock:
+            server.statements.append((sql, self.headers.get(constants.HEADER_PREPARED_STATEMENT)))
+            query_id = "query_{}".format(len(server.statements))
+            server.queries[query_id] = sql
+        self._send({
+            "id": query_id,
+            "infoUri": "http://127.0.0.1/ui/query.html?" + query_id,
+            "nextUri": "http://127.0.0.1:{}/v1/statement/executing/{}/1".format(server.server_port, query_id),
+            "stats": {"state": "QUEUED"},
+        })
+
+    def do_GET(self):
+        query_id = self.path.split("/")[-2]
+        sql = self.server.queries[query_id]
+        headers = {}
+        if sql.startswith("PREPARE "):
+            name, operation = sql[len("PREPARE "):].split(" FROM ", 1)
+            headers[constants.HEADER_ADDED_PREPARE] = "{}={}".format(name, operation)
+        elif sql.startswith("DEALLOCATE PREPARE "):
+            headers[constants.HEADER_DEALLOCATED_PREPARE] = sql[len("DEALLOCATE PREPARE "):]
+        self._send({
+            "id": query_id,
+            "infoUri": "http://127.0.0.1/ui/query.html?" + query_id,
+            "columns": [{"name": "x", "type": "bigint", "typeSignature": {"rawType": "bigint", "arguments": []}}],
+            "data": [[True]] if headers else [[1]],
+            "stats": {"state": "FINISHED"},
+        }, headers)
+
+    def do_DELETE(self):
+        self.send_response(204)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _send(self, body, headers=None):
+        content = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def statement_server():
+    """HTTP server answering statements, see :class:`StatementHandler`.
+    ``statements`` lists the SQL and ``X-Trino-Prepared-Statement`` header of
+    the statements received."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StatementHandler)
+    server.lock = threading.Lock()
+    server.statements = []
+    server.queries = {}
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
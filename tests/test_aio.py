@@ -0,0 +1,241 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web  # NOQA: E402
+
+from trino import constants  # NOQA: E402
+import trino.aio  # NOQA: E402
+import trino.exceptions  # NOQA: E402
+
+
+QUERY_ID = "20210101_000000_00000_async"
+
+COLUMNS = [
+    {
+        "name": "x",
+        "type": "integer",
+        "typeSignature": {"rawType": "integer", "arguments": []},
+    }
+]
+
+
+async def collect(result):
+    rows = []
+    async for row in result:
+        rows.append(row)
+    return rows
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class FakeCoordinator(object):
+    def __init__(self, pages, unavailable=0, set_session=None):
+        self.pages = pages
+        self.unavailable = unavailable
+        self.set_session = set_session
+        self.requests = []
+
+    def _status(self, request, token):
+        status = {
+            "id": QUERY_ID,
+            "infoUri": "http://coordinator/ui/query.html?" + QUERY_ID,
+            "stats": {"state": "RUNNING"},
+        }
+        if token < len(self.pages):
+            status["columns"] = COLUMNS
+            status["data"] = self.pages[token]
+        if token + 1 < len(self.pages):
+            status["nextUri"] = "http://{}/v1/statement/{}/{}".format(
+                request.host, QUERY_ID, token + 1
+            )
+        return status
+
+    async def post_statement(self, request):
+        self.requests.append(("POST", request.headers, await request.text()))
+        if self.unavailable:
+            self.unavailable -= 1
+            return web.Response(status=503)
+        headers = {constants.HEADER_SET_SESSION: self.set_session} if self.set_session else None
+        return web.json_response(self._status(request, 0), headers=headers)
+
+    async def get_statement(self, request):
+        self.requests.append(("GET", request.headers, None))
+        return web.json_response(self._status(request, int(request.match_info["token"])))
+
+    async def delete_query(self, request):
+        self.requests.append(("DELETE", request.headers, None))
+        return web.Response(status=204)
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_post("/v1/statement", self.post_statement)
+        app.router.add_get("/v1/statement/{id}/{token}", self.get_statement)
+        app.router.add_delete("/v1/query/{id}", self.delete_query)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self._runner.cleanup()
+
+
+def test_async_cursor_fetch():
+    async def scenario():
+        async with FakeCoordinator([[[1], [2]], [[3]], [[4]]]) as coordinator:
+            async with trino.aio.connect(
+                "127.0.0.1", coordinator.port, user="test", catalog="tpch"
+            ) as conn:
+                cur = conn.cursor()
+                await cur.execute("SELECT x FROM t")
+                assert await cur.fetchone() == [1]
+                assert await cur.fetchmany(2) == [[2], [3]]
+                assert await cur.fetchall() == [[4]]
+                assert await cur.fetchone() is None
+                assert cur.description[0][0] == "x"
+                assert cur.rowcount == -1
+                assert cur.progress().query_id == QUERY_ID
+        return coordinator.requests
+
+    requests = run(scenario())
+    method, headers, body = requests[0]
+    assert (method, body) == ("POST", "SELECT x FROM t")
+    assert headers[constants.HEADER_USER] == "test"
+    assert headers[constants.HEADER_CATALOG] == "tpch"
+    assert [method for method, _, _ in requests] == ["POST", "GET", "GET"]
+
+
+def test_async_connection_shares_session_properties():
+    async def scenario():
+        async with FakeCoordinator([[[1]]], set_session="query_max_run_time=1h") as coordinator:
+            async with trino.aio.connect(
+                "127.0.0.1", coordinator.port, user="test", session_properties={"query_priority": "1"}
+            ) as conn:
+                await conn.cursor().execute("SELECT 1")
+                await conn.cursor().execute("SELECT 2")
+                properties = dict(conn.session_properties)
+        return coordinator.requests, properties
+
+    requests, properties = run(scenario())
+    assert properties == {"query_priority": "1", "query_max_run_time": "1h"}
+    assert requests[0][1][constants.HEADER_SESSION] == "query_priority=1"
+    # the session property set by the first query is sent by the next cursor
+    assert requests[1][1][constants.HEADER_SESSION] == "query_priority=1,query_max_run_time=1h"
+
+
+def test_async_query_iteration():
+    async def scenario():
+        async with FakeCoordinator([[[1]], [], [[2], [3]]]) as coordinator:
+            request = trino.aio.AsyncTrinoRequest("127.0.0.1", coordinator.port, "test")
+            try:
+                query = trino.aio.AsyncTrinoQuery(request, "SELECT x FROM t")
+                result = await query.execute()
+                rows = await collect(result)
+            finally:
+                await request.close()
+        return query, result, rows
+
+    query, result, rows = run(scenario())
+    assert rows == [[1], [2], [3]]
+    assert result.rownumber == 3
+    assert query.is_finished()
+    assert query.query_id == QUERY_ID
+
+
+def test_async_request_503_retry():
+    async def scenario():
+        async with FakeCoordinator([[[1]]], unavailable=2) as coordinator:
+            request = trino.aio.AsyncTrinoRequest(
+                "127.0.0.1",
+                coordinator.port,
+                "test",
+                max_attempts=3,
+                handle_retry=trino.aio.AsyncRetryWithExponentialBackoff(base=0.001),
+            )
+            try:
+                query = trino.aio.AsyncTrinoQuery(request, "SELECT 1")
+                rows = await collect(await query.execute())
+            finally:
+                await request.close()
+        return rows, coordinator.requests
+
+    rows, requests = run(scenario())
+    assert rows == [[1]]
+    assert len(requests) == 3
+
+
+def test_async_request_503_error():
+    async def scenario():
+        async with FakeCoordinator([[[1]]], unavailable=1) as coordinator:
+            request = trino.aio.AsyncTrinoRequest(
+                "127.0.0.1", coordinator.port, "test", max_attempts=1
+            )
+            try:
+                await trino.aio.AsyncTrinoQuery(request, "SELECT 1").execute()
+            finally:
+                await request.close()
+
+    with pytest.raises(trino.exceptions.Http503Error):
+        run(scenario())
+
+
+def test_async_query_cancel():
+    async def scenario():
+        async with FakeCoordinator([[[1]], [[2]]]) as coordinator:
+            async with trino.aio.connect("127.0.0.1", coordinator.port, user="test") as conn:
+                cur = conn.cursor()
+                await cur.execute("SELECT x FROM t")
+                await cur.cancel()
+        return coordinator.requests
+
+    requests = run(scenario())
+    assert [method for method, _, _ in requests] == ["POST", "DELETE"]
+
+
+def test_async_request_unsupported_auth():
+    with pytest.raises(trino.exceptions.NotSupportedError):
+        trino.aio.AsyncTrinoRequest(
+            "coordinator",
+            8443,
+            "test",
+            http_scheme=constants.HTTPS,
+            auth=object(),
+        )
+
+
+def test_async_cursor_has_no_sync_api():
+    async def scenario():
+        async with trino.aio.connect("coordinator", user="test") as conn:
+            return conn.cursor()
+
+    cur = run(scenario())
+
+    assert cur.progress() is None
+    for name in ("fetch_numpy", "fetch_arrow_table", "iter_pages", "execute_partitioned", "fetch_spooled"):
+        assert not hasattr(cur, name)
+    with pytest.raises(trino.exceptions.NotSupportedError):
+        cur.setinputsizes([1])
+    request = cur._request
+    assert request.hooks is None
+    assert request._hedging is None
@@ -0,0 +1,90 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import datetime
+import decimal
+import math
+
+import pytest
+
+pyarrow = pytest.importorskip("pyarrow")
+
+from trino.arrow import get_schema, iter_record_batches, to_table  # NOQA: E402
+from conftest import FakeQuery, column, field_argument, long_argument, type_argument  # NOQA: E402
+
+
+COLUMNS = [
+    column("id", "bigint"),
+    column("price", "double"),
+    column("amount", "decimal", long_argument(10), long_argument(2)),
+    column("name", "varchar", long_argument(10)),
+    column("day", "date"),
+    column("ts", "timestamp", long_argument(3)),
+    column("tags", "array", type_argument("varchar")),
+    column("attributes", "map", type_argument("varchar"), type_argument("integer")),
+    column("point", "row", field_argument("x", "double"), field_argument("d", "date")),
+    column("duration", "interval day to second"),
+]
+
+
+def test_get_schema():
+    schema = get_schema(COLUMNS)
+
+    assert schema.names == [col["name"] for col in COLUMNS]
+    assert schema.field("id").type == pyarrow.int64()
+    assert schema.field("amount").type == pyarrow.decimal128(10, 2)
+    assert schema.field("ts").type == pyarrow.timestamp("ms")
+    assert schema.field("tags").type == pyarrow.list_(pyarrow.string())
+    assert schema.field("attributes").type == pyarrow.map_(pyarrow.string(), pyarrow.int32())
+    assert schema.field("point").type == pyarrow.struct(
+        [("x", pyarrow.float64()), ("d", pyarrow.date32())]
+    )
+    assert schema.field("duration").type == pyarrow.string()
+
+
+def test_iter_record_batches():
+    pages = [
+        [[
+            1, 1.5, "12.34", "a", "2021-01-01", "2021-01-01 01:02:03.456",
+            ["x", "y"], {"k": 1}, [0.5, "2021-02-01"], "1 02:03:04.000",
+        ]],
+        [],
+        [[
+            2, "NaN", None, None, None, None, None, None, None, None,
+        ]],
+    ]
+
+    batches = list(iter_record_batches(FakeQuery(COLUMNS), pages))
+
+    assert [batch.num_rows for batch in batches] == [1, 1]
+    first = batches[0].to_pylist()[0]
+    assert first["amount"] == decimal.Decimal("12.34")
+    assert first["day"] == datetime.date(2021, 1, 1)
+    assert first["ts"] == datetime.datetime(2021, 1, 1, 1, 2, 3, 456000)
+    assert first["tags"] == ["x", "y"]
+    assert first["attributes"] == [("k", 1)]
+    assert first["point"] == {"x": 0.5, "d": datetime.date(2021, 2, 1)}
+    second = batches[1].to_pylist()[0]
+    assert math.isnan(second["price"])
+    assert second["ts"] is None
+
+
+def test_to_table_without_rows():
+    columns = [column("id", "bigint")]
+
+    table = to_table(FakeQuery(columns), [[]])
+
+    assert table.num_rows == 0
+    assert table.schema.field("id").type == pyarrow.int64()
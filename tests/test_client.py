@@ -13,7 +13,11 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import datetime
+import decimal
 import httpretty
+import io
+import json
 import pytest
 import requests
 import socket
@@ -26,7 +30,15 @@ except ImportError:
     import mock
 
 from requests_kerberos.exceptions import KerberosExchangeError
-from trino.client import PROXIES, TrinoQuery, TrinoRequest, TrinoResult
+from trino.client import (
+    PROXIES,
+    QueryExecutor,
+    QueryProgress,
+    StreamedRows,
+    TrinoQuery,
+    TrinoRequest,
+    TrinoResult,
+)
 from trino.auth import KerberosAuthentication
 from trino import constants
 import trino.exceptions
@@ -673,3 +685,449 @@ def test_trino_query_response_headers():
         # Validate the result is an instance of TrinoResult
         assert isinstance(result, TrinoResult)
 
+
+class FakePagedQuery(object):
+    """Fake ``TrinoQuery`` returning one page of rows per ``fetch()`` call"""
+
+    def __init__(self, pages, prefetch_pages=2, error=None):
+        self.query_id = "20210101_000000_00000_xxxxx"
+        self.prefetch_pages = prefetch_pages
+        self.cancelled = False
+        self.fetch_count = 0
+        self._pages = list(pages)
+        self._error = error
+
+    def fetch(self):
+        self.fetch_count += 1
+        if not self._pages:
+            raise self._error
+        return self._pages.pop(0)
+
+    def is_finished(self):
+        return not self._pages and self._error is None
+
+    def cancel(self):
+        self.cancelled = True
+
+    def map_rows(self, rows):
+        return rows
+
+
+def test_trino_result_prefetch():
+    pages = [[[1], [2]], [[3]], [], [[4], [5]]]
+    query = FakePagedQuery(pages, prefetch_pages=2)
+
+    result = TrinoResult(query, rows=[[0]])
+
+    assert list(result) == [[0], [1], [2], [3], [4], [5]]
+    assert result.rownumber == 6
+    assert query.fetch_count == 4
+
+
+def test_trino_result_prefetch_before_iteration():
+    query = FakePagedQuery([[[1]], [[2]], [[3]]], prefetch_pages=2)
+    result = TrinoResult(query, rows=[[0]])
+
+    result.prefetch()
+    deadline = time.time() + 2
+    while query.fetch_count < 3 and time.time() < deadline:
+        time.sleep(0.01)
+
+    # fetched before any row is read
+    assert query.fetch_count == 3
+    assert list(result) == [[0], [1], [2], [3]]
+
+
+def test_trino_result_close_prefetcher():
+    query = FakePagedQuery([[[index]] for index in range(100)], prefetch_pages=1)
+    result = TrinoResult(query, rows=[[0]])
+    result.prefetch()
+    deadline = time.time() + 2
+    while query.fetch_count < 2 and time.time() < deadline:
+        time.sleep(0.01)
+
+    # the result is abandoned while the prefetcher waits for its pages to be
+    # consumed
+    result.close()
+    result._prefetcher._thread.join(2)
+    assert not result._prefetcher._thread.is_alive()
+    assert query.cancelled
+    with pytest.raises(trino.exceptions.TrinoUserError):
+        list(result)
+
+
+def test_trino_result_iter_pages():
+    query = FakePagedQuery([[[1], [2]], [], [[3]]], prefetch_pages=0)
+    result = TrinoResult(query, rows=[[0]])
+
+    pages = result.iter_pages()
+    assert next(pages) == [[0]]
+    assert result.rownumber == 1
+    assert list(pages) == [[[1], [2]], [], [[3]]]
+    assert result.rownumber == 4
+
+
+def test_trino_result_iter_pages_convert():
+    def map_rows(rows):
+        return [[value * 10 for value in row] for row in rows]
+
+    query = FakePagedQuery([[[1]]], prefetch_pages=0)
+    query.map_rows = map_rows
+    assert list(TrinoResult(query, rows=[[0]]).iter_pages()) == [[[0]], [[10]]]
+
+    query = FakePagedQuery([[[1]]], prefetch_pages=1)
+    query.map_rows = map_rows
+    result = TrinoResult(query, rows=[[0]])
+    assert list(result.iter_pages(convert=False)) == [[[0]], [[1]]]
+    assert result.rownumber == 2
+
+
+def test_trino_result_rownumber():
+    query = FakePagedQuery([[[1], [2], [3]]], prefetch_pages=0)
+    result = TrinoResult(query, rows=[[0]])
+    rows = iter(result)
+
+    assert result.rownumber == 0
+    assert next(rows) == [0]
+    assert result.rownumber == 1
+    assert next(rows) == [1]
+    assert result.rownumber == 2
+    assert list(rows) == [[2], [3]]
+    assert result.rownumber == 4
+
+
+def test_trino_result_iterated_once():
+    query = FakePagedQuery([[[1], [2]], [[3]]], prefetch_pages=0)
+    result = TrinoResult(query, rows=[[0]])
+
+    rows = iter(result)
+    assert next(rows) == [0]
+    # the pages are not fetched again, and the rows of the first page are
+    # not returned twice
+    with pytest.raises(trino.exceptions.ProgrammingError):
+        next(result.iter_pages())
+    with pytest.raises(trino.exceptions.ProgrammingError):
+        next(result.iter_pages(convert=False))
+
+    assert list(rows) == [[1], [2], [3]]
+    assert list(result.iter_pages()) == []
+    assert list(result) == []
+    assert query.fetch_count == 2
+
+
+def test_trino_query_iter_pages():
+    query = TrinoQuery(TrinoRequest("coordinator", 8080, "test"), "SELECT 1")
+    query._columns = [{"name": "x", "type": "bigint"}]
+    query._stats = {"state": "RUNNING"}
+    query._result = TrinoResult(FakePagedQuery([[[1], [2]], [], [[3]]], prefetch_pages=0), rows=[[0]])
+
+    pages = list(query.iter_pages())
+
+    assert [page.rows for page in pages] == [[[0]], [[1], [2]], [[3]]]
+    assert pages[0].columns == [{"name": "x", "type": "bigint"}]
+    assert pages[0].stats == {"state": "RUNNING"}
+    assert pages[0].stats is not query.stats
+
+
+def test_trino_query_iter_pages_cancelled():
+    query = TrinoQuery(TrinoRequest("coordinator", 8080, "test"), "SELECT 1")
+    query._result = TrinoResult(FakePagedQuery([[[1]]], prefetch_pages=0), rows=[[0]])
+    query._cancelled = True
+
+    with pytest.raises(trino.exceptions.TrinoUserError):
+        next(query.iter_pages())
+
+
+def test_trino_result_prefetch_error():
+    error = trino.exceptions.HttpError("error 500")
+    query = FakePagedQuery([[[1]]], prefetch_pages=1, error=error)
+
+    result = TrinoResult(query)
+    rows = iter(result)
+
+    assert next(rows) == [1]
+    with pytest.raises(trino.exceptions.HttpError):
+        next(rows)
+
+
+def test_trino_result_prefetch_cancelled():
+    query = FakePagedQuery([[[1]], [[2]]], prefetch_pages=1)
+    query.cancelled = True
+
+    with pytest.raises(trino.exceptions.TrinoUserError):
+        list(TrinoResult(query))
+    assert query.fetch_count == 0
+
+
+def test_trino_request_json_decoder():
+    decoded = []
+
+    def decode(content):
+        decoded.append(content)
+        return RESP_DATA_GET_0
+
+    req = TrinoRequest(host="coordinator", port=8080, user="test", json_decoder=decode)
+
+    http_resp = TrinoRequest.http.Response()
+    http_resp.status_code = 200
+    http_resp._content = b"{}"
+    status = req.process(http_resp)
+
+    assert decoded == [b"{}"]
+    assert status.rows == RESP_DATA_GET_0["data"]
+
+
+def make_streamed_response(body):
+    http_resp = TrinoRequest.http.Response()
+    http_resp.status_code = 200
+    http_resp.raw = io.BytesIO(json.dumps(body).encode("utf-8"))
+    return http_resp
+
+
+def test_trino_request_stream_rows(monkeypatch):
+    monkeypatch.setattr(TrinoRequest, "STREAM_CHUNK_SIZE", 16)
+    req = TrinoRequest(host="coordinator", port=8080, user="test", stream_rows=True)
+
+    status = req.process(make_streamed_response(RESP_DATA_GET_0))
+
+    assert status.id == RESP_DATA_GET_0["id"]
+    assert status.next_uri == RESP_DATA_GET_0["nextUri"]
+    assert isinstance(status.rows, StreamedRows)
+    assert list(status.rows) == RESP_DATA_GET_0["data"]
+    # members that follow the rows
+    assert status.columns == RESP_DATA_GET_0["columns"]
+    assert status.stats == RESP_DATA_GET_0["stats"]
+
+
+def test_trino_query_stream_rows(monkeypatch):
+    pages = [
+        dict(RESP_DATA_POST_0),
+        dict(RESP_DATA_GET_0),
+        dict(RESP_DATA_GET_0, nextUri=None, stats=dict(RESP_DATA_GET_0["stats"], state="FINISHED")),
+    ]
+    pages[2].pop("nextUri")
+    responses = [make_streamed_response(page) for page in pages]
+    req = TrinoRequest(host="coordinator", port=8080, user="test", stream_rows=True)
+    monkeypatch.setattr(req, "post", lambda sql, additional_http_headers=None: responses.pop(0))
+    monkeypatch.setattr(req, "get", lambda url: responses.pop(0))
+
+    query = TrinoQuery(req, "SELECT 1")
+    rows = iter(query.execute())
+
+    assert query.query_id == RESP_DATA_POST_0["id"]
+    assert next(rows) == RESP_DATA_GET_0["data"][0]
+    # the stats follow the rows
+    assert query.stats["state"] == "QUEUED"
+    assert list(rows) == RESP_DATA_GET_0["data"][1:] + RESP_DATA_GET_0["data"]
+    assert query.stats["state"] == "FINISHED"
+    assert query.is_finished()
+
+
+def test_trino_query_experimental_python_types(monkeypatch):
+    columns = [
+        {"name": "total", "type": "decimal(5,2)", "typeSignature": {
+            "rawType": "decimal",
+            "arguments": [{"kind": "LONG", "value": 5}, {"kind": "LONG", "value": 2}],
+        }},
+        {"name": "day", "type": "date", "typeSignature": {"rawType": "date", "arguments": []}},
+    ]
+    page = dict(RESP_DATA_POST_0, columns=columns, data=[["1.50", "2021-03-04"], [None, None]])
+    page.pop("nextUri")
+    req = TrinoRequest(host="coordinator", port=8080, user="test")
+    monkeypatch.setattr(req, "post", lambda sql, additional_http_headers=None: make_streamed_response(page))
+
+    query = TrinoQuery(req, "SELECT 1", experimental_python_types=True)
+
+    assert list(query.execute()) == [
+        [decimal.Decimal("1.50"), datetime.date(2021, 3, 4)],
+        [None, None],
+    ]
+
+
+def test_request_headers_cache():
+    req = TrinoRequest(
+        host="coordinator",
+        port=8080,
+        user="test",
+        session_properties={"a": "1"},
+        http_headers={"X-Custom": "value"},
+    )
+
+    headers = req.http_headers
+    assert req.http_headers is headers
+
+    req.transaction_id = "tx"
+    assert req.http_headers is not headers
+    assert req.http_headers[constants.HEADER_TRANSACTION] == "tx"
+
+    headers = req.http_headers
+    http_resp = TrinoRequest.http.Response()
+    http_resp.status_code = 200
+    http_resp.headers[constants.HEADER_SET_SESSION] = "b=2"
+    http_resp.headers[constants.HEADER_CLEAR_SESSION] = "a"
+    http_resp._content = json.dumps(RESP_DATA_POST_0).encode("utf-8")
+    req.process(http_resp)
+    assert req.http_headers[constants.HEADER_SESSION] == "b=2"
+
+    req._client_session.headers["X-Custom"] = "other"
+    assert req.http_headers["X-Custom"] == "other"
+
+
+def test_request_shares_plain_session_properties():
+    session_properties = {"a": "1"}
+    req = TrinoRequest(host="coordinator", port=8080, user="test", session_properties=session_properties)
+    assert req.http_headers[constants.HEADER_SESSION] == "a=1"
+
+    session_properties["b"] = "2"
+    assert req.http_headers[constants.HEADER_SESSION] == "a=1,b=2"
+
+    http_resp = TrinoRequest.http.Response()
+    http_resp.status_code = 200
+    http_resp.headers[constants.HEADER_SET_SESSION] = "c=3"
+    http_resp._content = json.dumps(RESP_DATA_POST_0).encode("utf-8")
+    req.process(http_resp)
+    assert session_properties == {"a": "1", "b": "2", "c": "3"}
+
+
+def test_request_post_headers_not_shared(monkeypatch):
+    post_recorder = ArgumentsRecorder()
+    monkeypatch.setattr(TrinoRequest.http.Session, "post", post_recorder)
+    req = TrinoRequest(host="coordinator", port=8080, user="test")
+
+    req.post("SELECT 1", additional_http_headers={"X-Extra": "1"})
+
+    assert post_recorder.kwargs["headers"]["X-Extra"] == "1"
+    assert "X-Extra" not in req.http_headers
+
+
+class FakeQueries(object):
+    """Replace the execution of ``TrinoQuery`` without sending requests.
+    Queries on ``slow`` wait until they are cancelled."""
+
+    def __init__(self, monkeypatch):
+        self.cancelled = []
+        fake = self
+
+        def execute(query, additional_http_headers=None):
+            query.query_id = query._sql
+            query._stats = {"queryId": query._sql, "state": "FINISHED"}
+            if query._sql == "slow":
+                for _ in range(500):
+                    if query._cancelled:
+                        raise trino.exceptions.TrinoUserError("Query has been cancelled", query.query_id)
+                    time.sleep(0.01)
+            if query._sql == "fail":
+                raise trino.exceptions.TrinoUserError("failed", query.query_id)
+            query._finished = True
+            query._result = TrinoResult(query, [[query._sql]])
+            return query._result
+
+        def cancel(query):
+            fake.cancelled.append(query._sql)
+            query._cancelled = True
+
+        monkeypatch.setattr(TrinoQuery, "execute", execute)
+        monkeypatch.setattr(TrinoQuery, "cancel", cancel)
+
+
+def test_query_executor(monkeypatch):
+    FakeQueries(monkeypatch)
+    statements = ["select {}".format(value) for value in range(10)] + ["fail"]
+
+    with QueryExecutor(host="coordinator", port=8080, user="test", max_workers=3) as executor:
+        outcomes = sorted(executor.execute(statements), key=lambda outcome: outcome.index)
+
+    assert [outcome.sql for outcome in outcomes] == statements
+    assert all(outcome.succeeded for outcome in outcomes[:-1])
+    assert outcomes[0].rows == [["select 0"]]
+    assert outcomes[0].stats == {"queryId": "select 0", "state": "FINISHED"}
+    assert isinstance(outcomes[-1].error, trino.exceptions.TrinoUserError)
+    assert outcomes[-1].rows is None
+
+
+def test_query_executor_cancel_on_error(monkeypatch):
+    fake = FakeQueries(monkeypatch)
+    executor = QueryExecutor(
+        host="coordinator", port=8080, user="test", max_workers=2, cancel_on_error=True
+    )
+
+    with pytest.raises(trino.exceptions.TrinoUserError):
+        list(executor.execute(["slow", "fail", "select 1"]))
+    assert "slow" in fake.cancelled
+
+
+def test_query_progress_from_stats():
+    progress = QueryProgress.from_stats({
+        "queryId": "query",
+        "state": "RUNNING",
+        "queued": False,
+        "scheduled": True,
+        "progressPercentage": 42.5,
+        "nodes": 3,
+        "totalSplits": 100,
+        "queuedSplits": 10,
+        "runningSplits": 20,
+        "completedSplits": 70,
+        "processedRows": 1000,
+        "processedBytes": 8000,
+        "cpuTimeMillis": 1500,
+        "queuedTimeMillis": 5,
+    })
+
+    assert progress.query_id == "query"
+    assert progress.state == "RUNNING"
+    assert progress.scheduled
+    assert not progress.queued
+    assert progress.progress_percentage == 42.5
+    assert (progress.queued_splits, progress.running_splits, progress.completed_splits) == (10, 20, 70)
+    assert progress.processed_rows == 1000
+    assert progress.cpu_time_millis == 1500
+    assert progress.spilled_bytes == 0
+
+    assert QueryProgress.from_stats({"state": "QUEUED"}).queued
+    assert QueryProgress.from_stats({"state": "FINISHED"}).progress_percentage == 100.0
+    assert QueryProgress.from_stats({}).progress_percentage is None
+
+
+def test_query_progress_combine():
+    progress = QueryProgress.combine([
+        QueryProgress.from_stats({"state": "FINISHED", "processedRows": 10, "elapsedTimeMillis": 50}),
+        QueryProgress.from_stats({
+            "state": "RUNNING", "progressPercentage": 50.0, "processedRows": 5, "elapsedTimeMillis": 80,
+        }),
+    ])
+
+    assert progress.state == "RUNNING"
+    assert progress.progress_percentage == 75.0
+    assert progress.processed_rows == 15
+    assert progress.elapsed_time_millis == 80
+    assert QueryProgress.combine([QueryProgress.from_stats({"state": "QUEUED"})]).state == "QUEUED"
+    assert QueryProgress.combine([
+        QueryProgress.from_stats({"state": "FAILED"}), QueryProgress.from_stats({"state": "RUNNING"}),
+    ]).state == "FAILED"
+
+
+def test_trino_query_progress_callback(monkeypatch):
+    pages = [
+        dict(RESP_DATA_POST_0),
+        dict(RESP_DATA_GET_0),
+        dict(RESP_DATA_GET_0, stats=dict(RESP_DATA_GET_0["stats"], state="FINISHED")),
+    ]
+    pages[2].pop("nextUri")
+    responses = [make_streamed_response(page) for page in pages]
+    req = TrinoRequest(host="coordinator", port=8080, user="test")
+    monkeypatch.setattr(req, "post", lambda sql, additional_http_headers=None: responses.pop(0))
+    monkeypatch.setattr(req, "get", lambda url: responses.pop(0))
+    progresses = []
+
+    def callback(progress):
+        progresses.append(progress)
+        raise ValueError("ignored")
+
+    query = TrinoQuery(req, "SELECT 1", progress_callback=callback)
+    list(query.execute())
+
+    assert [progress.state for progress in progresses] == ["QUEUED", "RUNNING", "FINISHED"]
+    assert progresses[0].query_id == RESP_DATA_POST_0["id"]
+    assert query.progress.state == "FINISHED"
+    assert query.progress.progress_percentage == 100.0
@@ -0,0 +1,115 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import math
+
+import pytest
+
+numpy = pytest.importorskip("numpy")
+
+import trino.columnar  # NOQA: E402
+from trino.columnar import to_numpy  # NOQA: E402
+from conftest import FakeQuery, column, long_argument  # NOQA: E402
+
+
+def test_to_numpy_types():
+    query = FakeQuery([
+        column("id", "bigint"),
+        column("price", "double"),
+        column("valid", "boolean"),
+        column("day", "date"),
+        column("ts", "timestamp", long_argument(6)),
+        column("name", "varchar", long_argument(10)),
+    ])
+    pages = [
+        [[1, 1.5, True, "2021-01-01", "2021-01-01 01:02:03.456789", "a"]],
+        [],
+        [
+            [2, "NaN", False, "2021-01-02", "2021-01-02 00:00:00.000000", "b"],
+            [3, "Infinity", True, "2021-01-03", "2021-01-03 00:00:00.000000", None],
+        ],
+    ]
+
+    arrays = to_numpy(query, pages)
+
+    assert list(arrays) == ["id", "price", "valid", "day", "ts", "name"]
+    assert arrays["id"].dtype == numpy.int64
+    assert arrays["id"].tolist() == [1, 2, 3]
+    assert arrays["price"].dtype == numpy.float64
+    assert arrays["price"][0] == 1.5
+    assert math.isnan(arrays["price"][1])
+    assert arrays["price"][2] == float("inf")
+    assert arrays["valid"].tolist() == [True, False, True]
+    assert arrays["day"].dtype == numpy.dtype("datetime64[D]")
+    assert str(arrays["day"][2]) == "2021-01-03"
+    assert arrays["ts"].dtype == numpy.dtype("datetime64[us]")
+    assert str(arrays["ts"][0]) == "2021-01-01T01:02:03.456789"
+    assert arrays["name"].dtype == object
+    assert arrays["name"].tolist() == ["a", "b", None]
+
+
+def test_to_numpy_long_typecode(monkeypatch):
+    # Python 2 arrays store the 64-bit integers with the "l" typecode
+    if trino.columnar.array.array("l").itemsize != 8:
+        pytest.skip("long values are not 64-bit")
+    monkeypatch.setattr(trino.columnar, "_INT64_TYPECODE", "l")
+    query = FakeQuery([column("id", "bigint"), column("ts", "timestamp", long_argument(3))])
+
+    arrays = to_numpy(query, [[[1, "2021-01-01 01:02:03.456"]], [[-2, None]]])
+
+    assert arrays["id"].dtype == numpy.int64
+    assert arrays["id"].tolist() == [1, -2]
+    assert arrays["ts"].dtype == numpy.dtype("datetime64[ms]")
+    assert str(arrays["ts"][0]) == "2021-01-01T01:02:03.456"
+    assert arrays["ts"].mask.tolist() == [False, True]
+
+
+def test_no_int64_typecode(monkeypatch):
+    monkeypatch.setattr(trino.columnar, "_INT64_TYPECODE", None)
+
+    with pytest.raises(RuntimeError):
+        to_numpy(FakeQuery([column("id", "bigint")]), [[[1]]])
+
+
+def test_to_numpy_nulls():
+    query = FakeQuery([column("x", "integer"), column("d", "date")])
+    pages = [[[1, None]], [[None, "2021-01-01"], [3, None]]]
+
+    arrays = to_numpy(query, pages)
+
+    assert isinstance(arrays["x"], numpy.ma.MaskedArray)
+    assert arrays["x"].mask.tolist() == [False, True, False]
+    assert arrays["x"].compressed().tolist() == [1, 3]
+    assert isinstance(arrays["d"], numpy.ma.MaskedArray)
+    assert arrays["d"].mask.tolist() == [True, False, True]
+
+
+def test_to_numpy_empty_result():
+    query = FakeQuery([column("x", "bigint"), column("x", "varchar")])
+
+    arrays = to_numpy(query, [[]])
+
+    assert list(arrays) == ["x", "x_1"]
+    assert len(arrays["x"]) == 0
+    assert arrays["x"].dtype == numpy.int64
+
+
+def test_to_numpy_nested_values():
+    query = FakeQuery([column("a", "array")])
+
+    arrays = to_numpy(query, [[[[1, 2]], [[3, 4]]]])
+
+    assert arrays["a"].shape == (2,)
+    assert arrays["a"][1] == [3, 4]
@@ -0,0 +1,50 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+
+import datetime
+
+from trino import datatypes
+
+
+def test_get_signature_without_type_signature():
+    signature = datatypes.get_signature({"name": "a", "type": "decimal(10, 2)"})
+
+    assert signature == {"rawType": "decimal"}
+    assert datatypes.get_long_arguments(signature) == []
+
+
+def test_get_fields():
+    signature = {
+        "rawType": "row",
+        "arguments": [
+            {
+                "kind": "NAMED_TYPE",
+                "value": {"fieldName": {"name": "x"}, "typeSignature": {"rawType": "bigint", "arguments": []}},
+            },
+            {"kind": "NAMED_TYPE", "value": {"typeSignature": {"rawType": "date", "arguments": []}}},
+        ],
+    }
+
+    assert datatypes.get_fields(signature) == [
+        ("x", {"rawType": "bigint", "arguments": []}),
+        ("field1", {"rawType": "date", "arguments": []}),
+    ]
+
+
+def test_parse_timestamp_truncates_to_microseconds():
+    assert datatypes.parse_timestamp("2021-03-04 01:02:03.123456789") == datetime.datetime(
+        2021, 3, 4, 1, 2, 3, 123456
+    )
@@ -0,0 +1,512 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import copy
+import threading
+import time
+
+import pytest
+
+try:
+    from unittest import mock
+except ImportError:
+    # Python 2
+    import mock
+
+from trino import constants
+import trino.exceptions
+import trino.hedging
+import trino.instrumentation
+from trino.client import TrinoQuery, TrinoResult, TrinoStatus
+from trino.dbapi import Connection, ConnectionPool, Cursor, PreparedStatementCache
+from trino.result_cache import ResultCache
+
+
+class StatementRecorder(object):
+    """Record the statements sent by a cursor without sending HTTP requests"""
+
+    def __init__(self, monkeypatch):
+        self.prepared = []
+        self.deallocated = []
+        self.executed = []
+        recorder = self
+
+        def prepare(cursor, operation, statement_name):
+            recorder.prepared.append((operation, statement_name))
+            return "{}={}".format(statement_name, operation)
+
+        def deallocate(cursor, added_prepare_header, statement_name):
+            recorder.deallocated.append(statement_name)
+            return statement_name
+
+        def execute(query, additional_http_headers=None):
+            recorder.executed.append((query._sql, additional_http_headers))
+            query._finished = True
+            query._result = TrinoResult(query, [[1]])
+            return query._result
+
+        monkeypatch.setattr(Cursor, "_prepare_statement", prepare)
+        monkeypatch.setattr(Cursor, "_deallocate_prepare_statement", deallocate)
+        monkeypatch.setattr(TrinoQuery, "execute", execute)
+
+
+def test_prepared_statement_cache_lru():
+    cache = PreparedStatementCache(max_size=2)
+
+    assert cache.get("a") is None
+    assert cache.put("a", "st_a", "header_a") == []
+    assert cache.put("b", "st_b", "header_b") == []
+    assert cache.get("a") == ("st_a", "header_a")
+    assert cache.put("c", "st_c", "header_c") == [("st_b", "header_b")]
+    assert cache.put("c", "st_c2", "header_c2") == [("st_c", "header_c")]
+    assert len(cache) == 2
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert sorted(cache.clear()) == [("st_a", "header_a"), ("st_c2", "header_c2")]
+    assert len(cache) == 0
+
+
+def test_prepared_statement_cache_invalid_size():
+    with pytest.raises(ValueError):
+        PreparedStatementCache(max_size=0)
+
+
+def test_execute_without_prepared_statement_cache(monkeypatch):
+    recorder = StatementRecorder(monkeypatch)
+    conn = Connection("coordinator", user="test")
+    cur = conn.cursor()
+
+    cur.execute("SELECT ?", [1])
+    cur.execute("SELECT ?", [2])
+
+    assert conn.prepared_statement_cache is None
+    assert len(recorder.prepared) == 2
+    assert len(recorder.deallocated) == 2
+
+
+def test_execute_with_prepared_statement_cache(monkeypatch):
+    recorder = StatementRecorder(monkeypatch)
+    conn = Connection("coordinator", user="test", prepared_statement_cache_size=1)
+    cur = conn.cursor()
+
+    cur.execute("SELECT ?", [1])
+    assert cur.fetchall() == [[1]]
+    conn.cursor().execute("SELECT ?", [2])
+
+    assert len(recorder.prepared) == 1
+    assert recorder.deallocated == []
+    statement_name = recorder.prepared[0][1]
+    assert recorder.executed == [
+        (
+            "EXECUTE {} USING {}".format(statement_name, value),
+            {constants.HEADER_PREPARED_STATEMENT: "{}=SELECT ?".format(statement_name)},
+        )
+        for value in (1, 2)
+    ]
+
+    # Evicts the first statement
+    cur.execute("SELECT ? + 1", [3])
+    assert recorder.deallocated == [statement_name]
+
+    cache = conn.prepared_statement_cache
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    conn.close()
+    assert recorder.deallocated == [statement_name, recorder.prepared[1][1]]
+    assert len(cache) == 0
+
+
+def test_executemany_insert_batches(monkeypatch):
+    recorder = StatementRecorder(monkeypatch)
+    cur = Connection("coordinator", user="test").cursor()
+    cur.executemany_batch_rows = 2
+
+    cur.executemany(
+        "INSERT INTO t (id, name) VALUES (?, ?)",
+        [(1, "a"), (2, "it's"), (3, None)],
+    )
+
+    assert recorder.prepared == []
+    assert [sql for sql, _ in recorder.executed] == [
+        "INSERT INTO t (id, name) VALUES (1, 'a'),(2, 'it''s')",
+        "INSERT INTO t (id, name) VALUES (3, NULL)",
+    ]
+
+
+def test_executemany_insert_batch_bytes(monkeypatch):
+    recorder = StatementRecorder(monkeypatch)
+    cur = Connection("coordinator", user="test").cursor()
+    cur.executemany_batch_bytes = len("INSERT INTO t VALUES ('aaaa'),('bbbb'),")
+
+    cur.executemany("insert into t values (?)", [["aaaa"], ["bbbb"], ["cccc"]])
+
+    assert [sql for sql, _ in recorder.executed] == [
+        "insert into t values ('aaaa'),('bbbb')",
+        "insert into t values ('cccc')",
+    ]
+
+
+def test_executemany_insert_placeholder_in_literal(monkeypatch):
+    recorder = StatementRecorder(monkeypatch)
+    cur = Connection("coordinator", user="test").cursor()
+
+    cur.executemany("INSERT INTO t VALUES ('?', ?)", [[1], [2]])
+
+    assert [sql for sql, _ in recorder.executed] == [
+        "INSERT INTO t VALUES ('?', 1),('?', 2)",
+    ]
+
+
+def test_executemany_insert_wrong_parameter_count(monkeypatch):
+    StatementRecorder(monkeypatch)
+    cur = Connection("coordinator", user="test").cursor()
+
+    with pytest.raises(trino.exceptions.ProgrammingError):
+        cur.executemany("INSERT INTO t VALUES (?, ?)", [[1]])
+
+
+def test_executemany_other_statements(monkeypatch):
+    recorder = StatementRecorder(monkeypatch)
+    cur = Connection("coordinator", user="test").cursor()
+
+    cur.executemany("UPDATE t SET x = ? WHERE id = ?", [[1, 2], [3, 4]])
+    cur.executemany("INSERT INTO t SELECT * FROM (VALUES (?))", [[1]])
+
+    assert len(recorder.prepared) == 3
+    assert len(recorder.deallocated) == 3
+
+
+def test_cursor_close_keeps_prepared_statements(monkeypatch):
+    recorder = StatementRecorder(monkeypatch)
+    conn = Connection("coordinator", user="test", prepared_statement_cache_size=1)
+    cur = conn.cursor()
+
+    cur.execute("SELECT ?", [1])
+    cur.close()
+
+    assert recorder.deallocated == []
+    assert len(conn.prepared_statement_cache) == 1
+
+
+def test_connection_with_several_coordinators():
+    conn = Connection(
+        ["a", "b:8081"],
+        user="test",
+        load_balancing_policy="least_outstanding",
+        health_check_interval=None,
+    )
+
+    coordinators = conn.load_balancer.coordinators
+    assert [(c.host, c.port) for c in coordinators] == [("a", 8080), ("b", 8081)]
+    assert conn.cursor()._request._load_balancer is conn.load_balancer
+    conn.close()
+
+
+def test_connection_pool_reuses_connections():
+    pool = ConnectionPool(min_size=1, max_size=2, host="coordinator", user="test")
+    assert (pool.size, pool.idle) == (1, 1)
+
+    first = pool.acquire()
+    second = pool.acquire()
+    assert first is not second
+    assert first._http_session is second._http_session
+    assert (pool.size, pool.idle) == (2, 0)
+
+    pool.release(second)
+    assert pool.acquire() is second
+
+
+def test_connection_pool_timeout():
+    pool = ConnectionPool(max_size=1, timeout=0.01, host="coordinator", user="test")
+    conn = pool.acquire()
+
+    with pytest.raises(trino.exceptions.OperationalError):
+        pool.acquire()
+
+    released = threading.Timer(0.05, pool.release, [conn])
+    released.start()
+    assert pool.acquire(timeout=5) is conn
+    released.join()
+
+
+def test_connection_pool_resets_session():
+    pool = ConnectionPool(
+        max_size=1,
+        host="coordinator",
+        user="test",
+        schema="default",
+        session_properties={"query_priority": "1"},
+    )
+
+    with pool.connection() as conn:
+        conn.schema = "other"
+        # as updated by X-Trino-Set-Session
+        conn.session_properties["query_max_run_time"] = "1m"
+
+    with pool.connection() as conn:
+        assert conn.schema == "default"
+        assert conn.session_properties == {"query_priority": "1"}
+
+
+def test_connection_pool_evicts_idle_connections():
+    pool = ConnectionPool(min_size=1, max_size=3, max_idle_time=0, host="coordinator", user="test")
+    connections = [pool.acquire() for _ in range(3)]
+
+    for conn in connections:
+        pool.release(conn)
+
+    assert (pool.size, pool.idle) == (1, 1)
+
+
+def test_connection_pool_health_check(monkeypatch):
+    pool = ConnectionPool(min_size=1, health_check_idle_time=0, host="coordinator", user="test")
+    unhealthy = pool.acquire()
+    pool.release(unhealthy)
+
+    def get(url, timeout):
+        assert url == "http://coordinator:8080/v1/info"
+        raise trino.client.TrinoRequest.http.ConnectionError()
+
+    monkeypatch.setattr(pool._http_session, "get", get)
+
+    conn = pool.acquire()
+    assert conn is not unhealthy
+    assert pool.size == 1
+
+
+def test_connection_pool_closed():
+    pool = ConnectionPool(host="coordinator", user="test")
+    conn = pool.acquire()
+
+    pool.close()
+
+    with pytest.raises(trino.exceptions.ProgrammingError):
+        pool.acquire()
+    pool.release(conn)
+    assert pool.size == 0
+
+
+def test_connection_pool_prepared_statements(statement_server):
+    pool = ConnectionPool(
+        max_size=1,
+        host="127.0.0.1",
+        port=statement_server.server_port,
+        user="test",
+        schema="default",
+        prepared_statement_cache_size=2,
+    )
+
+    with pool.connection() as conn:
+        conn.schema = "other"
+        cur = conn.cursor()
+        cur.execute("SELECT ?", [1])
+        assert cur.fetchall() == [[1]]
+        first = conn
+
+    # the reset connection keeps its prepared statements
+    with pool.connection() as conn:
+        assert conn is first
+        assert conn.schema == "default"
+        assert len(conn.prepared_statement_cache) == 1
+        cur = conn.cursor()
+        cur.execute("SELECT ?", [2])
+        assert cur.fetchall() == [[1]]
+
+    statements = statement_server.statements
+    assert [sql.split(" ")[0] for sql, _ in statements] == ["PREPARE", "EXECUTE", "EXECUTE"]
+    assert statements[1][1] == statements[2][1]
+    assert statements[2][0].endswith(" USING 2")
+
+    pool.close()
+    assert statements[-1][0].startswith("DEALLOCATE PREPARE ")
+    assert len(first.prepared_statement_cache) == 0
+
+
+def test_execute_with_result_cache(monkeypatch):
+    recorder = StatementRecorder(monkeypatch)
+    cache = ResultCache()
+    conn = Connection("coordinator", user="test", result_cache=cache)
+
+    cur = conn.cursor()
+    cur.execute("SELECT 1")
+    assert cur.fetchall() == [[1]]
+    cur = conn.cursor()
+    cur.execute("select  1;")
+    assert cur.fetchall() == [[1]]
+    assert cur.description is None
+    assert len(recorder.executed) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # not cached
+    conn.cursor().execute("SELECT random()")
+    conn.cursor().execute("INSERT INTO t VALUES (1)")
+    conn.schema = "other"
+    conn.cursor().execute("SELECT 1")
+    assert len(recorder.executed) == 4
+
+
+def test_fetch_methods_share_rows(monkeypatch):
+    def execute(query, additional_http_headers=None):
+        query._finished = True
+        query._result = TrinoResult(query, [[1], [2], [3], [4], [5]])
+        return query._result
+
+    monkeypatch.setattr(TrinoQuery, "execute", execute)
+    cur = Connection("coordinator", user="test").cursor()
+
+    cur.execute("SELECT x FROM t")
+    assert cur.fetchone() == [1]
+    assert cur.fetchmany(2) == [[2], [3]]
+    assert cur.fetchall() == [[4], [5]]
+    assert cur.fetchmany(2) == []
+    assert cur.fetchone() is None
+
+
+def test_iter_pages(monkeypatch):
+    def execute(query, additional_http_headers=None):
+        def fetch():
+            raise trino.exceptions.HttpError("error 500")
+
+        query._columns = [{"name": "x", "type": "bigint"}]
+        query.fetch = fetch
+        query._result = TrinoResult(query, [[1], [2]])
+        return query._result
+
+    monkeypatch.setattr(TrinoQuery, "execute", execute)
+    cur = Connection("coordinator", user="test").cursor()
+
+    cur.execute("SELECT x FROM t")
+    pages = cur.iter_pages()
+    page = next(pages)
+    assert page.rows == [[1], [2]]
+    assert page.columns == [{"name": "x", "type": "bigint"}]
+    with pytest.raises(trino.exceptions.OperationalError):
+        next(pages)
+
+
+def test_connection_retry_policy():
+    policy = trino.exceptions.RetryPolicy(circuit_breaker=trino.exceptions.CircuitBreaker())
+    conn = Connection("coordinator", user="test", retry_policy=policy, max_attempts=1)
+
+    request = conn.cursor()._request
+    assert request._handle_retry is policy
+    # the requests of the prepared statements are copies
+    assert copy.deepcopy(request)._handle_retry is policy
+    # the circuit breaker also applies without retries
+    assert request._post is not request._http_session.post
+
+
+def test_connection_hedging():
+    hedging = trino.hedging.HedgingPolicy()
+    conn = Connection("coordinator", user="test", hedging=hedging)
+
+    request = conn.cursor()._request
+    assert request._hedging is hedging
+    assert copy.deepcopy(request)._hedging is hedging
+
+
+def test_connection_hooks():
+    metrics = trino.instrumentation.MetricsCollector()
+    conn = Connection("coordinator", user="test", hooks=[metrics])
+
+    request = conn.cursor()._request
+    assert request.hooks.hooks == [metrics]
+    assert copy.deepcopy(request).hooks is request.hooks
+
+
+def test_cursor_progress(monkeypatch):
+    statuses = [
+        TrinoStatus("query", {"state": "QUEUED"}, [], None, "next", [[1]]),
+        TrinoStatus("query", {"state": "RUNNING", "progressPercentage": 50.0}, [], None, "next", [[2]]),
+        TrinoStatus("query", {"state": "FINISHED"}, [], None, None, [[3]]),
+    ]
+
+    def execute(query, additional_http_headers=None):
+        status = statuses.pop(0)
+        query._update_initial_state(status)
+        query._result = TrinoResult(query, status.rows)
+        return query._result
+
+    def fetch(query):
+        status = statuses.pop(0)
+        query._update_state(status, mock.Mock())
+        return status.rows
+
+    monkeypatch.setattr(TrinoQuery, "execute", execute)
+    monkeypatch.setattr(TrinoQuery, "fetch", fetch)
+    progresses = []
+    conn = Connection("coordinator", user="test", progress_callback=progresses.append, prefetch_pages=2)
+    cur = conn.cursor()
+    assert cur.progress() is None
+
+    cur.execute("SELECT x FROM t")
+    # the pages are fetched before the rows are read
+    deadline = time.time() + 2
+    while len(progresses) < 3 and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert [progress.state for progress in progresses] == ["QUEUED", "RUNNING", "FINISHED"]
+    assert progresses[1].progress_percentage == 50.0
+    assert cur.progress().state == "FINISHED"
+    assert cur.fetchall() == [[1], [2], [3]]
+
+
+def test_cursor_closes_prefetching_result(monkeypatch):
+    def execute(query, additional_http_headers=None):
+        query._update_initial_state(TrinoStatus("query", {"state": "RUNNING"}, [], None, "next", [[0]]))
+        query._result = TrinoResult(query, [[0]])
+        return query._result
+
+    def fetch(query):
+        return [[1]]
+
+    cancelled = []
+    monkeypatch.setattr(TrinoQuery, "execute", execute)
+    monkeypatch.setattr(TrinoQuery, "fetch", fetch)
+    monkeypatch.setattr(TrinoQuery, "cancel", lambda query: cancelled.append(query))
+    conn = Connection("coordinator", user="test", progress_callback=lambda progress: None, prefetch_pages=1)
+    cur = conn.cursor()
+
+    # the results are abandoned while their queries are still running
+    cur.execute("SELECT x FROM t")
+    first = cur._query
+    cur.execute("SELECT x FROM t")
+    second = cur._query
+    cur.close()
+
+    assert cancelled == [first, second]
+    for query in (first, second):
+        query.result._prefetcher._thread.join(2)
+        assert not query.result._prefetcher._thread.is_alive()
+
+
+def test_cursor_fetch_pages_after_fetchone(statement_server):
+    pytest.importorskip("numpy")
+    pytest.importorskip("pyarrow")
+    conn = trino.dbapi.connect(host="127.0.0.1", port=statement_server.server_port, user="test")
+    cur = conn.cursor()
+
+    cur.execute("SELECT 1")
+    assert cur.fetchone() == [1]
+    with pytest.raises(trino.exceptions.ProgrammingError):
+        cur.fetch_numpy()
+    with pytest.raises(trino.exceptions.ProgrammingError):
+        next(cur.fetch_arrow_batches())
+    with pytest.raises(trino.exceptions.ProgrammingError):
+        cur.fetch_spooled()
+
+    cur.execute("SELECT 1")
+    assert cur.fetch_numpy()["x"].tolist() == [1]
+    assert cur.fetchone() is None
+    assert cur.fetch_arrow_table().num_rows == 0
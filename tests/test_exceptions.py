@@ -75,3 +75,110 @@ def test_retry_with():
     with_retry(FailerUntil(2).__call__)()
     with pytest.raises(SomeException):
         with_retry(FailerUntil(3).__call__)()
+
+
+class Clock(object):
+    def __init__(self, monkeypatch):
+        self.now = 1000.0
+        self.sleeps = []
+        monkeypatch.setattr(exceptions.time, "time", lambda: self.now)
+        monkeypatch.setattr(exceptions.time, "sleep", self.sleep)
+
+    def sleep(self, delay):
+        self.sleeps.append(delay)
+        self.now += delay
+
+
+def test_retry_budget(monkeypatch):
+    clock = Clock(monkeypatch)
+    budget = exceptions.RetryBudget(max_tokens=2, refill_rate=0.5)
+
+    assert budget.try_acquire()
+    assert budget.try_acquire()
+    assert not budget.try_acquire()
+    clock.now += 2
+    assert budget.try_acquire()
+    assert (budget.acquired, budget.denied) == (3, 1)
+
+
+def test_circuit_breaker(monkeypatch):
+    clock = Clock(monkeypatch)
+    breaker = exceptions.CircuitBreaker(failure_threshold=2, reset_timeout=10)
+
+    breaker.before_request()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(exceptions.CircuitOpenError):
+        breaker.before_request()
+
+    clock.now += 10
+    assert breaker.state == "half_open"
+    breaker.before_request()
+    # only one trial request at a time
+    with pytest.raises(exceptions.CircuitOpenError):
+        breaker.before_request()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock.now += 10
+    breaker.before_request()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert (breaker.opened, breaker.rejected) == (2, 2)
+
+
+def failing(count, result="ok"):
+    calls = []
+
+    def call():
+        calls.append(1)
+        if len(calls) <= count:
+            raise SomeException(len(calls))
+        return result
+
+    return call, calls
+
+
+def test_retry_policy_circuit_breaker(monkeypatch):
+    Clock(monkeypatch)
+    policy = exceptions.RetryPolicy(circuit_breaker=exceptions.CircuitBreaker(failure_threshold=3))
+    with_retry = exceptions.retry_with(policy, exceptions=[SomeException], conditions=[], max_attempts=5)
+
+    call, calls = failing(10)
+    with pytest.raises(exceptions.CircuitOpenError):
+        with_retry(call)()
+    assert len(calls) == 3
+
+    metrics = policy.metrics
+    assert metrics["circuit_state"] == "open"
+    assert (metrics["attempts"], metrics["failures"], metrics["retries"]) == (4, 3, 3)
+
+
+def test_retry_policy_budget(monkeypatch):
+    Clock(monkeypatch)
+    policy = exceptions.RetryPolicy(budget=exceptions.RetryBudget(max_tokens=1, refill_rate=0))
+    with_retry = exceptions.retry_with(policy, exceptions=[SomeException], conditions=[], max_attempts=5)
+
+    call, calls = failing(1)
+    assert with_retry(call)() == "ok"
+    call, calls = failing(1)
+    with pytest.raises(SomeException):
+        with_retry(call)()
+    assert len(calls) == 1
+    assert policy.metrics["budget_exhausted"] == 1
+
+
+def test_retry_policy_deadline(monkeypatch):
+    clock = Clock(monkeypatch)
+    policy = exceptions.RetryPolicy(
+        backoff=exceptions.DelayExponential(base=1, jitter=False), deadline=5
+    )
+    with_retry = exceptions.retry_with(policy, exceptions=[SomeException], conditions=[], max_attempts=10)
+
+    call, calls = failing(10)
+    with pytest.raises(SomeException):
+        with_retry(call)()
+    # delays of 2s and 4s would end after the deadline
+    assert clock.sleeps == [2.0]
+    assert policy.metrics["deadline_exceeded"] == 1
@@ -0,0 +1,173 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import threading
+import time
+
+import pytest
+
+from trino.hedging import HedgingPolicy, LatencyTracker, WorkerPool
+
+
+class Response(object):
+    def __init__(self, name):
+        self.name = name
+        self.closed = threading.Event()
+
+    def close(self):
+        self.closed.set()
+
+
+class Sender(object):
+    """Send function answering after the delays of its successive calls. A
+    negative delay fails the call, ``None`` fails it at once."""
+
+    def __init__(self, *delays):
+        self._delays = list(delays)
+        self._lock = threading.Lock()
+        self.calls = []
+        self.responses = []
+
+    def __call__(self, url):
+        with self._lock:
+            number = len(self.calls)
+            self.calls.append(url)
+            delay = self._delays[number]
+            response = Response(number)
+            self.responses.append(response)
+        if delay is None or delay < 0:
+            time.sleep(abs(delay or 0))
+            raise IOError("failed call {}".format(number))
+        time.sleep(delay)
+        return response
+
+
+def test_latency_tracker_percentile():
+    tracker = LatencyTracker(window=100)
+    assert tracker.percentile(95) is None
+    for latency in range(200):
+        tracker.add(latency / 1000.0)
+
+    assert len(tracker) == 100
+    assert tracker.percentile(50) == 0.15
+    assert tracker.percentile(95) == 0.195
+    assert tracker.percentile(100) == 0.199
+
+
+def test_hedging_policy_delay():
+    hedging = HedgingPolicy(min_delay=0.01, initial_delay=0.5, window=10, min_samples=5)
+    assert hedging.delay == 0.5
+
+    for _ in range(5):
+        hedging._record_latency(0.001)
+    assert hedging.delay == 0.01
+
+    for _ in range(10):
+        hedging._record_latency(0.1)
+    assert hedging.delay == 0.1
+
+    with pytest.raises(ValueError):
+        HedgingPolicy(percentile=0)
+
+
+def test_hedging_policy_fast_request_is_not_hedged():
+    hedging = HedgingPolicy(initial_delay=1.0)
+    send = Sender(0)
+
+    response = hedging.call(send, "/v1/statement/1")
+
+    assert response.name == 0
+    assert send.calls == ["/v1/statement/1"]
+    assert hedging.metrics["requests"] == 1
+    assert hedging.metrics["hedged"] == 0
+
+
+def test_hedging_policy_hedge_wins_and_primary_is_closed():
+    hedging = HedgingPolicy(initial_delay=0.05)
+    send = Sender(0.5, 0)
+
+    response = hedging.call(send, "/v1/statement/1")
+
+    assert response.name == 1
+    assert send.calls == ["/v1/statement/1", "/v1/statement/1"]
+    metrics = hedging.metrics
+    assert metrics["hedged"] == 1
+    assert metrics["hedge_wins"] == 1
+    # the primary response is closed once it arrives
+    assert send.responses[0].closed.wait(2)
+    assert not response.closed.is_set()
+
+
+def test_hedging_policy_slow_primary_still_wins():
+    hedging = HedgingPolicy(initial_delay=0.05)
+    send = Sender(0.1, 0.5)
+
+    response = hedging.call(send, "/v1/statement/1")
+
+    assert response.name == 0
+    assert hedging.metrics["hedged"] == 1
+    assert hedging.metrics["hedge_wins"] == 0
+    assert send.responses[1].closed.wait(2)
+
+
+def test_hedging_policy_failed_request_falls_back_on_the_other():
+    hedging = HedgingPolicy(initial_delay=0.05)
+    send = Sender(-0.1, 0.2)
+
+    response = hedging.call(send, "/v1/statement/1")
+
+    assert response.name == 1
+    assert hedging.metrics["failures"] == 1
+    assert hedging.metrics["hedge_wins"] == 1
+
+
+def test_hedging_policy_raises_when_all_requests_fail():
+    hedging = HedgingPolicy(initial_delay=0.05)
+
+    with pytest.raises(IOError):
+        hedging.call(Sender(-0.1, -0.2), "/v1/statement/1")
+    with pytest.raises(IOError):
+        # a fast failure is not hedged
+        hedging.call(Sender(None), "/v1/statement/1")
+    assert hedging.metrics["hedged"] == 1
+
+
+def test_hedging_policy_reuses_its_threads():
+    hedging = HedgingPolicy(initial_delay=1.0)
+    send = Sender(0, 0, 0)
+
+    for _ in range(3):
+        hedging.call(send, "/v1/statement/1")
+
+    assert hedging._workers.workers == 1
+
+
+def test_worker_pool_is_bounded(monkeypatch):
+    monkeypatch.setattr(WorkerPool, "IDLE_TIMEOUT", 0.1)
+    pool = WorkerPool(max_workers=2, name="test")
+    release = threading.Event()
+    done = []
+
+    for number in range(4):
+        pool.submit(lambda number: release.wait(2) and done.append(number), number)
+    assert pool.workers == 2
+
+    release.set()
+    deadline = time.time() + 2
+    while pool.workers and time.time() < deadline:
+        time.sleep(0.01)
+    assert sorted(done) == [0, 1, 2, 3]
+    # the idle workers are stopped
+    assert pool.workers == 0
@@ -0,0 +1,263 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import pytest
+
+from trino import exceptions
+from trino.client import TrinoQuery, TrinoRequest
+from trino.instrumentation import (
+    Histogram,
+    HookDispatcher,
+    MetricsCollector,
+    OpenTelemetryHooks,
+    QueryHooks,
+    prometheus_text,
+)
+from conftest import make_page, make_response
+
+
+class FakeSession(object):
+    """``requests.Session`` answering with the given responses"""
+
+    def __init__(self, *responses):
+        self.headers = {}
+        self._responses = list(responses)
+        self.calls = []
+
+    def _send(self, method, url, **kwargs):
+        self.calls.append((method, url))
+        return self._responses.pop(0)
+
+    def get(self, url, **kwargs):
+        return self._send("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self._send("POST", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self._send("DELETE", url, **kwargs)
+
+
+class Recorder(QueryHooks):
+    def __init__(self):
+        self.events = []
+
+    def on_request_start(self, event):
+        self.events.append(("request_start", event.method))
+
+    def on_request_end(self, event):
+        self.events.append(("request_end", event))
+
+    def on_retry(self, event):
+        self.events.append(("retry", event))
+
+    def on_page(self, event):
+        self.events.append(("page", event))
+
+    def on_query_finish(self, event):
+        self.events.append(("query_finish", event))
+
+    def of(self, name):
+        return [event for kind, event in self.events if kind == name]
+
+
+def make_request(session, hooks, max_attempts=3):
+    return TrinoRequest(
+        "coordinator",
+        8080,
+        "test",
+        http_session=session,
+        max_attempts=max_attempts,
+        handle_retry=exceptions.RetryWithExponentialBackoff(base=0.001, jitter=False),
+        hooks=hooks,
+    )
+
+
+def test_query_events():
+    session = FakeSession(
+        make_response(200, make_page(0)),
+        make_response(503),
+        make_response(200, make_page(1, rows=[1, 2, 3])),
+        make_response(200, make_page(2, rows=[4], last=True)),
+    )
+    recorder = Recorder()
+    metrics = MetricsCollector()
+    query = TrinoQuery(make_request(session, [recorder, metrics]), "SELECT x FROM t")
+
+    assert list(query.execute()) == [[1], [2], [3], [4]]
+
+    requests_ended = recorder.of("request_end")
+    assert [(event.method, event.status_code) for event in requests_ended] == [
+        ("POST", 200), ("GET", 503), ("GET", 200), ("GET", 200)
+    ]
+    assert all(event.elapsed >= 0 and event.bytes > 0 for event in requests_ended[2:])
+    assert recorder.events[0] == ("request_start", "POST")
+
+    retry, = recorder.of("retry")
+    assert retry.attempt == 1
+    assert retry.error is None
+    assert retry.retried
+    assert retry.url.endswith("/v1/statement/executing/query/1")
+
+    pages = recorder.of("page")
+    assert [page.rows for page in pages] == [0, 3, 1]
+    assert [page.number for page in pages] == [1, 2, 3]
+    assert pages[-1].stats["state"] == "FINISHED"
+
+    finished, = recorder.of("query_finish")
+    assert finished.query_id == "query"
+    assert finished.state == "FINISHED"
+    assert finished.error is None
+    assert finished.pages == 3
+    assert finished.rows == 4
+    assert finished.bytes == sum(page.bytes for page in pages)
+    assert finished.queued_seconds == 0.02
+    assert finished.client_seconds <= finished.elapsed
+
+    snapshot = metrics.snapshot()
+    assert snapshot["requests"] == 4
+    assert snapshot["request_errors"] == 1
+    assert snapshot["retries"] == 1
+    assert snapshot["pages"] == 3
+    assert snapshot["rows"] == 4
+    assert snapshot["queries"] == 1
+    assert snapshot["query_errors"] == 0
+    assert snapshot["query_seconds"]["count"] == 1
+
+
+def test_query_failure_event():
+    error = {
+        "message": "line 1:15: Table 't' does not exist",
+        "errorCode": 46,
+        "errorName": "TABLE_NOT_FOUND",
+        "errorType": "USER_ERROR",
+    }
+    session = FakeSession(make_response(200, make_page(0, error=error)))
+    recorder = Recorder()
+    query = TrinoQuery(make_request(session, [recorder]), "SELECT x FROM t")
+
+    with pytest.raises(exceptions.TrinoUserError):
+        query.execute()
+
+    finished, = recorder.of("query_finish")
+    assert finished.state == "FAILED"
+    assert isinstance(finished.error, exceptions.TrinoUserError)
+    assert recorder.of("page") == []
+
+
+def test_cancelled_query_event():
+    session = FakeSession(make_response(200, make_page(0)), make_response(204))
+    recorder = Recorder()
+    query = TrinoQuery(make_request(session, [recorder]), "SELECT x FROM t")
+    query.execute()
+
+    query.cancel()
+
+    finished, = recorder.of("query_finish")
+    assert finished.state == "CANCELLED"
+    assert session.calls[-1] == ("DELETE", "http://coordinator:8080/v1/query/query")
+
+
+def test_hook_errors_are_ignored():
+    class FailingHooks(QueryHooks):
+        def on_page(self, event):
+            raise ValueError("failing hook")
+
+    session = FakeSession(make_response(200, make_page(0, rows=[1], last=True)))
+    query = TrinoQuery(make_request(session, [FailingHooks()]), "SELECT 1")
+
+    assert list(query.execute()) == [[1]]
+
+
+def test_no_hooks():
+    session = FakeSession()
+
+    request = make_request(session, None, max_attempts=1)
+    assert request.hooks is None
+    assert request._get == session.get
+
+    # the methods inherited from QueryHooks are not called
+    dispatcher = HookDispatcher([QueryHooks()])
+    assert not dispatcher.handles("on_page")
+    assert dispatcher.wrap_send(session.get, "GET") == session.get
+    request = make_request(session, [QueryHooks()], max_attempts=1)
+    assert request._get == session.get
+
+
+def test_histogram():
+    histogram = Histogram((0.1, 1.0))
+    assert histogram.percentile(50) is None
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+
+    assert histogram.cumulative_counts() == [(0.1, 2), (1.0, 3), (float("inf"), 4)]
+    assert histogram.percentile(50) == 0.1
+    assert histogram.percentile(75) == 1.0
+    assert histogram.percentile(100) == float("inf")
+    assert histogram.sum == 2.65
+
+
+def test_prometheus_text():
+    metrics = MetricsCollector()
+    recorder = Recorder()
+    session = FakeSession(make_response(200, make_page(0, rows=[1, 2], last=True)))
+    list(TrinoQuery(make_request(session, [metrics, recorder]), "SELECT 1").execute())
+
+    text = prometheus_text(metrics)
+
+    assert "# TYPE trino_client_requests_total counter\ntrino_client_requests_total 1\n" in text
+    assert "trino_client_rows_total 2\n" in text
+    assert "# TYPE trino_client_page_rows histogram\n" in text
+    assert 'trino_client_page_rows_bucket{le="1"} 0\n' in text
+    assert 'trino_client_page_rows_bucket{le="10"} 1\n' in text
+    assert 'trino_client_page_rows_bucket{le="+Inf"} 1\n' in text
+    assert "trino_client_page_rows_count 1\n" in text
+
+    metrics.reset()
+    assert "trino_client_requests_total 0\n" in prometheus_text(metrics)
+
+
+class FakeInstrument(object):
+    def __init__(self):
+        self.values = []
+
+    def add(self, value, attributes=None):
+        self.values.append((value, attributes))
+
+    record = add
+
+
+class FakeMeter(object):
+    def __init__(self):
+        self.instruments = {}
+
+    def create_counter(self, name, unit="", description=""):
+        return self.instruments.setdefault(name, FakeInstrument())
+
+    def create_histogram(self, name, unit="", description=""):
+        return self.instruments.setdefault(name, FakeInstrument())
+
+
+def test_opentelemetry_hooks():
+    meter = FakeMeter()
+    session = FakeSession(make_response(200, make_page(0, rows=[1, 2], last=True)))
+    list(TrinoQuery(make_request(session, [OpenTelemetryHooks(meter)]), "SELECT 1").execute())
+
+    instruments = meter.instruments
+    assert instruments["trino.client.requests"].values == [(1, {"http.method": "POST"})]
+    assert instruments["trino.client.rows"].values == [(2, None)]
+    assert instruments["trino.client.queries"].values == [(1, {"trino.query.state": "FINISHED"})]
+    value, attributes = instruments["trino.client.query_queued_seconds"].values[0]
+    assert value == 0.02
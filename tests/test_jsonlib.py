@@ -0,0 +1,104 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import json
+from collections import OrderedDict
+
+import pytest
+
+from trino import jsonlib
+
+
+CONTENT = json.dumps({
+    "id": "query",
+    "data": [[1, 2.5, None, u"été", True, "NaN"]],
+}).encode("utf-8")
+
+
+@pytest.mark.parametrize("name", list(jsonlib.DECODERS))
+def test_decoders(name):
+    if name != "json":
+        pytest.importorskip(name)
+
+    decode = jsonlib.get_decoder(name)
+
+    assert decode(CONTENT) == json.loads(CONTENT.decode("utf-8"))
+
+
+def test_auto_decoder(monkeypatch):
+    monkeypatch.setattr(jsonlib, "DECODERS", OrderedDict([
+        ("missing", jsonlib._load_module_decoder("missing_json_module")),
+        ("json", jsonlib._load_stdlib_decoder),
+    ]))
+
+    decode = jsonlib.get_decoder("auto")
+
+    assert decode(CONTENT) == json.loads(CONTENT.decode("utf-8"))
+    with pytest.raises(RuntimeError):
+        jsonlib.get_decoder("missing")
+
+
+def test_custom_decoder():
+    def decode(content):
+        return {}
+
+    assert jsonlib.get_decoder(decode) is decode
+
+
+def test_invalid_decoder():
+    with pytest.raises(ValueError):
+        jsonlib.get_decoder("yaml")
+
+
+def split(content, size):
+    return [content[i:i + size] for i in range(0, len(content), size)]
+
+
+@pytest.mark.parametrize("size", [1, 3, 16, len(CONTENT)])
+def test_object_stream(size):
+    content = json.dumps(OrderedDict([
+        ("id", "query"),
+        ("nextUri", "http://coordinator/v1/statement/1"),
+        ("data", [[12345, u"été"], [None, [1, 2]], [{"key": 2.5}, "NaN"]]),
+        ("stats", {"state": "RUNNING"}),
+    ]), ensure_ascii=False).encode("utf-8")
+
+    stream = jsonlib.JSONObjectStream(split(content, size))
+
+    assert stream.read_members(stop_at="data") == {
+        "id": "query",
+        "nextUri": "http://coordinator/v1/statement/1",
+    }
+    assert not stream.finished
+    assert list(stream.iter_array()) == [[12345, u"été"], [None, [1, 2]], [{"key": 2.5}, "NaN"]]
+    assert stream.read_members() == {"stats": {"state": "RUNNING"}}
+    assert stream.finished
+
+
+def test_object_stream_without_array():
+    stream = jsonlib.JSONObjectStream(split(b'{"id": "query", "stats": {}}', 4))
+
+    assert stream.read_members(stop_at="data") == {"id": "query", "stats": {}}
+    assert stream.finished
+
+
+def test_object_stream_truncated():
+    stream = jsonlib.JSONObjectStream(split(b'{"id": "query", "data": [[1], [2', 4))
+
+    stream.read_members(stop_at="data")
+    rows = stream.iter_array()
+    assert next(rows) == [1]
+    with pytest.raises(ValueError):
+        next(rows)
@@ -0,0 +1,262 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import copy
+import gc
+
+import pytest
+import requests
+
+from trino.client import TrinoRequest
+from trino.loadbalancing import (
+    Coordinator,
+    LeastOutstandingPolicy,
+    LoadBalancer,
+    LowestLatencyPolicy,
+    RoundRobinPolicy,
+    parse_coordinators,
+)
+from trino import constants
+from trino.transaction import Transaction
+import trino.exceptions
+from conftest import make_response
+
+
+def query_status(next_uri=None):
+    return {
+        "id": "20210101_000000_00000_xxxxx",
+        "infoUri": "http://coordinator/ui",
+        "nextUri": next_uri,
+        "stats": {},
+    }
+
+
+class FakeHttpSession(object):
+    def __init__(self, responses):
+        self.headers = {}
+        self.urls = []
+        self._responses = responses
+
+    def _send(self, url, **kwargs):
+        self.urls.append(url)
+        response = self._responses(url)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    post = get = delete = _send
+
+
+def test_parse_coordinators():
+    coordinators = parse_coordinators(["a", "b:8081", ("c", 8082)], 8080)
+    assert [(c.host, c.port) for c in coordinators] == [("a", 8080), ("b", 8081), ("c", 8082)]
+
+
+def test_parse_ipv6_coordinators():
+    coordinators = parse_coordinators(["[::1]:8081", "[::1]", "2001:db8::1"], 8080)
+    assert [(c.host, c.port) for c in coordinators] == [
+        ("[::1]", 8081), ("[::1]", 8080), ("[2001:db8::1]", 8080)
+    ]
+
+
+def test_policies():
+    a, b, c = Coordinator("a", 1), Coordinator("b", 1), Coordinator("c", 1)
+
+    round_robin = RoundRobinPolicy()
+    assert [round_robin.select([a, b, c]).host for _ in range(4)] == ["a", "b", "c", "a"]
+
+    a.outstanding, b.outstanding, c.outstanding = 2, 1, 1
+    least_outstanding = LeastOutstandingPolicy()
+    assert {least_outstanding.select([a, b, c]).host for _ in range(2)} == {"b", "c"}
+
+    lowest_latency = LowestLatencyPolicy()
+    a.record_latency(0.3)
+    b.record_latency(0.1)
+    assert lowest_latency.select([a, b, c]) is c
+    c.record_latency(0.2)
+    assert lowest_latency.select([a, b, c]) is b
+
+
+def test_eject_and_health_check():
+    coordinators = parse_coordinators(["a", "b"], 8080)
+    http_session = FakeHttpSession(lambda url: make_response(200, {"starting": False}))
+    balancer = LoadBalancer(
+        coordinators, max_failures=2, health_check_interval=None, http_session=http_session
+    )
+    a, b = coordinators
+
+    balancer.record_failure(a)
+    assert a.available
+    balancer.record_failure(a)
+    assert not a.available
+    assert {balancer.acquire().host for _ in range(3)} == {"b"}
+
+    assert balancer.check_health(a)
+    assert a.available
+    assert http_session.urls == ["http://a:8080/v1/info"]
+
+
+def test_all_coordinators_ejected():
+    coordinators = parse_coordinators(["a"], 8080)
+    balancer = LoadBalancer(coordinators, max_failures=1, health_check_interval=None)
+
+    balancer.record_failure(coordinators[0])
+
+    assert balancer.acquire() is coordinators[0]
+
+
+def test_load_balancer_is_shared_by_copies():
+    balancer = LoadBalancer(parse_coordinators(["a"], 8080), health_check_interval=None)
+    assert copy.deepcopy(balancer) is balancer
+
+
+def test_invalid_policy():
+    with pytest.raises(ValueError):
+        LoadBalancer(parse_coordinators(["a"], 8080), policy="random")
+
+
+def test_request_sticks_to_coordinator():
+    coordinators = parse_coordinators(["a", "b"], 8080)
+    balancer = LoadBalancer(coordinators, health_check_interval=None)
+
+    def responses(url):
+        if url.endswith("/v1/statement"):
+            return make_response(200, query_status(url + "/1"))
+        return make_response(200, query_status())
+
+    http_session = FakeHttpSession(responses)
+    request = TrinoRequest("a", 8080, "test", http_session=http_session, load_balancer=balancer)
+
+    for _ in range(2):
+        request.process(request.post("SELECT 1"))
+        assert sum(c.outstanding for c in coordinators) == 1
+        request.process(request.get(request.next_uri))
+        assert sum(c.outstanding for c in coordinators) == 0
+
+    assert http_session.urls == [
+        "http://a:8080/v1/statement",
+        "http://a:8080/v1/statement/1",
+        "http://b:8080/v1/statement",
+        "http://b:8080/v1/statement/1",
+    ]
+    assert all(c.latency is not None for c in coordinators)
+
+
+def test_transaction_sticks_to_coordinator():
+    coordinators = parse_coordinators(["a", "b"], 8080)
+    balancer = LoadBalancer(coordinators, health_check_interval=None)
+
+    def responses(url):
+        next_uri = url + "/1" if url.endswith("/v1/statement") else None
+        response = make_response(200, query_status(next_uri))
+        response.headers[constants.HEADER_STARTED_TRANSACTION] = "transaction"
+        return response
+
+    http_session = FakeHttpSession(responses)
+    request = TrinoRequest("a", 8080, "test", http_session=http_session, load_balancer=balancer)
+
+    transaction = Transaction(request)
+    transaction.begin()
+    for _ in range(2):
+        request.process(request.post("SELECT 1"))
+        request.process(request.get(request.next_uri))
+    transaction.commit()
+    assert {url.split("/")[2] for url in http_session.urls} == {"a:8080"}
+    assert sum(c.outstanding for c in coordinators) == 0
+
+    # the queries that follow the transaction are balanced again
+    request.process(request.post("SELECT 1"))
+    assert http_session.urls[-1] == "http://b:8080/v1/statement"
+
+
+def test_request_records_failures():
+    coordinators = parse_coordinators(["a", "b"], 8080)
+    balancer = LoadBalancer(coordinators, max_failures=1, health_check_interval=None)
+
+    def responses(url):
+        if url.startswith("http://a"):
+            return make_response(503)
+        return requests.ConnectionError()
+
+    http_session = FakeHttpSession(responses)
+    request = TrinoRequest(
+        "a", 8080, "test", http_session=http_session, load_balancer=balancer, max_attempts=1
+    )
+
+    with pytest.raises(trino.exceptions.Http503Error):
+        request.process(request.post("SELECT 1"))
+    with pytest.raises(requests.ConnectionError):
+        request.post("SELECT 1")
+
+    assert [c.available for c in coordinators] == [False, False]
+    # the next query releases the coordinator of the failed POST
+    request._acquire_coordinator()
+    assert sum(c.outstanding for c in coordinators) == 1
+
+
+def test_abandoned_query_releases_coordinator():
+    coordinators = parse_coordinators(["a"], 8080)
+    balancer = LoadBalancer(coordinators, health_check_interval=None)
+    http_session = FakeHttpSession(lambda url: make_response(200, query_status(url + "/1")))
+    request = TrinoRequest("a", 8080, "test", http_session=http_session, load_balancer=balancer)
+
+    request.process(request.post("SELECT 1"))
+    assert coordinators[0].outstanding == 1
+
+    # the query is not fully fetched nor cancelled
+    del request
+    gc.collect()
+    assert coordinators[0].outstanding == 0
+
+
+def test_redirects_are_sent_to_coordinator():
+    coordinators = parse_coordinators(["a"], 8080)
+    balancer = LoadBalancer(coordinators, max_failures=1, health_check_interval=None)
+
+    class RedirectHandler(object):
+        def handle(self, location):
+            return location
+
+    def responses(url):
+        if url == "http://a:8080/v1/statement":
+            response = make_response(307)
+            response.headers["Location"] = "http://a:8080/v1/statement/redirected"
+            return response
+        return make_response(503)
+
+    http_session = FakeHttpSession(responses)
+    request = TrinoRequest(
+        "a", 8080, "test", http_session=http_session, load_balancer=balancer,
+        redirect_handler=RedirectHandler(), max_attempts=1,
+    )
+
+    request.post("SELECT 1")
+
+    assert http_session.urls == ["http://a:8080/v1/statement", "http://a:8080/v1/statement/redirected"]
+    assert not coordinators[0].available
+
+
+def test_health_checks_stop_with_load_balancer():
+    http_session = FakeHttpSession(lambda url: make_response(200, {"starting": False}))
+    balancer = LoadBalancer(
+        parse_coordinators(["a"], 8080), health_check_interval=0.01, http_session=http_session
+    )
+    health_checker = balancer._health_checker
+
+    # the connection of the load balancer is never closed
+    del balancer
+    gc.collect()
+    health_checker.join(2)
+    assert not health_checker.is_alive()
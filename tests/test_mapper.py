@@ -0,0 +1,128 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import datetime
+import decimal
+import ipaddress
+import math
+import uuid
+
+import pytest
+import pytz
+
+import trino.mapper
+from trino.mapper import create_row_mapper
+from conftest import column, field_argument, long_argument, type_argument
+
+
+@pytest.mark.parametrize("col, value, expected", [
+    (column("a", "bigint"), 1, 1),
+    (column("a", "varchar", long_argument(10)), "text", "text"),
+    (column("a", "double"), 1.5, 1.5),
+    (column("a", "decimal", long_argument(10), long_argument(2)), "12.34", decimal.Decimal("12.34")),
+    (column("a", "varbinary"), "AAEC", b"\x00\x01\x02"),
+    (column("a", "date"), "2021-03-04", datetime.date(2021, 3, 4)),
+    (column("a", "time", long_argument(9)), "01:02:03.123456789", datetime.time(1, 2, 3, 123456)),
+    (
+        column("a", "time with time zone", long_argument(3)),
+        "01:02:03.456-08:00",
+        datetime.time(1, 2, 3, 456000, tzinfo=datetime.timezone(datetime.timedelta(hours=-8))),
+    ),
+    (column("a", "timestamp", long_argument(0)), "2021-03-04 01:02:03", datetime.datetime(2021, 3, 4, 1, 2, 3)),
+    (
+        column("a", "timestamp", long_argument(6)),
+        "2021-03-04 01:02:03.000004",
+        datetime.datetime(2021, 3, 4, 1, 2, 3, 4),
+    ),
+    (
+        column("a", "timestamp with time zone", long_argument(3)),
+        "2021-03-04 01:02:03.456 +05:30",
+        datetime.datetime(
+            2021, 3, 4, 1, 2, 3, 456000,
+            tzinfo=datetime.timezone(datetime.timedelta(hours=5, minutes=30)),
+        ),
+    ),
+    (
+        column("a", "interval day to second"),
+        "-2 03:04:05.678",
+        -datetime.timedelta(days=2, hours=3, minutes=4, seconds=5, milliseconds=678),
+    ),
+    (column("a", "interval year to month"), "1-2", 14),
+    (column("a", "interval year to month"), "-1-2", -14),
+    (
+        column("a", "uuid"),
+        "12151fd2-7586-11e9-8f9e-2a86e4085a59",
+        uuid.UUID("12151fd2-7586-11e9-8f9e-2a86e4085a59"),
+    ),
+    (column("a", "ipaddress"), "10.0.0.1", ipaddress.ip_address(u"10.0.0.1")),
+    (column("a", "array", type_argument("date")), ["2021-03-04", None], [datetime.date(2021, 3, 4), None]),
+    (column("a", "array", type_argument("bigint")), [1, None], [1, None]),
+    (
+        column("a", "map", type_argument("integer"), type_argument("decimal", long_argument(2), long_argument(1))),
+        {"1": "2.5", "2": None},
+        {1: decimal.Decimal("2.5"), 2: None},
+    ),
+    (
+        column("a", "row", field_argument("x", "bigint"), field_argument("y", "date")),
+        [1, "2021-03-04"],
+        (1, datetime.date(2021, 3, 4)),
+    ),
+    (
+        # older coordinators
+        column("a", "row", field_argument("x", "date", "NAMED_TYPE_SIGNATURE")),
+        ["2021-03-04"],
+        (datetime.date(2021, 3, 4),),
+    ),
+])
+def test_row_mapper(col, value, expected):
+    mapper = create_row_mapper([col])
+
+    assert mapper.map_rows([[value], [None]]) == [[expected], [None]]
+
+
+def test_row_mapper_special_floats():
+    mapper = create_row_mapper([column("a", "double"), column("b", "real")])
+
+    (row,) = mapper.map_rows([["NaN", "-Infinity"]])
+
+    assert math.isnan(row[0])
+    assert row[1] == float("-inf")
+
+
+def test_row_mapper_named_time_zone():
+    mapper = create_row_mapper([column("a", "timestamp with time zone", long_argument(3))])
+
+    (row,) = mapper.map_rows([["2021-03-04 01:02:03.456 America/Los_Angeles"]])
+
+    assert row[0] == pytz.timezone("America/Los_Angeles").localize(
+        datetime.datetime(2021, 3, 4, 1, 2, 3, 456000)
+    )
+
+
+def test_row_mapper_iter_rows():
+    mapper = create_row_mapper([column("a", "bigint"), column("b", "date")])
+
+    rows = mapper.iter_rows(iter([[1, "2021-03-04"], [2, None]]))
+
+    assert list(rows) == [[1, datetime.date(2021, 3, 4)], [2, None]]
+
+
+def test_fixed_offset_without_datetime_timezone():
+    # used by Python 2
+    tzinfo = trino.mapper._FixedOffset(datetime.timedelta(hours=-8))
+    value = datetime.datetime(2021, 3, 4, 1, 2, 3, tzinfo=tzinfo)
+
+    assert value.utcoffset() == datetime.timedelta(hours=-8)
+    assert value == datetime.datetime(2021, 3, 4, 9, 2, 3, tzinfo=datetime.timezone.utc)
@@ -0,0 +1,155 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import threading
+import time
+
+import pytest
+
+import trino.exceptions
+from trino.client import TrinoQuery, TrinoRequest, TrinoResult
+from trino.dbapi import Connection
+from trino.parallel import PartitionedQuery, partition_statements
+
+
+def test_partition_statements_range():
+    statements = partition_statements("SELECT * FROM t;", "id", lower=0, upper=10, partitions=3)
+
+    assert statements == [
+        "SELECT * FROM (\nSELECT * FROM t\n) AS partitioned WHERE id < 3 OR id IS NULL",
+        "SELECT * FROM (\nSELECT * FROM t\n) AS partitioned WHERE id >= 3 AND id < 6",
+        "SELECT * FROM (\nSELECT * FROM t\n) AS partitioned WHERE id >= 6",
+    ]
+    statements = partition_statements("SELECT * FROM t", "x", lower=0.0, upper=1.0, partitions=2, ordered=True)
+    assert statements[1].endswith("WHERE x >= DOUBLE '0.5' ORDER BY x")
+
+
+def test_partition_statements_hash():
+    statements = partition_statements("SELECT * FROM t", "name", partitions=2, method="hash")
+
+    assert len(statements) == 2
+    assert statements[1].endswith("9223372036854775807) % 2 = 1")
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"partitions": 0, "lower": 0, "upper": 1},
+    {"lower": None, "upper": 1},
+    {"lower": 1, "upper": 1},
+    {"method": "list"},
+])
+def test_partition_statements_invalid(kwargs):
+    with pytest.raises(ValueError):
+        partition_statements("SELECT * FROM t", "id", **kwargs)
+
+
+PAGES = {
+    "a": [[["a1"], ["a2"]], [["a3"]]],
+    "b": [[["b1"]], [], [["b2"]]],
+}
+
+
+@pytest.fixture
+def fake_partitions(monkeypatch):
+    def execute(query, additional_http_headers=None):
+        if query._sql == "fail":
+            raise trino.exceptions.TrinoUserError("failed", None)
+        pages = list(PAGES[query._sql])
+        query.query_id = query._sql
+        query._columns = [{"name": "value", "type": "varchar"}]
+        query._result = TrinoResult(query, pages.pop(0))
+        query._finished = not pages
+        query.fetch = lambda: finish(query, pages)
+        return query._result
+
+    def finish(query, pages):
+        rows = pages.pop(0)
+        query._finished = not pages
+        return rows
+
+    monkeypatch.setattr(TrinoQuery, "execute", execute)
+
+
+def create_request():
+    return TrinoRequest("coordinator", 8080, "test")
+
+
+def test_partitioned_query_ordered(fake_partitions):
+    query = PartitionedQuery(create_request, ["a", "b"], ordered=True, max_pages=1)
+    result = query.execute()
+    rows = iter(result)
+
+    assert next(rows) == ["a1"]
+    assert result.rownumber == 1
+    assert list(rows) == [["a2"], ["a3"], ["b1"], ["b2"]]
+    assert result.rownumber == 5
+    assert query.columns == [{"name": "value", "type": "varchar"}]
+    assert query.is_finished()
+
+
+def test_partitioned_query_unordered(fake_partitions):
+    query = PartitionedQuery(create_request, ["a", "b"])
+
+    rows = list(query.execute())
+    assert sorted(rows) == [["a1"], ["a2"], ["a3"], ["b1"], ["b2"]]
+    assert rows.index(["a1"]) < rows.index(["a2"]) < rows.index(["a3"])
+
+
+def test_partitioned_query_error(fake_partitions):
+    query = PartitionedQuery(create_request, ["a", "fail"], ordered=True)
+
+    with pytest.raises(trino.exceptions.TrinoUserError):
+        list(query.execute())
+
+
+def test_cursor_execute_partitioned(monkeypatch):
+    executed = []
+
+    def execute(query, additional_http_headers=None):
+        executed.append(query._sql)
+        query._columns = [{"name": "id", "type": "bigint"}]
+        query._finished = True
+        query._result = TrinoResult(query, [[len(executed)]])
+        return query._result
+
+    monkeypatch.setattr(TrinoQuery, "execute", execute)
+    cur = Connection("coordinator", user="test").cursor()
+
+    cur.execute_partitioned("SELECT id FROM t", "id", lower=0, upper=100, partitions=4, ordered=True)
+    assert len(cur.fetchall()) == 4
+    assert cur.description[0][0] == "id"
+    assert len(executed) == 4
+
+
+def test_cursor_close_stops_partitioned_query(monkeypatch):
+    def execute(query, additional_http_headers=None):
+        query._columns = [{"name": "id", "type": "bigint"}]
+        # the result never ends
+        query.fetch = lambda: [[1]]
+        query._result = TrinoResult(query, [[0]])
+        return query._result
+
+    monkeypatch.setattr(TrinoQuery, "execute", execute)
+    cur = Connection("coordinator", user="test").cursor()
+
+    cur.execute_partitioned("SELECT id FROM t", "id", lower=0, upper=100, partitions=2)
+    assert cur.fetchone() in ([0], [1])
+    cur.close()
+
+    deadline = time.time() + 2
+    while time.time() < deadline and any(
+        thread.name.startswith("trino-partition-") for thread in threading.enumerate()
+    ):
+        time.sleep(0.01)
+    assert not [thread for thread in threading.enumerate() if thread.name.startswith("trino-partition-")]
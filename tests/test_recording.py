@@ -0,0 +1,171 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import copy
+import gzip
+import io
+import json
+import time
+
+import pytest
+import requests
+import requests.adapters
+
+import trino.dbapi
+from trino import constants, exceptions
+from trino.client import TrinoQuery, TrinoRequest
+from trino.recording import Exchange, RecordingSession, ReplaySession, load
+from conftest import make_page
+
+
+class CannedAdapter(requests.adapters.BaseAdapter):
+    """Transport adapter answering the requests with the given responses,
+    in order"""
+
+    def __init__(self, *responses):
+        super(CannedAdapter, self).__init__()
+        self.responses = list(responses)
+        self.requests = []
+
+    def send(self, request, **kwargs):
+        self.requests.append(request)
+        status_code, body, headers = self.responses.pop(0)
+        content = json.dumps(body).encode("utf-8") if body is not None else b""
+        response = requests.Response()
+        response.status_code = status_code
+        response.headers = requests.structures.CaseInsensitiveDict(headers or {})
+        response.headers["Content-Length"] = str(len(content))
+        response.raw = io.BytesIO(content)
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+
+def recording_session(*responses):
+    session = RecordingSession()
+    session.mount("http://", CannedAdapter(*responses))
+    return session
+
+
+def make_request(session, **kwargs):
+    return TrinoRequest("coordinator", 8080, "test", http_session=session, **kwargs)
+
+
+def test_record_and_replay(tmp_path):
+    session = recording_session(
+        (200, make_page(0), {constants.HEADER_SET_SESSION: "query_max_run_time=1h"}),
+        (503, None, None),
+        (200, make_page(1, rows=[1, 2, 3]), None),
+        (200, make_page(2, rows=[4], last=True), {"Set-Cookie": "secret"}),
+    )
+    session.headers["Authorization"] = "Basic secret"
+    request = make_request(session, max_attempts=2)
+    assert list(TrinoQuery(request, "SELECT x FROM t").execute()) == [[1], [2], [3], [4]]
+
+    exchanges = session.exchanges
+    assert [(exchange.method, exchange.status_code) for exchange in exchanges] == [
+        ("POST", 200), ("GET", 503), ("GET", 200), ("GET", 200)
+    ]
+    assert exchanges[0].data == "SELECT x FROM t"
+    assert exchanges[0].request_headers[constants.HEADER_USER] == "test"
+    assert exchanges[0].headers[constants.HEADER_SET_SESSION] == "query_max_run_time=1h"
+    assert [exchange.start for exchange in exchanges] == sorted(exchange.start for exchange in exchanges)
+
+    path = str(tmp_path / "traffic.jsonl.gz")
+    session.save(path)
+    with gzip.open(path, "rb") as recording:
+        content = recording.read()
+    assert content.count(b"\n") == 4
+    assert b"secret" not in content
+
+    replay = ReplaySession.load(path)
+    request = make_request(replay, max_attempts=2)
+    assert list(TrinoQuery(request, "SELECT x FROM t").execute()) == [[1], [2], [3], [4]]
+    assert request._client_session.properties == {"query_max_run_time": "1h"}
+
+    # all the recorded responses have been used
+    with pytest.raises(exceptions.HttpError):
+        TrinoQuery(make_request(replay), "SELECT x FROM t").execute()
+
+
+def test_replay_stream_rows(tmp_path):
+    session = recording_session(
+        (200, make_page(0, rows=[1, 2]), None),
+        (200, make_page(1, rows=[3], last=True), None),
+    )
+    assert list(TrinoQuery(make_request(session, stream_rows=True), "SELECT x FROM t").execute()) == [[1], [2], [3]]
+
+    path = str(tmp_path / "traffic.jsonl")
+    session.save(path)
+    replay = ReplaySession(load(path), cycle=True)
+    for _ in range(2):
+        query = TrinoQuery(make_request(replay, stream_rows=True), "SELECT x FROM t")
+        assert list(query.execute()) == [[1], [2], [3]]
+
+
+def test_record_and_replay_prepared_statement():
+    added = {constants.HEADER_ADDED_PREPARE: "st=SELECT ?"}
+    deallocated = {constants.HEADER_DEALLOCATED_PREPARE: "st"}
+    session = recording_session(
+        (200, make_page(0, query_id="prepare"), None),
+        (200, make_page(1, rows=[True], last=True, query_id="prepare"), added),
+        (200, make_page(0, query_id="execute"), None),
+        (200, make_page(0, query_id="deallocate"), None),
+        (200, make_page(1, rows=[True], last=True, query_id="deallocate"), deallocated),
+        (200, make_page(1, rows=[1], last=True, query_id="execute"), None),
+    )
+    cur = trino.dbapi.connect(host="coordinator", user="test", http_session=session).cursor()
+    cur.execute("SELECT ?", params=(1,))
+    assert cur.fetchall() == [[1]]
+
+    exchanges = session.exchanges
+    assert len(exchanges) == 6
+    assert exchanges[0].data.startswith("PREPARE st_")
+    assert exchanges[1].headers[constants.HEADER_ADDED_PREPARE] == "st=SELECT ?"
+    assert exchanges[2].request_headers[constants.HEADER_PREPARED_STATEMENT] == "st=SELECT ?"
+
+    replay = ReplaySession(exchanges)
+    assert copy.deepcopy(replay) is replay
+    cur = trino.dbapi.connect(host="other", user="test", http_session=replay).cursor()
+    # the names of the prepared statements differ from the recorded ones
+    cur.execute("SELECT ?", params=(1,))
+    assert cur.fetchall() == [[1]]
+
+
+def test_exchange_binary_body():
+    exchange = Exchange("GET", "http://coordinator:8080/v1/info", 200, b"\xff\x00")
+
+    copied = Exchange.from_dict(json.loads(json.dumps(exchange.to_dict())))
+
+    assert copied.body == b"\xff\x00"
+    assert copied.to_response().content == b"\xff\x00"
+
+
+def test_replay_speed():
+    exchanges = [Exchange("GET", "http://coordinator:8080/v1/info", 200, b"{}", elapsed=0.2)]
+    with pytest.raises(ValueError):
+        ReplaySession(exchanges, speed=0)
+
+    start = time.time()
+    ReplaySession(exchanges).get("http://coordinator:8080/v1/info")
+    assert time.time() - start < 0.1
+
+    start = time.time()
+    response = ReplaySession(exchanges, speed=2).get("http://coordinator:8080/v1/info")
+    assert time.time() - start >= 0.1
+    assert response.elapsed.total_seconds() == 0.2
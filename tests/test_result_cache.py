@@ -0,0 +1,160 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import pickle
+
+import pytest
+
+import trino.result_cache
+from trino.client import TrinoResult
+from trino.result_cache import DiskBackend, MemoryBackend, ResultCache, is_cacheable, make_key, normalize_sql
+
+
+COLUMNS = [{"name": "id", "type": "bigint"}]
+
+
+def chunks(*rows):
+    return [pickle.dumps(list(rows))]
+
+
+class FinishedQuery(object):
+    """Query whose rows are all in its first page"""
+
+    columns = COLUMNS
+    prefetch_pages = 0
+
+    def map_rows(self, rows):
+        return rows
+
+    def is_finished(self):
+        return True
+
+
+def test_normalize_sql():
+    assert normalize_sql("  SELECT  *\n FROM t -- comment\n WHERE a = 'A  b';") == (
+        "select * from t where a = 'A  b'"
+    )
+    assert normalize_sql('select /* x */ "Col" from t') == 'select "Col" from t'
+    assert normalize_sql("select 'it''s'  ") == "select 'it''s'"
+
+
+@pytest.mark.parametrize("sql, cacheable", [
+    ("select 1", True),
+    ("with t as (select 1) select * from t", True),
+    ("(select 1) union (select 2)", True),
+    ("values 1, 2", True),
+    ("insert into t values 1", False),
+    ("delete from t", False),
+    ("create table t as select 1", False),
+    ("select random()", False),
+    ("select * from t where ts > current_timestamp", False),
+    ("select now()", False),
+])
+def test_is_cacheable(sql, cacheable):
+    assert is_cacheable(normalize_sql(sql)) is cacheable
+
+
+def test_make_key():
+    key = make_key("select ?", [1], catalog="hive", schema="default")
+    assert key == make_key("select ?", [1], schema="default", catalog="hive")
+    assert key != make_key("select ?", [2], catalog="hive", schema="default")
+    assert key != make_key("select ?", [1], catalog="hive", schema="other")
+
+
+def test_result_cache_hits_and_lru_eviction():
+    cache = ResultCache(max_entries=2)
+
+    assert cache.get("a") is None
+    assert cache.put("a", COLUMNS, chunks([1], [2]))
+    assert cache.put("b", COLUMNS, chunks([3]))
+    assert cache.get("a") == (COLUMNS, [[1], [2]])
+    assert cache.put("c", COLUMNS, chunks([4]))
+
+    assert cache.get("b") is None
+    assert cache.get("c") == (COLUMNS, [[4]])
+    assert (cache.hits, cache.misses, cache.evictions) == (2, 2, 1)
+    assert cache.hit_ratio == 0.5
+    assert cache.size == 2
+    assert cache.bytes > 0
+
+    cache.clear()
+    assert (cache.size, cache.bytes) == (0, 0)
+
+
+def test_result_cache_max_bytes():
+    entry_bytes = len(pickle.dumps((COLUMNS, chunks([1])), pickle.HIGHEST_PROTOCOL))
+    cache = ResultCache(max_bytes=entry_bytes * 2)
+
+    assert cache.put("a", COLUMNS, chunks([1]))
+    assert cache.put("b", COLUMNS, chunks([2]))
+    assert cache.put("c", COLUMNS, chunks([3]))
+    assert cache.size == 2
+    assert cache.get("a") is None
+    assert not cache.put("large", COLUMNS, chunks(*[[value] for value in range(100)]))
+
+
+def test_result_cache_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(trino.result_cache.time, "time", lambda: now[0])
+    cache = ResultCache(ttl=10)
+
+    cache.put("a", COLUMNS, chunks([1]))
+    now[0] += 5
+    assert cache.get("a") == (COLUMNS, [[1]])
+    now[0] += 5
+    assert cache.get("a") is None
+    assert cache.size == 0
+
+
+def test_result_cache_memory_backend():
+    backend = MemoryBackend()
+    cache = ResultCache(backend=backend)
+    cache.put("a", COLUMNS, chunks([1]))
+
+    # a new cache reuses the entries of the backend
+    cache = ResultCache(backend=backend)
+    assert cache.size == 1
+    assert cache.bytes == backend.entries()[0][1]
+    assert cache.get("a") == (COLUMNS, [[1]])
+
+    cache.clear()
+    assert backend.entries() == []
+
+
+def test_result_cache_record():
+    rows = [["{:050d}".format(i)] for i in range(10)]
+    cache = ResultCache()
+    assert list(cache.record("a", FinishedQuery(), TrinoResult(None, list(rows)))) == rows
+    assert cache.get("a") == (COLUMNS, rows)
+
+    # the rows exceed the limit only once the last chunk is pickled
+    cache = ResultCache(max_entry_bytes=200)
+    assert list(cache.record("a", FinishedQuery(), TrinoResult(None, list(rows)))) == rows
+    assert cache.get("a") is None
+    assert cache.size == 0
+
+
+def test_result_cache_disk_backend(tmpdir):
+    directory = str(tmpdir.join("cache"))
+    cache = ResultCache(backend=DiskBackend(directory))
+    cache.put("a", COLUMNS, chunks([1], [2]))
+
+    # a new cache reuses the entries of the directory
+    cache = ResultCache(backend=DiskBackend(directory))
+    assert cache.size == 1
+    assert cache.get("a") == (COLUMNS, [[1], [2]])
+
+    cache.clear()
+    assert tmpdir.join("cache").listdir() == []
@@ -0,0 +1,106 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import decimal
+import os
+
+import pytest
+
+from trino.spool import SpooledRows, SpoolWriter, spool
+from conftest import FakeQuery
+
+
+COLUMNS = [
+    {"name": "id", "type": "bigint", "typeSignature": {"rawType": "bigint", "arguments": []}},
+    {"name": "price", "type": "decimal(5,2)", "typeSignature": {"rawType": "decimal", "arguments": []}},
+    {
+        "name": "tags",
+        "type": "array(varchar)",
+        "typeSignature": {
+            "rawType": "array",
+            "arguments": [{"kind": "TYPE", "value": {"rawType": "varchar", "arguments": []}}],
+        },
+    },
+]
+
+
+def make_pages():
+    return [
+        [[1, "1.50", ["a"]], [2, None, []]],
+        [],
+        [[3, "3.25", None], [4, "4.00", ["b", "c"]], [5, "0.01", [u"é"]]],
+    ]
+
+
+def test_spool_random_access(tmpdir):
+    path = str(tmpdir.join("result.spool"))
+    rows = [row for page in make_pages() for row in page]
+
+    with spool(FakeQuery(COLUMNS), make_pages(), path) as spooled:
+        assert spooled.columns == COLUMNS
+        assert len(spooled) == 5
+        assert list(spooled) == rows
+        # iterate again without running the query
+        assert list(spooled) == rows
+        assert spooled[0] == rows[0]
+        assert spooled[-1] == rows[-1]
+        assert spooled[1:4] == rows[1:4]
+        assert spooled[::2] == rows[::2]
+        with pytest.raises(IndexError):
+            spooled[5]
+
+    # the file is kept and can be opened again
+    with SpooledRows(path) as spooled:
+        assert list(spooled) == rows
+
+
+def test_spool_python_types_and_temporary_file():
+    spooled = spool(FakeQuery(COLUMNS), make_pages(), experimental_python_types=True)
+    assert spooled[0] == [1, decimal.Decimal("1.50"), ["a"]]
+    assert spooled[1] == [2, None, []]
+    assert os.path.exists(spooled.path)
+
+    spooled.close()
+    assert not os.path.exists(spooled.path)
+
+
+def test_spool_empty_result(tmpdir):
+    path = str(tmpdir.join("empty.spool"))
+    with spool(FakeQuery(None), [], path) as spooled:
+        assert len(spooled) == 0
+        assert list(spooled) == []
+        assert spooled.columns is None
+
+
+def test_spool_error_removes_file(tmpdir):
+    path = str(tmpdir.join("failed.spool"))
+
+    def pages():
+        yield [[1]]
+        raise RuntimeError("failed")
+
+    with pytest.raises(RuntimeError):
+        spool(FakeQuery(COLUMNS), pages(), path)
+    assert not os.path.exists(path)
+
+
+def test_spooled_rows_incomplete_file(tmpdir):
+    path = str(tmpdir.join("incomplete.spool"))
+    writer = SpoolWriter(path)
+    writer.write_rows([[1], [2]])
+    writer.close()
+
+    with pytest.raises(ValueError):
+        SpooledRows(path)
@@ -0,0 +1,145 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import copy
+import json
+import socket
+import threading
+import zlib
+
+import pytest
+import requests
+
+import trino.dbapi
+from trino.client import TrinoRequest
+from trino.transport import TransportAdapter, TransportConfig
+
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+
+URL = "http://coordinator:8080/v1/statement"
+BODY = json.dumps({
+    "id": "query",
+    "infoUri": "http://coordinator:8080/ui/query.html?query",
+    "data": [[index, "row {}".format(index)] for index in range(1000)],
+    "stats": {"state": "FINISHED"},
+}).encode("utf-8")
+
+
+class CompressingHandler(BaseHTTPRequestHandler):
+    """Answer every POST with ``BODY`` compressed by the server"""
+
+    def do_POST(self):
+        self.server.requests.append(dict(self.headers))
+        self.rfile.read(int(self.headers["Content-Length"]))
+        encoding, compress = self.server.compression
+        body = compress(BODY)
+        self.send_response(200)
+        self.send_header("Content-Encoding", encoding)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def coordinator():
+    server = HTTPServer(("127.0.0.1", 0), CompressingHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_transport_adapter():
+    transport = TransportConfig(pool_connections=4, pool_maxsize=16)
+    session = transport.configure(requests.Session())
+
+    adapter = session.get_adapter(URL)
+    assert adapter.poolmanager.connection_pool_kw["maxsize"] == 16
+    assert (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1) in adapter.poolmanager.connection_pool_kw["socket_options"]
+    assert session.get_adapter("https://coordinator:8443") is adapter
+
+
+def test_transport_accept_encoding():
+    assert "Accept-Encoding" in requests.Session().headers
+    session = TransportConfig(compression=["gzip"]).configure(requests.Session())
+    assert session.headers["Accept-Encoding"] == "gzip"
+
+    session = TransportConfig(compression=[]).configure(requests.Session())
+    assert session.headers["Accept-Encoding"] == "identity"
+
+
+@pytest.mark.parametrize("stream_rows", [False, True])
+def test_transport_zstd(coordinator, stream_rows):
+    zstandard = pytest.importorskip("zstandard")
+    coordinator.compression = ("zstd", zstandard.ZstdCompressor().compress)
+    request = TrinoRequest(
+        host="127.0.0.1",
+        port=coordinator.server_port,
+        user="test",
+        stream_rows=stream_rows,
+        transport=TransportConfig(compression=["zstd", "gzip"]),
+    )
+
+    status = request.process(request.post("SELECT 1"))
+
+    assert coordinator.requests[0]["Accept-Encoding"] == "zstd, gzip"
+    assert list(status.rows) == json.loads(BODY.decode("utf-8"))["data"]
+
+
+def test_transport_custom_decompressor(coordinator):
+    coordinator.compression = ("x-zlib", zlib.compress)
+    transport = TransportConfig(compression=["x-zlib"], decompressors={"x-zlib": zlib.decompressobj})
+    request = TrinoRequest(host="127.0.0.1", port=coordinator.server_port, user="test", transport=transport)
+
+    response = request.post("SELECT 1")
+
+    assert response.headers["Content-Encoding"] == "x-zlib"
+    assert response.content == BODY
+
+
+def test_transport_request_deepcopy(statement_server):
+    request = TrinoRequest(
+        host="127.0.0.1",
+        port=statement_server.server_port,
+        user="test",
+        transport=TransportConfig(compression=["gzip"]),
+    )
+
+    copied = copy.deepcopy(request)
+
+    adapter = copied._http_session.get_adapter(URL)
+    assert isinstance(adapter, TransportAdapter)
+    assert (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1) in adapter.poolmanager.connection_pool_kw["socket_options"]
+
+    # prepared statements copy the request of the cursor
+    conn = trino.dbapi.connect(
+        host="127.0.0.1", port=statement_server.server_port, user="test", transport=TransportConfig()
+    )
+    cur = conn.cursor()
+    cur.execute("SELECT ?", [1])
+    assert cur.fetchall() == [[1]]
+    assert [sql.split(" ")[0] for sql, _ in statement_server.statements] == ["PREPARE", "EXECUTE", "DEALLOCATE"]
@@ -0,0 +1,724 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+This module implements an asyncio counterpart of :mod:`trino.client` and
+:mod:`trino.dbapi` on top of `aiohttp <https://docs.aiohttp.org/>`_.
+
+HTTP requests never block the event loop, including the backoff between
+retries, so that a single process can run many queries concurrently without
+a thread per query. Processing of the responses, session headers and errors
+is shared with :class:`trino.client.TrinoRequest`.
+
+It requires Python 3.6 or later, like aiohttp, and the ``async`` extra: ::
+
+    $ pip install trino[async]
+
+Example: ::
+
+    >> async with trino.aio.connect(host='coordinator', user='test') as conn:
+    >>     cur = conn.cursor()
+    >>     await cur.execute('SELECT * FROM system.runtime.nodes')
+    >>     rows = await cur.fetchall()
+"""
+import asyncio
+import copy
+import functools
+import json
+import ssl
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from typing import Any, Dict, List, Optional, Text, Tuple, Union  # NOQA for mypy types
+
+import trino.client
+import trino.dbapi
+import trino.exceptions
+import trino.logging
+from trino import constants, exceptions, jsonlib
+from trino.auth import BasicAuthentication
+from trino.transaction import NO_TRANSACTION
+
+
+__all__ = [
+    "connect",
+    "AsyncConnection",
+    "AsyncCursor",
+    "AsyncTrinoQuery",
+    "AsyncTrinoRequest",
+    "AsyncTrinoResult",
+]
+
+
+logger = trino.logging.get_logger(__name__)
+
+
+def _check_aiohttp():
+    if aiohttp is None:
+        raise RuntimeError("unable to import aiohttp")
+
+
+class AsyncHttpResponse(object):
+    """
+    Fully read HTTP response with the subset of the ``requests.Response``
+    interface used by :meth:`trino.client.TrinoRequest.process`.
+    """
+
+    def __init__(self, status_code, headers, content):
+        # type: (int, Any, bytes) -> None
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.encoding = "utf-8"
+
+    @property
+    def ok(self):
+        # type: () -> bool
+        return self.status_code < 400
+
+    @property
+    def is_redirect(self):
+        # type: () -> bool
+        return "Location" in self.headers and self.status_code in (
+            301, 302, 303, 307, 308
+        )
+
+    def json(self):
+        return json.loads(self.content.decode(self.encoding))
+
+    def __repr__(self):
+        return "<AsyncHttpResponse [{}]>".format(self.status_code)
+
+
+class AsyncRetryWithExponentialBackoff(exceptions.RetryWithExponentialBackoff):
+    async def retry(self, func, args, kwargs, err, attempt):
+        delay = self._get_delay(attempt)
+        await asyncio.sleep(delay)
+
+
+def async_retry_with(handle_retry, exceptions, conditions, max_attempts):
+    """Coroutine version of :func:`trino.exceptions.retry_with`"""
+    def wrapper(func):
+        @functools.wraps(func)
+        async def decorated(*args, **kwargs):
+            error = None
+            result = None
+            for attempt in range(1, max_attempts + 1):
+                try:
+                    result = await func(*args, **kwargs)
+                    if any(guard(result) for guard in conditions):
+                        await handle_retry.retry(func, args, kwargs, None, attempt)
+                        continue
+                    return result
+                except Exception as err:
+                    error = err
+                    if any(isinstance(err, exc) for exc in exceptions):
+                        await handle_retry.retry(func, args, kwargs, err, attempt)
+                        continue
+                    break
+            logger.info("failed after %s attempts", attempt)
+            if error is not None:
+                raise error
+            return result
+
+        return decorated
+
+    return wrapper
+
+
+def _get_client_timeout(request_timeout):
+    # type: (Union[float, Tuple[float, float]]) -> Any
+    if isinstance(request_timeout, tuple):
+        connect_timeout, read_timeout = request_timeout
+        return aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+    return aiohttp.ClientTimeout(sock_connect=request_timeout, sock_read=request_timeout)
+
+
+def _get_ssl(verify):
+    # type: (Any) -> Any
+    if verify is True:
+        return None
+    if verify is False:
+        return False
+    return ssl.create_default_context(cafile=verify)
+
+
+def _get_auth(auth):
+    # type: (Any) -> Any
+    if auth is None or isinstance(auth, aiohttp.BasicAuth):
+        return auth
+    if isinstance(auth, BasicAuthentication):
+        return aiohttp.BasicAuth(auth._username, auth._password)
+    raise exceptions.NotSupportedError(
+        "authentication {} is not supported by the asyncio client".format(
+            type(auth).__name__
+        )
+    )
+
+
+class AsyncTrinoRequest(trino.client.TrinoRequest):
+    """
+    Manage the HTTP requests of a Trino query without blocking the event loop.
+
+    The parameters are the same as :class:`trino.client.TrinoRequest` except:
+
+    :param http_session: ``aiohttp.ClientSession`` to send the requests with.
+                         If not set, a session is created on the first request
+                         and closed by :meth:`close`.
+    :param auth: :class:`trino.auth.BasicAuthentication` or
+                 ``aiohttp.BasicAuth``. Other authentication methods are
+                 not supported.
+
+    SOCKS proxies set with the ``SOCKS_PROXY`` environment variable, load
+    balancing, hedged requests, hooks and streamed rows are not supported.
+
+    :meth:`post`, :meth:`get` and :meth:`delete` are coroutines. They return
+    the whole HTTP response, that is then handled by
+    :meth:`trino.client.TrinoRequest.process`.
+    """
+
+    HTTP_EXCEPTIONS = (
+        asyncio.TimeoutError,
+    ) + ((aiohttp.ClientConnectionError,) if aiohttp is not None else ())
+
+    def __init__(
+        self,
+        host,  # type: Text
+        port,  # type: int
+        user,  # type: Text
+        source=None,  # type: Text
+        catalog=None,  # type: Text
+        schema=None,  # type: Text
+        session_properties=None,  # type: Optional[Dict[Text, Any]]
+        http_session=None,  # type: Any
+        http_headers=None,  # type: Optional[Dict[Text, Text]]
+        transaction_id=NO_TRANSACTION,  # type: Optional[Text]
+        http_scheme=constants.HTTP,  # type: Text
+        auth=constants.DEFAULT_AUTH,  # type: Optional[Any]
+        redirect_handler=None,
+        max_attempts=constants.DEFAULT_MAX_ATTEMPTS,  # type: int
+        request_timeout=constants.DEFAULT_REQUEST_TIMEOUT,  # type: Union[float, Tuple[float, float]]
+        handle_retry=None,
+        verify=True,  # type: Any
+        prefetch_pages=constants.DEFAULT_PREFETCH_PAGES,  # type: int
+        json_decoder=None,  # type: Optional[Any]
+    ):
+        # type: (...) -> None
+        _check_aiohttp()
+        self._client_session = trino.client.ClientSession(
+            catalog,
+            schema,
+            source,
+            user,
+            session_properties,
+            http_headers,
+            transaction_id,
+        )
+        # raise early if the custom headers override reserved ones
+        self.http_headers
+
+        self._host = host
+        self._port = port
+        self._next_uri = None  # type: Optional[Text]
+        # the features of TrinoRequest that are not supported by the asyncio
+        # client are disabled explicitly: load balancing, hedged requests,
+        # hooks and streamed rows
+        self._load_balancer = None
+        self._lease = None
+        self._hedging = None
+        self._hooks = None
+
+        self._http_session = http_session
+        self._owns_http_session = http_session is None
+        self._exceptions = self.HTTP_EXCEPTIONS
+        if auth and http_scheme == constants.HTTP:
+            raise ValueError("cannot use authentication with HTTP")
+        self._auth = _get_auth(auth)
+        self._ssl = _get_ssl(verify)
+
+        self._redirect_handler = redirect_handler
+        self._request_timeout = request_timeout
+        self._timeout = _get_client_timeout(request_timeout)
+        if handle_retry is None:
+            handle_retry = AsyncRetryWithExponentialBackoff()
+        self._handle_retry = handle_retry
+        self.max_attempts = max_attempts
+        self._http_scheme = http_scheme
+        if prefetch_pages != 0:
+            raise exceptions.NotSupportedError(
+                "prefetch_pages is not supported by the asyncio client"
+            )
+        self.prefetch_pages = prefetch_pages
+        self._json_decoder = jsonlib.get_decoder(json_decoder) if json_decoder is not None else None
+        # responses are read entirely when they are received
+        self._stream_rows = False
+
+    def _send_to_coordinator(self, send, url, **kwargs):
+        raise exceptions.NotSupportedError("load balancing is not supported by the asyncio client")
+
+    def _process_stream(self, http_response):
+        raise exceptions.NotSupportedError("stream_rows is not supported by the asyncio client")
+
+    @property
+    def http_session(self):
+        if self._http_session is None:
+            self._http_session = aiohttp.ClientSession()
+        return self._http_session
+
+    @property
+    def max_attempts(self):
+        # type: () -> int
+        return self._max_attempts
+
+    @max_attempts.setter
+    def max_attempts(self, value):
+        # type: (int) -> None
+        self._max_attempts = value
+        self._get = functools.partial(self._send, "GET")
+        self._post = functools.partial(self._send, "POST")
+        self._delete = functools.partial(self._send, "DELETE")
+        if value == 1:  # No retry
+            return
+
+        with_retry = async_retry_with(
+            self._handle_retry,
+            exceptions=self._exceptions,
+            conditions=(
+                # need retry when there is no exception but the status code is 503
+                lambda response: getattr(response, "status_code", None)
+                == 503,
+            ),
+            max_attempts=self._max_attempts,
+        )
+        self._get = with_retry(self._get)
+        self._post = with_retry(self._post)
+        self._delete = with_retry(self._delete)
+
+    async def _send(self, method, url, headers=None, **kwargs):
+        if headers is not None:
+            # requests drops the headers set to None, aiohttp does not
+            headers = {key: value for key, value in headers.items() if value is not None}
+        async with self.http_session.request(
+            method,
+            url,
+            auth=self._auth,
+            ssl=self._ssl,
+            timeout=self._timeout,
+            headers=headers,
+            **kwargs
+        ) as http_response:
+            content = await http_response.read()
+        return AsyncHttpResponse(http_response.status, http_response.headers, content)
+
+    async def post(self, sql, additional_http_headers=None):
+        data = sql.encode("utf-8")
+        http_headers = self.http_headers
+        if additional_http_headers:
+            # the cached headers are shared with the other requests
+            http_headers = dict(http_headers)
+            http_headers.update(additional_http_headers)
+
+        http_response = await self._post(
+            self.statement_url,
+            data=data,
+            headers=http_headers,
+            allow_redirects=self._redirect_handler is None,
+        )
+        if self._redirect_handler is not None:
+            while http_response is not None and http_response.is_redirect:
+                location = http_response.headers["Location"]
+                url = self._redirect_handler.handle(location)
+                logger.info("redirect %s from %s to %s", http_response.status_code, location, url)
+                http_response = await self._post(
+                    url,
+                    data=data,
+                    headers=http_headers,
+                    allow_redirects=False,
+                )
+        return http_response
+
+    async def get(self, url):
+        return await self._get(url, headers=self.http_headers)
+
+    async def delete(self, url):
+        return await self._delete(url)
+
+    async def close(self):
+        """Close the HTTP session if it was created by this request"""
+        if self._owns_http_session and self._http_session is not None:
+            await self._http_session.close()
+            self._http_session = None
+
+
+class AsyncTrinoResult(object):
+    """
+    Represent the result of a Trino query as an asynchronous iterator on rows.
+    """
+
+    def __init__(self, query, rows=None):
+        self._query = query
+        self._rows = rows or []
+        self._position = 0
+        self._rownumber = 0
+
+    @property
+    def rownumber(self):
+        # type: () -> int
+        return self._rownumber
+
+    @property
+    def response_headers(self):
+        return self._query.response_headers
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while self._position >= len(self._rows):
+            if self._query.is_finished():
+                raise StopAsyncIteration
+            self._rows = self._query.map_rows(await self._query.fetch())
+            self._position = 0
+        row = self._rows[self._position]
+        self._position += 1
+        self._rownumber += 1
+        return row
+
+
+class AsyncTrinoQuery(trino.client.TrinoQuery):
+    """Represent the execution of a SQL statement by Trino with asyncio."""
+
+    def __init__(
+        self,
+        request,  # type: AsyncTrinoRequest
+        sql,  # type: Text
+        experimental_python_types=False,  # type: bool
+    ):
+        # type: (...) -> None
+        super(AsyncTrinoQuery, self).__init__(request, sql, experimental_python_types)
+        self._result = AsyncTrinoResult(self)
+
+    async def execute(self, additional_http_headers=None):
+        # type: (Optional[Dict[Text, Text]]) -> AsyncTrinoResult
+        """Initiate a Trino query by sending the SQL statement
+
+        See :meth:`trino.client.TrinoQuery.execute`.
+        """
+        if self._cancelled:
+            raise exceptions.TrinoUserError("Query has been cancelled", self.query_id)
+
+        response = await self._request.post(self._sql, additional_http_headers)
+        status = self._request.process(response)
+        self._update_initial_state(status)
+        self._result = AsyncTrinoResult(self, self.map_rows(status.rows))
+        return self._result
+
+    async def fetch(self):
+        # type: () -> List[List[Any]]
+        """Continue fetching data for the current query_id"""
+        response = await self._request.get(self._request.next_uri)
+        status = self._request.process(response)
+        self._update_state(status, response)
+        return status.rows
+
+    async def cancel(self):
+        # type: () -> None
+        """Cancel the current query"""
+        if self.query_id is None or self.is_finished():
+            return
+
+        self._cancelled = True
+        logger.debug("cancelling query: %s", self.query_id)
+        response = await self._request.delete(self.cancel_url)
+        logger.info(response)
+        if response.status_code == 204:
+            logger.debug("query cancelled: %s", self.query_id)
+            return
+        self._request.raise_response_error(response)
+
+
+def connect(*args, **kwargs):
+    """Constructor for creating an asyncio connection to the database.
+
+    See class :py:class:`AsyncConnection` for arguments.
+
+    :returns: a :py:class:`AsyncConnection` object.
+    """
+    return AsyncConnection(*args, **kwargs)
+
+
+class AsyncConnection(object):
+    """Asyncio counterpart of :class:`trino.dbapi.Connection`.
+
+    Only the autocommit mode is supported. The cursors of a connection share
+    one ``aiohttp.ClientSession``, which is created by the first call to
+    :meth:`cursor` and closed by :meth:`close`.
+    """
+
+    def __init__(
+        self,
+        host,
+        port=constants.DEFAULT_PORT,
+        user=None,
+        source=constants.DEFAULT_SOURCE,
+        catalog=constants.DEFAULT_CATALOG,
+        schema=constants.DEFAULT_SCHEMA,
+        session_properties=None,
+        http_headers=None,
+        http_scheme=constants.HTTP,
+        auth=constants.DEFAULT_AUTH,
+        redirect_handler=None,
+        max_attempts=constants.DEFAULT_MAX_ATTEMPTS,
+        request_timeout=constants.DEFAULT_REQUEST_TIMEOUT,
+        verify=True,
+        http_session=None,
+        json_decoder=None,
+        experimental_python_types=False,
+    ):
+        _check_aiohttp()
+        self.host = host
+        self.port = port
+        self.user = user
+        self.source = source
+        self.catalog = catalog
+        self.schema = schema
+        if session_properties is not None:
+            # shared by the requests of the connection, which update it with
+            # the session properties set by the queries
+            session_properties = trino.client.VersionedDict(session_properties)
+        self.session_properties = session_properties
+        self.http_headers = http_headers
+        self.http_scheme = http_scheme
+        self.auth = auth
+        self.redirect_handler = redirect_handler
+        self.max_attempts = max_attempts
+        self.request_timeout = request_timeout
+        self.verify = verify
+        self.json_decoder = json_decoder
+        self.experimental_python_types = experimental_python_types
+        self._http_session = http_session
+        self._owns_http_session = http_session is None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        if self._owns_http_session and self._http_session is not None:
+            await self._http_session.close()
+            self._http_session = None
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        raise RuntimeError("no transaction was started")
+
+    def _create_request(self):
+        if self._http_session is None:
+            self._http_session = aiohttp.ClientSession()
+        return AsyncTrinoRequest(
+            self.host,
+            self.port,
+            self.user,
+            self.source,
+            self.catalog,
+            self.schema,
+            self.session_properties,
+            self._http_session,
+            self.http_headers,
+            NO_TRANSACTION,
+            self.http_scheme,
+            self.auth,
+            self.redirect_handler,
+            self.max_attempts,
+            self.request_timeout,
+            verify=self.verify,
+            json_decoder=self.json_decoder,
+        )
+
+    def cursor(self):
+        """Return a new :py:class:`AsyncCursor` object using the connection."""
+        return AsyncCursor(self, self._create_request())
+
+
+class AsyncCursor(object):
+    """Asyncio counterpart of :class:`trino.dbapi.Cursor`.
+
+    The methods that send HTTP requests are coroutines and the cursor is an
+    asynchronous iterator on the rows of the last query. The methods of
+    :class:`trino.dbapi.Cursor` that read the result synchronously, e.g.
+    ``fetch_numpy()`` or ``iter_pages()``, are not available.
+    """
+
+    def __init__(self, connection, request):
+        if not isinstance(connection, AsyncConnection):
+            raise ValueError(
+                "connection must be an AsyncConnection object: {}".format(type(connection))
+            )
+        self._connection = connection
+        self._request = request
+
+        self.arraysize = 1
+        self._iterator = None
+        self._query = None
+
+    # the members of the DBAPI cursor that do not send requests
+    connection = trino.dbapi.Cursor.connection
+    description = trino.dbapi.Cursor.description
+    rowcount = trino.dbapi.Cursor.rowcount
+    stats = trino.dbapi.Cursor.stats
+    warnings = trino.dbapi.Cursor.warnings
+    progress = trino.dbapi.Cursor.progress
+    setinputsizes = trino.dbapi.Cursor.setinputsizes
+    setoutputsize = trino.dbapi.Cursor.setoutputsize
+    _format_prepared_param = trino.dbapi.Cursor._format_prepared_param
+    _generate_unique_statement_name = trino.dbapi.Cursor._generate_unique_statement_name
+
+    def __aiter__(self):
+        return self._iterator
+
+    async def _execute_query(self, sql, additional_http_headers=None):
+        query = AsyncTrinoQuery(self._request, sql=sql)
+        result = await query.execute(additional_http_headers=additional_http_headers)
+        return query, result
+
+    async def _prepare_statement(self, operation, statement_name):
+        sql = 'PREPARE {statement_name} FROM {operation}'.format(
+            statement_name=statement_name,
+            operation=operation
+        )
+        query = AsyncTrinoQuery(self._copy_request(), sql=sql)
+        result = await query.execute()
+        header = await self._wait_for_header(result, constants.HEADER_ADDED_PREPARE)
+        if header is None:
+            raise trino.exceptions.FailedToObtainAddedPrepareHeader
+        return header
+
+    async def _deallocate_prepare_statement(self, added_prepare_header, statement_name):
+        sql = 'DEALLOCATE PREPARE ' + statement_name
+        query = AsyncTrinoQuery(self._copy_request(), sql=sql)
+        result = await query.execute(
+            additional_http_headers={
+                constants.HEADER_PREPARED_STATEMENT: added_prepare_header
+            }
+        )
+        header = await self._wait_for_header(result, constants.HEADER_DEALLOCATED_PREPARE)
+        if header is None:
+            raise trino.exceptions.FailedToObtainDeallocatedPrepareHeader
+        return header
+
+    async def _wait_for_header(self, result, header):
+        # Iterate until the header is found or until there are no more results
+        async for _ in result:
+            response_headers = result.response_headers
+            if header in response_headers:
+                return response_headers[header]
+        return None
+
+    def _copy_request(self):
+        # Copy the _request object to avoid poluting the one that is going to
+        # be used to execute the actual operation. The aiohttp session cannot
+        # be deep copied and is shared with the copy.
+        request = copy.copy(self._request)
+        request._client_session = copy.deepcopy(self._request._client_session)
+        return request
+
+    async def execute(self, operation, params=None):
+        if params:
+            assert isinstance(params, (list, tuple)), (
+                'params must be a list or tuple containing the query '
+                'parameter values'
+            )
+
+            statement_name = self._generate_unique_statement_name()
+            added_prepare_header = await self._prepare_statement(
+                operation, statement_name
+            )
+            try:
+                sql = 'EXECUTE ' + statement_name + ' USING ' + ','.join(
+                    map(self._format_prepared_param, params)
+                )
+                self._query = AsyncTrinoQuery(
+                    self._request, sql=sql,
+                    experimental_python_types=self._connection.experimental_python_types,
+                )
+                result = await self._query.execute(
+                    additional_http_headers={
+                        constants.HEADER_PREPARED_STATEMENT: added_prepare_header
+                    }
+                )
+            finally:
+                await self._deallocate_prepare_statement(added_prepare_header, statement_name)
+        else:
+            self._query = AsyncTrinoQuery(
+                self._request, sql=operation,
+                experimental_python_types=self._connection.experimental_python_types,
+            )
+            result = await self._query.execute()
+        self._iterator = result
+        return result
+
+    async def executemany(self, operation, seq_of_params):
+        raise trino.exceptions.NotSupportedError
+
+    async def fetchone(self):
+        # type: () -> Optional[List[Any]]
+        try:
+            return await self._iterator.__anext__()
+        except StopAsyncIteration:
+            return None
+        except trino.exceptions.HttpError as err:
+            raise trino.exceptions.OperationalError(str(err))
+
+    async def fetchmany(self, size=None):
+        # type: (Optional[int]) -> List[List[Any]]
+        if size is None:
+            size = self.arraysize
+
+        result = []
+        for _ in range(size):
+            row = await self.fetchone()
+            if row is None:
+                break
+            result.append(row)
+
+        return result
+
+    async def fetchall(self):
+        # type: () -> List[List[Any]]
+        result = []
+        while True:
+            row = await self.fetchone()
+            if row is None:
+                return result
+            result.append(row)
+
+    def genall(self):
+        return self._iterator
+
+    async def cancel(self):
+        if self._query is None:
+            raise trino.exceptions.OperationalError(
+                "Cancel query failed; no running query"
+            )
+        await self._query.cancel()
+
+    async def close(self):
+        """The HTTP session is owned by the connection, see
+        :meth:`AsyncConnection.close`"""
+        pass
@@ -0,0 +1,195 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+This module converts the pages of a query result into Apache Arrow record
+batches with `pyarrow <https://arrow.apache.org/docs/python/>`_.
+
+The Arrow schema is derived from the ``typeSignature`` of the columns of the
+query. Each page returned by the coordinator becomes one
+``pyarrow.RecordBatch``, so that only one page is held in memory at a time
+when the batches are streamed.
+
+Types without an Arrow counterpart, e.g. ``interval`` or
+``timestamp with time zone``, are returned as strings.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import decimal
+import json
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Text  # NOQA for mypy types
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+from trino import datatypes
+
+
+__all__ = ["get_schema", "iter_record_batches", "to_table"]
+
+
+MAX_TIMESTAMP_PRECISION = 9
+DEFAULT_TIMESTAMP_PRECISION = 3
+
+
+def _check_pyarrow():
+    if pyarrow is None:
+        raise RuntimeError("unable to import pyarrow")
+
+
+def _parse_float(value):
+    # Trino sends NaN and infinity values as strings
+    return float(value)
+
+
+def _to_string(value):
+    if isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+class ArrowColumnType(object):
+    """
+    Arrow type of a column and the conversion of its values.
+
+    :param arrow_type: ``pyarrow.DataType`` of the column.
+    :param convert: function converting a non NULL value decoded from JSON
+                    into a value accepted by ``pyarrow.array``. ``None`` when
+                    the values can be used as is.
+    :param cast_from_string: when true, the values are strings that Arrow
+                             parses with a cast, which is faster than
+                             converting each value in Python.
+    """
+
+    def __init__(self, arrow_type, convert=None, cast_from_string=False):
+        self.arrow_type = arrow_type
+        self.convert = convert
+        self.cast_from_string = cast_from_string
+
+    def convert_value(self, value):
+        if value is None or self.convert is None:
+            return value
+        return self.convert(value)
+
+    def to_arrow(self, values):
+        # type: (List[Any]) -> Any
+        if self.cast_from_string:
+            return pyarrow.array(values, type=pyarrow.string()).cast(self.arrow_type)
+        if self.convert is not None:
+            convert = self.convert
+            values = [None if value is None else convert(value) for value in values]
+        return pyarrow.array(values, type=self.arrow_type)
+
+
+def get_column_type(signature):
+    # type: (Dict[Text, Any]) -> ArrowColumnType
+    raw_type = signature["rawType"]
+    if raw_type == "boolean":
+        return ArrowColumnType(pyarrow.bool_())
+    if raw_type == "tinyint":
+        return ArrowColumnType(pyarrow.int8())
+    if raw_type == "smallint":
+        return ArrowColumnType(pyarrow.int16())
+    if raw_type == "integer":
+        return ArrowColumnType(pyarrow.int32())
+    if raw_type == "bigint":
+        return ArrowColumnType(pyarrow.int64())
+    if raw_type == "real":
+        return ArrowColumnType(pyarrow.float32(), _parse_float)
+    if raw_type == "double":
+        return ArrowColumnType(pyarrow.float64(), _parse_float)
+    if raw_type == "decimal":
+        precision, scale = datatypes.get_long_arguments(signature)
+        return ArrowColumnType(pyarrow.decimal128(precision, scale), decimal.Decimal)
+    if raw_type in ("varchar", "char", "json", "uuid", "ipaddress"):
+        return ArrowColumnType(pyarrow.string())
+    if raw_type == "varbinary":
+        return ArrowColumnType(pyarrow.binary(), datatypes.parse_binary)
+    if raw_type == "date":
+        return ArrowColumnType(pyarrow.date32(), datatypes.parse_date, cast_from_string=True)
+    if raw_type == "time":
+        return ArrowColumnType(pyarrow.time64("us"), datatypes.parse_time)
+    if raw_type == "timestamp":
+        precision = (datatypes.get_long_arguments(signature) or [DEFAULT_TIMESTAMP_PRECISION])[0]
+        if precision <= MAX_TIMESTAMP_PRECISION:
+            unit = "ms" if precision <= 3 else "us" if precision <= 6 else "ns"
+            return ArrowColumnType(pyarrow.timestamp(unit), datatypes.parse_timestamp, cast_from_string=True)
+    if raw_type == "array":
+        element_type = get_column_type(datatypes.get_type_arguments(signature)[0])
+        return ArrowColumnType(
+            pyarrow.list_(element_type.arrow_type),
+            lambda value: [element_type.convert_value(element) for element in value],
+        )
+    if raw_type == "map":
+        key_type, value_type = (get_column_type(argument) for argument in datatypes.get_type_arguments(signature))
+        return ArrowColumnType(
+            pyarrow.map_(key_type.arrow_type, value_type.arrow_type),
+            lambda value: [
+                (key_type.convert_value(key), value_type.convert_value(item))
+                for key, item in value.items()
+            ],
+        )
+    if raw_type == "row":
+        fields = [(name, get_column_type(field_signature)) for name, field_signature in datatypes.get_fields(signature)]
+        return ArrowColumnType(
+            pyarrow.struct([(name, field_type.arrow_type) for name, field_type in fields]),
+            lambda value: {
+                name: field_type.convert_value(item)
+                for (name, field_type), item in zip(fields, value)
+            },
+        )
+    return ArrowColumnType(pyarrow.string(), _to_string)
+
+
+def get_schema(columns):
+    # type: (List[Dict[Text, Any]]) -> Any
+    """Return the ``pyarrow.Schema`` of the columns of a query"""
+    _check_pyarrow()
+    return pyarrow.schema([
+        (column["name"], get_column_type(datatypes.get_signature(column)).arrow_type)
+        for column in columns
+    ])
+
+
+def iter_record_batches(query, pages):
+    # type: (Any, Iterable[List[List[Any]]]) -> Iterator[Any]
+    """Convert each non empty page into a ``pyarrow.RecordBatch``
+
+    :param query: :class:`trino.client.TrinoQuery` that returns the pages.
+                  Its columns are known after the first page is fetched.
+    :param pages: iterable on the lists of rows of each page.
+    """
+    _check_pyarrow()
+    schema = None
+    column_types = []  # type: List[ArrowColumnType]
+    for rows in pages:
+        if not rows:
+            continue
+        if schema is None:
+            schema = get_schema(query.columns)
+            column_types = [get_column_type(datatypes.get_signature(column)) for column in query.columns]
+        arrays = [
+            column_type.to_arrow([row[index] for row in rows])
+            for index, column_type in enumerate(column_types)
+        ]
+        yield pyarrow.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def to_table(query, pages):
+    # type: (Any, Iterable[List[List[Any]]]) -> Any
+    """Convert all the pages into a ``pyarrow.Table``"""
+    batches = list(iter_record_batches(query, pages))
+    return pyarrow.Table.from_batches(batches, schema=get_schema(query.columns or []))
@@ -34,17 +34,28 @@ The main interface is :class:`TrinoQuery`: ::
 """
 from __future__ import absolute_import, division, print_function
 
-import copy
+import functools
+import itertools
 import os
-from typing import Any, Dict, List, Optional, Text, Tuple, Union  # NOQA for mypy types
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Text, Tuple, Union  # NOQA for mypy types
 
+import trino.instrumentation
 import trino.logging
+import trino.transport
 import requests
-from trino import constants, exceptions
+from trino import constants, exceptions, jsonlib, mapper
 from trino.transaction import NO_TRANSACTION
 
+try:
+    import queue
+except ImportError:
+    # Python 2
+    import Queue as queue  # type: ignore
 
-__all__ = ["TrinoQuery", "TrinoRequest"]
+
+__all__ = ["Page", "QueryExecutor", "QueryProgress", "TrinoQuery", "TrinoRequest"]
 
 
 logger = trino.logging.get_logger(__name__)
@@ -58,7 +69,55 @@ else:
     PROXIES = None
 
 
+class VersionedDict(dict):
+    """``dict`` that counts its modifications in :attr:`version`, so that
+    values computed from its items can be cached"""
+
+    version = 0
+
+    def __setitem__(self, key, value):
+        super(VersionedDict, self).__setitem__(key, value)
+        self.version += 1
+
+    def __delitem__(self, key):
+        super(VersionedDict, self).__delitem__(key)
+        self.version += 1
+
+    def pop(self, *args):
+        self.version += 1
+        return super(VersionedDict, self).pop(*args)
+
+    def popitem(self):
+        self.version += 1
+        return super(VersionedDict, self).popitem()
+
+    def setdefault(self, key, default=None):
+        self.version += 1
+        return super(VersionedDict, self).setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        super(VersionedDict, self).update(*args, **kwargs)
+        self.version += 1
+
+    def clear(self):
+        super(VersionedDict, self).clear()
+        self.version += 1
+
+
 class ClientSession(object):
+    """
+    State of the session of a client sent in the headers of each request.
+
+    The headers are computed once and cached until the catalog, the schema,
+    the source, the user, the transaction id, the session properties or the
+    custom headers change.
+
+    *properties* and *headers* are kept as they are, e.g. to share the
+    session properties between the requests of a connection. The
+    modifications of :class:`VersionedDict` instances are counted, while the
+    items of plain dicts are compared to tell whether the headers changed.
+    """
+
     def __init__(
         self,
         catalog,
@@ -69,15 +128,68 @@ class ClientSession(object):
         headers=None,
         transaction_id=None,
     ):
-        self.catalog = catalog
-        self.schema = schema
-        self.source = source
-        self.user = user
-        if properties is None:
-            properties = {}
-        self._properties = properties
-        self._headers = headers or {}
-        self.transaction_id = transaction_id
+        self._version = 0
+        self._catalog = catalog
+        self._schema = schema
+        self._source = source
+        self._user = user
+        self._properties = properties if properties is not None else VersionedDict()
+        self._headers = headers if headers is not None else VersionedDict()
+        self._transaction_id = transaction_id
+        self._http_headers = None  # type: Optional[Dict[Text, Text]]
+        self._http_headers_version = None  # type: Optional[Tuple[int, Any, Any]]
+
+    @staticmethod
+    def _version_of(values):
+        # type: (Dict[Text, Any]) -> Any
+        if isinstance(values, VersionedDict):
+            return values.version
+        return tuple(values.items())
+
+    @property
+    def catalog(self):
+        return self._catalog
+
+    @catalog.setter
+    def catalog(self, value):
+        self._catalog = value
+        self._version += 1
+
+    @property
+    def schema(self):
+        return self._schema
+
+    @schema.setter
+    def schema(self, value):
+        self._schema = value
+        self._version += 1
+
+    @property
+    def source(self):
+        return self._source
+
+    @source.setter
+    def source(self, value):
+        self._source = value
+        self._version += 1
+
+    @property
+    def user(self):
+        return self._user
+
+    @user.setter
+    def user(self, value):
+        self._user = value
+        self._version += 1
+
+    @property
+    def transaction_id(self):
+        return self._transaction_id
+
+    @transaction_id.setter
+    def transaction_id(self, value):
+        self._transaction_id = value
+        self._version += 1
 
     @property
     def properties(self):
@@ -87,6 +199,42 @@ class ClientSession(object):
     def headers(self):
         return self._headers
 
+    @property
+    def http_headers(self):
+        # type: () -> Dict[Text, Text]
+        """Headers of the requests, shared by all of them until the session
+        changes: it must not be modified"""
+        version = (self._version, self._version_of(self._properties), self._version_of(self._headers))
+        if self._http_headers is None or version != self._http_headers_version:
+            self._http_headers = self._get_http_headers()
+            self._http_headers_version = version
+        return self._http_headers
+
+    def _get_http_headers(self):
+        # type: () -> Dict[Text, Text]
+        headers = {}
+
+        headers[constants.HEADER_CATALOG] = self.catalog
+        headers[constants.HEADER_SCHEMA] = self.schema
+        headers[constants.HEADER_SOURCE] = self.source
+        headers[constants.HEADER_USER] = self.user
+
+        headers[constants.HEADER_SESSION] = ",".join(
+            # ``name`` must not contain ``=``
+            "{}={}".format(name, value)
+            for name, value in self.properties.items()
+        )
+
+        # merge custom http headers
+        for key in self.headers:
+            if key in headers.keys():
+                raise ValueError("cannot override reserved HTTP header {}".format(key))
+        headers.update(self.headers)
+
+        headers[constants.HEADER_TRANSACTION] = self.transaction_id
+
+        return headers
+
 
 def get_header_values(headers, header):
     return [val.strip() for val in headers[header].split(",")]
@@ -110,17 +258,71 @@ class TrinoStatus(object):
     def __repr__(self):
         return (
             "TrinoStatus("
-            "id={}, stats={{...}}, warnings={}, info_uri={}, next_uri={}, rows=<count={}>"
+            "id={}, stats={{...}}, warnings={}, info_uri={}, next_uri={}, rows=<{}>"
             ")".format(
                 self.id,
                 len(self.warnings),
                 self.info_uri,
                 self.next_uri,
-                len(self.rows),
+                "streamed" if isinstance(self.rows, StreamedRows) else "count={}".format(len(self.rows)),
             )
         )
 
 
+class StreamedRows(object):
+    """
+    Iterator on the rows of a page that are parsed while the body of the
+    response is received.
+
+    The members of the response that follow ``data``, such as ``stats``, are
+    only known once all the rows have been read. They then update the
+    :class:`TrinoStatus` of the page, and the callbacks added with
+    :meth:`add_done_callback` are called.
+    """
+
+    def __init__(self, request, http_response, parser, status):
+        # type: (TrinoRequest, Any, jsonlib.JSONObjectStream, TrinoStatus) -> None
+        self._request = request
+        self._http_response = http_response
+        self._parser = parser
+        self._status = status
+        self._callbacks = []  # type: List[Any]
+        self._done = False
+        self._rows = self._parse()
+
+    @property
+    def done(self):
+        # type: () -> bool
+        return self._done
+
+    def _parse(self):
+        try:
+            for row in self._parser.iter_array():
+                yield row
+            self._request._process_trailer(self._status, self._parser.read_members())
+        finally:
+            self._http_response.close()
+        self._done = True
+        for callback in self._callbacks:
+            callback()
+
+    def add_done_callback(self, callback):
+        """Call ``callback`` once all the rows have been read, or now if
+        they already have been"""
+        if self._done:
+            callback()
+        else:
+            self._callbacks.append(callback)
+
+    def __iter__(self):
+        return self._rows
+
+    def __next__(self):
+        return next(self._rows)
+
+    next = __next__  # Python 2
+
+
 class TrinoRequest(object):
     """
     Manage the HTTP requests of a Trino query.
@@ -157,6 +359,32 @@ class TrinoRequest(object):
     :request_timeout: How long (in seconds) to wait for the server to send
                       data before giving up, as a float or a
                       ``(connect timeout, read timeout)`` tuple.
+    :prefetch_pages: number of pages to fetch ahead of the consumer in a
+                     background thread while iterating over a result. ``0``
+                     disables prefetching.
+    :json_decoder: function decoding the JSON body of the responses from
+                   ``bytes``, or the name of one of the decoders of
+                   :mod:`trino.jsonlib` such as ``"orjson"`` or ``"auto"``.
+                   ``None`` uses ``requests.Response.json``.
+    :stream_rows: read the responses as they are received and parse the rows
+                  of each page one at a time instead of decoding the whole
+                  body first. The rows of :class:`TrinoStatus` are then a
+                  :class:`StreamedRows` iterator. It lowers the memory used by
+                  large pages and the time to the first row. *json_decoder*
+                  does not apply to the streamed responses.
+    :transport: :class:`trino.transport.TransportConfig` of the HTTP session
+                created by the request: connection pools, socket options
+                and compression. It is ignored when *http_session* is
+                given.
+    :load_balancer: :class:`trino.loadbalancing.LoadBalancer` that picks the
+                    coordinator of each query sent by :meth:`post`. The
+                    following requests of the query go to the same
+                    coordinator. *host* and *port* are ignored.
+    :hedging: :class:`trino.hedging.HedgingPolicy` that sends the GET of a
+              ``nextUri`` a second time when it is slower than a percentile
+              of the recent requests, and uses the first response.
+    :hooks: objects called during the lifecycle of the queries, see
+            :mod:`trino.instrumentation`.
 
     The client initiates a query by sending an HTTP POST to the
     coordinator. It then gets a response back from the coordinator with:
@@ -186,6 +414,9 @@ class TrinoRequest(object):
 
     http = requests
 
+    # size of the chunks read from the responses when streaming rows
+    STREAM_CHUNK_SIZE = 64 * 1024
+
     HTTP_EXCEPTIONS = (
         http.ConnectionError,  # type: ignore
         http.Timeout,  # type: ignore
@@ -209,7 +440,14 @@ class TrinoRequest(object):
         max_attempts=MAX_ATTEMPTS,  # type: int
         request_timeout=constants.DEFAULT_REQUEST_TIMEOUT,  # type: Union[float, Tuple[float, float]]
         handle_retry=exceptions.RetryWithExponentialBackoff(),
-        verify=True     # type: Any
+        verify=True,     # type: Any
+        prefetch_pages=constants.DEFAULT_PREFETCH_PAGES,  # type: int
+        load_balancer=None,  # type: Optional[Any]
+        json_decoder=None,  # type: Optional[Any]
+        stream_rows=False,  # type: bool
+        transport=None,  # type: Optional[Any]
+        hedging=None,  # type: Optional[Any]
+        hooks=None,  # type: Optional[List[Any]]
     ):
         # type: (...) -> None
         self._client_session = ClientSession(
@@ -225,6 +463,12 @@ class TrinoRequest(object):
         self._host = host
         self._port = port
         self._next_uri = None  # type: Optional[Text]
+        self._load_balancer = load_balancer
+        # coordinator picked by the load balancer for the current query
+        self._lease = None  # type: Optional[Any]
+        # coordinator of the last query, which runs the queries of the
+        # transaction it started
+        self._coordinator = None  # type: Optional[Any]
 
         if http_session is not None:
             self._http_session = http_session
@@ -232,6 +476,8 @@ class TrinoRequest(object):
             # mypy cannot follow module import
             self._http_session = self.http.Session()  # type: ignore
             self._http_session.verify = verify
+            if transport is not None:
+                transport.configure(self._http_session)
         self._http_session.headers.update(self.http_headers)
         self._exceptions = self.HTTP_EXCEPTIONS
         self._auth = auth
@@ -244,8 +490,15 @@ class TrinoRequest(object):
         self._redirect_handler = redirect_handler
         self._request_timeout = request_timeout
         self._handle_retry = handle_retry
+        self._hooks = trino.instrumentation.HookDispatcher(hooks) if hooks else None
         self.max_attempts = max_attempts
         self._http_scheme = http_scheme
+        if prefetch_pages < 0:
+            raise ValueError("prefetch_pages must be positive or 0")
+        self.prefetch_pages = prefetch_pages
+        self._json_decoder = jsonlib.get_decoder(json_decoder) if json_decoder is not None else None
+        self._stream_rows = stream_rows
+        self._hedging = hedging
 
     @property
     def transaction_id(self):
@@ -258,29 +511,14 @@ class TrinoRequest(object):
     @property
     def http_headers(self):
         # type: () -> Dict[Text, Text]
-        headers = {}
-
-        headers[constants.HEADER_CATALOG] = self._client_session.catalog
-        headers[constants.HEADER_SCHEMA] = self._client_session.schema
-        headers[constants.HEADER_SOURCE] = self._client_session.source
-        headers[constants.HEADER_USER] = self._client_session.user
-
-        headers[constants.HEADER_SESSION] = ",".join(
-            # ``name`` must not contain ``=``
-            "{}={}".format(name, value)
-            for name, value in self._client_session.properties.items()
-        )
+        """Headers sent with each request, cached by the
+        :class:`ClientSession`. The returned dict must not be modified."""
+        return self._client_session.http_headers
 
-        # merge custom http headers
-        for key in self._client_session.headers:
-            if key in headers.keys():
-                raise ValueError("cannot override reserved HTTP header {}".format(key))
-        headers.update(self._client_session.headers)
-
-        transaction_id = self._client_session.transaction_id
-        headers[constants.HEADER_TRANSACTION] = transaction_id
-
-        return headers
+    @property
+    def hooks(self):
+        # type: () -> Optional[trino.instrumentation.HookDispatcher]
+        return self._hooks
 
     @property
     def max_attempts(self):
@@ -291,14 +529,24 @@ class TrinoRequest(object):
     def max_attempts(self, value):
         # type: (int) -> None
         self._max_attempts = value
-        if value == 1:  # No retry
-            self._get = self._http_session.get
-            self._post = self._http_session.post
-            self._delete = self._http_session.delete
+        get = self._http_session.get
+        post = self._http_session.post
+        delete = self._http_session.delete
+        handle_retry = self._handle_retry
+        if self._hooks is not None:
+            get = self._hooks.wrap_send(get, "GET")
+            post = self._hooks.wrap_send(post, "POST")
+            delete = self._hooks.wrap_send(delete, "DELETE")
+            handle_retry = self._hooks.wrap_retry(handle_retry)
+        # a retry policy also applies its circuit breaker to single attempts
+        if value == 1 and not isinstance(self._handle_retry, exceptions.RetryPolicy):  # No retry
+            self._get = get
+            self._post = post
+            self._delete = delete
             return
 
         with_retry = exceptions.retry_with(
-            self._handle_retry,
+            handle_retry,
             exceptions=self._exceptions,
             conditions=(
                 # need retry when there is no exception but the status code is 503
@@ -307,9 +555,9 @@ class TrinoRequest(object):
             ),
             max_attempts=self._max_attempts,
         )
-        self._get = with_retry(self._http_session.get)
-        self._post = with_retry(self._http_session.post)
-        self._delete = with_retry(self._http_session.delete)
+        self._get = with_retry(get)
+        self._post = with_retry(post)
+        self._delete = with_retry(delete)
 
     def get_url(self, path):
         # type: (Text) -> Text
@@ -329,47 +577,94 @@ class TrinoRequest(object):
 
     def post(self, sql, additional_http_headers=None):
         data = sql.encode("utf-8")
-        # Deep copy of the http_headers dict since they may be modified for this
-        # request by the provided additional_http_headers
-        http_headers = copy.deepcopy(self.http_headers)
+        http_headers = self.http_headers
+        if additional_http_headers:
+            # the cached headers are shared with the other requests
+            http_headers = dict(http_headers)
+            http_headers.update(additional_http_headers)
 
-        # Update the request headers with the additional_http_headers
-        http_headers.update(additional_http_headers or {})
+        if self._load_balancer is not None:
+            self._acquire_coordinator()
 
-        http_response = self._post(
+        http_response = self._send_to_coordinator(
+            self._post,
             self.statement_url,
             data=data,
             headers=http_headers,
             timeout=self._request_timeout,
             allow_redirects=self._redirect_handler is None,
             proxies=PROXIES,
+            stream=self._stream_rows,
         )
         if self._redirect_handler is not None:
             while http_response is not None and http_response.is_redirect:
                 location = http_response.headers["Location"]
                 url = self._redirect_handler.handle(location)
                 logger.info("redirect %s from %s to %s", http_response.status_code, location, url)
-                http_response = self._post(
+                http_response = self._send_to_coordinator(
+                    self._post,
                     url,
                     data=data,
                     headers=http_headers,
                     timeout=self._request_timeout,
                     allow_redirects=False,
                     proxies=PROXIES,
+                    stream=self._stream_rows,
                 )
         return http_response
 
     def get(self, url):
-        return self._get(
+        send = self._get
+        if self._hedging is not None:
+            # fetching a nextUri again returns the same page
+            send = functools.partial(self._hedging.call, self._get)
+        return self._send_to_coordinator(
+            send,
             url,
             headers=self.http_headers,
             timeout=self._request_timeout,
             proxies=PROXIES,
+            stream=self._stream_rows,
         )
 
     def delete(self, url):
         return self._delete(url, timeout=self._request_timeout, proxies=PROXIES)
 
+    def _acquire_coordinator(self):
+        # release the coordinator of a previous query that was not fully
+        # processed, e.g. because it was cancelled
+        self._release_coordinator()
+        coordinator = None
+        if self.transaction_id not in (None, NO_TRANSACTION):
+            # a transaction is only known to the coordinator that started it
+            coordinator = self._coordinator
+        self._lease = self._load_balancer.lease(coordinator)
+        self._coordinator = self._lease.coordinator
+        self._host = self._lease.coordinator.host
+        self._port = self._lease.coordinator.port
+
+    def _release_coordinator(self):
+        if self._lease is not None:
+            self._lease.release()
+            self._lease = None
+
+    def _send_to_coordinator(self, send, url, **kwargs):
+        if self._lease is None:
+            return send(url, **kwargs)
+
+        coordinator = self._lease.coordinator
+        start = time.time()
+        try:
+            http_response = send(url, **kwargs)
+        except self.HTTP_EXCEPTIONS:
+            self._load_balancer.record_failure(coordinator)
+            raise
+        if getattr(http_response, "status_code", None) == 503:
+            self._load_balancer.record_failure(coordinator)
+        else:
+            self._load_balancer.record_success(coordinator, time.time() - start)
+        return http_response
+
     def _process_error(self, error, query_id):
         error_type = error["errorType"]
         if error_type == "EXTERNAL":
@@ -391,13 +686,40 @@ class TrinoRequest(object):
         )
 
     def process(self, http_response):
+        # type: (requests.Response) -> TrinoStatus
+        if self._lease is None:
+            return self._process(http_response)
+
+        # the query no longer runs on the coordinator once it has finished or
+        # failed
+        try:
+            status = self._process(http_response)
+        except Exception:
+            self._release_coordinator()
+            raise
+        if status.next_uri is None:
+            self._release_coordinator()
+        return status
+
+    def _process(self, http_response):
         # type: (requests.Response) -> TrinoStatus
         if not http_response.ok:
             self.raise_response_error(http_response)
 
-        http_response.encoding = "utf-8"
-        response = http_response.json()
+        if self._stream_rows:
+            return self._process_stream(http_response)
+
+        if self._json_decoder is not None:
+            # decode the raw bytes without building a str first
+            response = self._json_decoder(http_response.content)
+        else:
+            http_response.encoding = "utf-8"
+            response = http_response.json()
         logger.debug("HTTP %s: %s", http_response.status_code, response)
+        return self._get_status(http_response, response)
+
+    def _get_status(self, http_response, response):
+        # type: (requests.Response, Dict[Text, Any]) -> TrinoStatus
         if "error" in response:
             raise self._process_error(response["error"], response.get("id"))
 
@@ -425,6 +747,128 @@ class TrinoRequest(object):
             columns=response.get("columns"),
         )
 
+    def _process_stream(self, http_response):
+        # type: (requests.Response) -> TrinoStatus
+        parser = jsonlib.JSONObjectStream(http_response.iter_content(self.STREAM_CHUNK_SIZE))
+        # the coordinator sends the members that describe the query before
+        # ``data`` and ``stats`` after it
+        response = parser.read_members(stop_at="data")
+        logger.debug("HTTP %s: %s", http_response.status_code, response)
+        response.setdefault("stats", {})
+        response.setdefault("infoUri", None)
+        status = self._get_status(http_response, response)
+        if not parser.finished:
+            status.rows = StreamedRows(self, http_response, parser, status)
+        return status
+
+    def _process_trailer(self, status, members):
+        # type: (TrinoStatus, Dict[Text, Any]) -> None
+        """Update ``status`` with the members that follow the rows of a
+        streamed response"""
+        logger.debug("HTTP trailer: %s", members)
+        if "error" in members:
+            raise self._process_error(members["error"], status.id)
+        status.stats.update(members.get("stats", {}))
+        status.warnings = members.get("warnings", status.warnings)
+        status.info_uri = members.get("infoUri", status.info_uri)
+        if "columns" in members:
+            status.columns = members["columns"]
+        if "nextUri" in members:
+            status.next_uri = self._next_uri = members["nextUri"]
+
+
+class _PrefetchError(object):
+    def __init__(self, error):
+        self.error = error
+
+
+class PagePrefetcher(object):
+    """
+    Fetch the pages of a query in a background thread.
+
+    A worker thread follows ``nextUri`` and puts the rows of each page in a
+    bounded queue while the caller consumes the previous pages. The worker
+    blocks once ``max_pages`` pages are waiting in the queue. Errors raised
+    while fetching, including the cancellation of the query, are re-raised
+    in the consuming thread.
+    """
+
+    POLL_INTERVAL = 0.1  # seconds
+
+    _DONE = object()
+
+    def __init__(self, query, max_pages):
+        # type: (TrinoQuery, int) -> None
+        self._query = query
+        self._pages = queue.Queue(maxsize=max_pages)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="trino-prefetch-{}".format(query.query_id)
+        )
+        self._thread.daemon = True
+        self._started = False
+
+    def _put(self, item):
+        # type: (Any) -> bool
+        while not self._stopped.is_set():
+            try:
+                self._pages.put(item, timeout=self.POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self):
+        try:
+            while not self._stopped.is_set() and not self._query.is_finished():
+                if self._query.cancelled:
+                    raise exceptions.TrinoUserError(
+                        "Query has been cancelled", self._query.query_id
+                    )
+                rows = self._query.fetch()
+                if isinstance(rows, StreamedRows):
+                    # read the rows here to update the state of the query
+                    rows = list(rows)
+                if not self._put(rows):
+                    return
+        except Exception as err:
+            self._put(_PrefetchError(err))
+            return
+        self._put(self._DONE)
+
+    def start(self):
+        # type: () -> None
+        """Start fetching the pages before they are consumed"""
+        if not self._started:
+            self._started = True
+            self._thread.start()
+
+    def __iter__(self):
+        self.start()
+        try:
+            while True:
+                try:
+                    page = self._pages.get(timeout=self.POLL_INTERVAL)
+                except queue.Empty:
+                    if self._stopped.is_set():
+                        # closed before the worker thread fetched all the pages
+                        raise exceptions.TrinoUserError(
+                            "Query has been cancelled", self._query.query_id
+                        )
+                    continue
+                if page is self._DONE:
+                    return
+                if isinstance(page, _PrefetchError):
+                    raise page.error
+                yield page
+        finally:
+            self.close()
+
+    def close(self):
+        # type: () -> None
+        """Stop the worker thread once its current request completes"""
+        self._stopped.set()
+
 
 class TrinoResult(object):
     """
@@ -432,45 +876,286 @@ class TrinoResult(object):
 
     This class implements the iterator protocol as a generator type
     https://docs.python.org/3/library/stdtypes.html#generator-types
+
+    When the request sets ``prefetch_pages``, the pages that follow the first
+    one are fetched by a :class:`PagePrefetcher`. When it sets
+    ``stream_rows``, the rows are yielded as they are parsed.
+
+    Rows are counted and logged once per page. Iterating the result chains
+    the rows of its pages without any per row work in Python, and
+    :meth:`iter_pages` yields whole pages. :attr:`rownumber` is the number
+    of rows returned so far, whether by the iteration of the result or as
+    whole pages, as the ``rownumber`` of PEP 249.
+
+    The pages are fetched once: iterating the result again yields nothing
+    once its pages have all been iterated, and raises a
+    :class:`trino.exceptions.ProgrammingError` while another iteration is
+    not complete, rather than returning its rows twice or skipping some.
     """
 
     def __init__(self, query, rows=None):
         self._query = query
         self._rows = rows or []
         self._rownumber = 0
+        self._prefetcher = None  # type: Optional[PagePrefetcher]
+        self._iterating = False
+        self._iterated = False
+        # iterator on the rows of the current page, when it is a list
+        self._page_rows = None  # type: Optional[Iterator[Any]]
 
     @property
     def rownumber(self):
         # type: () -> int
+        # the rows of the current page are counted once they are all
+        # returned, so the rows that are left are deducted
+        if self._page_rows is not None:
+            return self._rownumber - self._page_rows.__length_hint__()
         return self._rownumber
 
     def __iter__(self):
-        # Initial fetch from the first POST request
-        for row in self._rows:
+        return itertools.chain.from_iterable(self._iter_page_rows())
+
+    def _iter_page_rows(self):
+        for rows in self.iter_pages(stream=True):
+            if isinstance(rows, list):
+                rows = iter(rows)
+                self._page_rows = rows
+            else:
+                self._page_rows = None
+            yield rows
+        self._page_rows = None
+
+    def iter_pages(self, stream=False, convert=True):
+        """Yield the rows of each page as a list, or as they are parsed when
+        ``stream`` is true and the request streams rows. The rows are
+        converted by the query unless ``convert`` is false, in which case
+        they hold the values sent by the coordinator. The rows are counted
+        in :attr:`rownumber` either way."""
+        for rows in self._iter_all_pages():
+            if not stream and isinstance(rows, StreamedRows):
+                rows = list(rows)
+            if convert:
+                rows = self._query.map_rows(rows)
+            if isinstance(rows, list):
+                self._rownumber += len(rows)
+                logger.debug("page of %s rows, %s rows so far", len(rows), self._rownumber)
+            else:
+                rows = self._count_rows(rows)
+            yield rows
+
+    def _count_rows(self, rows):
+        for row in rows:
             self._rownumber += 1
             yield row
+
+    def _iter_all_pages(self):
+        if self._iterating:
+            if self._iterated:
+                return
+            raise exceptions.ProgrammingError("the rows of the result are already being fetched")
+        self._iterating = True
+        for rows in self._fetch_all_pages():
+            yield rows
+        self._iterated = True
+
+    def _fetch_all_pages(self):
+        # Initial fetch from the first POST request
+        if self._rows:
+            yield self._rows
         self._rows = None
 
         # Subsequent fetches from GET requests until next_uri is empty.
+        if self._prefetcher is None and self._query.prefetch_pages > 0:
+            self._prefetcher = PagePrefetcher(self._query, self._query.prefetch_pages)
+        if self._prefetcher is not None:
+            pages = iter(self._prefetcher)
+        else:
+            pages = self._fetch_pages()
+        for rows in pages:
+            yield rows
+
+    def prefetch(self):
+        # type: () -> None
+        """Start fetching the pages that follow the first one in the
+        background now, rather than once the result is iterated, when the
+        query sets ``prefetch_pages``. The state and stats of the query then
+        keep being updated while the caller does not read the rows yet."""
+        if self._prefetcher is not None or self._query.prefetch_pages <= 0 or self._query.is_finished():
+            return
+        self._prefetcher = PagePrefetcher(self._query, self._query.prefetch_pages)
+        self._prefetcher.start()
+
+    def close(self):
+        # type: () -> None
+        """Stop the :class:`PagePrefetcher` of the result, and cancel the
+        query when its pages were not all fetched. The rows that are not
+        read yet are lost. A result without a prefetcher is left as is."""
+        if self._prefetcher is None:
+            return
+        self._prefetcher.close()
+        if not self._query.is_finished() and not self._query.cancelled:
+            try:
+                self._query.cancel()
+            except Exception as err:
+                logger.debug("failed to cancel query %s: %s", self._query.query_id, err)
+
+    def _fetch_pages(self):
         while not self._query.is_finished():
-            rows = self._query.fetch()
-            for row in rows:
-                self._rownumber += 1
-                logger.debug("row %s", row)
-                yield row
+            yield self._query.fetch()
 
     @property
     def response_headers(self):
         return self._query.response_headers
 
 
+class Page(object):
+    """
+    Rows of a page of a query result, as returned by
+    :meth:`TrinoQuery.iter_pages`.
+
+    ``columns`` are the columns of the result and ``stats`` a copy of the
+    stats of the query when the page was returned.
+    """
+
+    def __init__(self, rows, columns, stats):
+        # type: (List[Any], Optional[List[Any]], Dict[Any, Any]) -> None
+        self.rows = rows
+        self.columns = columns
+        self.stats = stats
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __repr__(self):
+        return "Page(rows={}, state={})".format(len(self.rows), self.stats.get("state"))
+
+
+class QueryProgress(object):
+    """
+    Progress of a query, built from its stats.
+
+    ``progress_percentage`` is ``None`` until the coordinator can estimate
+    it, which it does once the query is scheduled. The times are in
+    milliseconds, as in the stats. ``stats`` are the stats the progress was
+    built from.
+    """
+
+    COUNTERS = (
+        ("nodes", "nodes"),
+        ("total_splits", "totalSplits"),
+        ("queued_splits", "queuedSplits"),
+        ("running_splits", "runningSplits"),
+        ("completed_splits", "completedSplits"),
+        ("processed_rows", "processedRows"),
+        ("processed_bytes", "processedBytes"),
+        ("physical_input_bytes", "physicalInputBytes"),
+        ("peak_memory_bytes", "peakMemoryBytes"),
+        ("spilled_bytes", "spilledBytes"),
+        ("cpu_time_millis", "cpuTimeMillis"),
+        ("wall_time_millis", "wallTimeMillis"),
+        ("queued_time_millis", "queuedTimeMillis"),
+        ("elapsed_time_millis", "elapsedTimeMillis"),
+    )
+
+    def __init__(self, query_id, state, queued, scheduled, progress_percentage, stats, **counters):
+        # type: (Optional[Text], Optional[Text], bool, bool, Optional[float], Dict[Text, Any], **int) -> None
+        self.query_id = query_id
+        self.state = state
+        self.queued = queued
+        self.scheduled = scheduled
+        self.progress_percentage = progress_percentage
+        self.stats = stats
+        for name, _ in self.COUNTERS:
+            setattr(self, name, counters.get(name, 0))
+
+    @classmethod
+    def from_stats(cls, stats, query_id=None):
+        # type: (Dict[Text, Any], Optional[Text]) -> QueryProgress
+        state = stats.get("state")
+        percentage = stats.get("progressPercentage")
+        if state == "FINISHED":
+            percentage = 100.0
+        return cls(
+            query_id=query_id or stats.get("queryId"),
+            state=state,
+            queued=bool(stats.get("queued", state in ("QUEUED", "WAITING_FOR_RESOURCES"))),
+            scheduled=bool(stats.get("scheduled", False)),
+            progress_percentage=percentage,
+            stats=stats,
+            **dict((name, stats.get(key) or 0) for name, key in cls.COUNTERS)
+        )
+
+    @classmethod
+    def combine(cls, progresses):
+        # type: (List[QueryProgress]) -> QueryProgress
+        """Return the progress of several queries run as one, such as the
+        partitions of a :class:`trino.parallel.PartitionedQuery`"""
+        states = set(progress.state for progress in progresses)
+        if "FAILED" in states:
+            state = "FAILED"
+        elif states == {"FINISHED"}:
+            state = "FINISHED"
+        elif states <= {None, "QUEUED", "WAITING_FOR_RESOURCES"}:
+            state = "QUEUED"
+        else:
+            state = "RUNNING"
+        counters = dict(
+            (name, sum(getattr(progress, name) for progress in progresses)) for name, _ in cls.COUNTERS
+        )
+        # the queries run at the same time
+        for name in ("queued_time_millis", "elapsed_time_millis"):
+            counters[name] = max([getattr(progress, name) for progress in progresses] or [0])
+        percentages = [progress.progress_percentage for progress in progresses]
+        if state == "FINISHED":
+            percentage = 100.0  # type: Optional[float]
+        elif percentages and None not in percentages:
+            percentage = sum(percentages) / len(percentages)
+        else:
+            percentage = None
+        return cls(
+            query_id=None,
+            state=state,
+            queued=all(progress.queued for progress in progresses),
+            scheduled=bool(progresses) and all(progress.scheduled for progress in progresses),
+            progress_percentage=percentage,
+            stats={"partitions": [progress.stats for progress in progresses]},
+            **counters
+        )
+
+    def __repr__(self):
+        return (
+            "QueryProgress(query_id={}, state={}, progress_percentage={}, splits={}/{}, "
+            "processed_rows={}, processed_bytes={}, cpu_time_millis={})".format(
+                self.query_id,
+                self.state,
+                self.progress_percentage,
+                self.completed_splits,
+                self.total_splits,
+                self.processed_rows,
+                self.processed_bytes,
+                self.cpu_time_millis,
+            )
+        )
+
+
 class TrinoQuery(object):
-    """Represent the execution of a SQL statement by Trino."""
+    """Represent the execution of a SQL statement by Trino.
+
+    When ``experimental_python_types`` is true, the rows returned by the
+    result are converted into Python types by a
+    :class:`trino.mapper.RowMapper`, see :mod:`trino.mapper`.
+
+    ``progress_callback`` is called with the :class:`QueryProgress` of the
+    query each time its stats are updated by a response of the coordinator.
+    Its errors are logged and ignored.
+    """
 
     def __init__(
         self,
         request,  # type: TrinoRequest
         sql,  # type: Text
+        experimental_python_types=False,  # type: bool
+        progress_callback=None,  # type: Optional[Callable[[QueryProgress], Any]]
     ):
         # type: (...) -> None
         self.query_id = None  # type: Optional[Text]
@@ -485,6 +1170,11 @@ class TrinoQuery(object):
         self._sql = sql
         self._result = TrinoResult(self)
         self._response_headers = None
+        self._experimental_python_types = experimental_python_types
+        self._row_mapper = None  # type: Optional[mapper.RowMapper]
+        self._hooks = getattr(request, "hooks", None)  # type: Optional[trino.instrumentation.HookDispatcher]
+        self._tracker = None  # type: Optional[trino.instrumentation.QueryTracker]
+        self._progress_callback = progress_callback
 
     @property
     def columns(self):
@@ -498,10 +1188,61 @@ class TrinoQuery(object):
     def warnings(self):
         return self._warnings
 
+    @property
+    def progress(self):
+        # type: () -> QueryProgress
+        return QueryProgress.from_stats(self._stats, self.query_id)
+
+    def _publish_progress(self):
+        # type: () -> None
+        if self._progress_callback is None:
+            return
+        try:
+            self._progress_callback(self.progress)
+        except Exception:
+            logger.exception("progress callback of query %s failed", self.query_id)
+
     @property
     def result(self):
         return self._result
 
+    @property
+    def prefetch_pages(self):
+        # type: () -> int
+        return self._request.prefetch_pages
+
+    @property
+    def cancelled(self):
+        # type: () -> bool
+        return self._cancelled
+
+    def map_rows(self, rows):
+        # type: (Any) -> Any
+        """Convert the rows of a page into Python types if
+        ``experimental_python_types`` is set, or return them as is"""
+        if not self._experimental_python_types or not rows:
+            return rows
+        if self._row_mapper is None:
+            if self._columns is None:
+                # the columns of a streamed page may follow its rows
+                rows = list(rows)
+            self._row_mapper = mapper.create_row_mapper(self._columns or [])
+        if isinstance(rows, StreamedRows):
+            return self._row_mapper.iter_rows(rows)
+        return self._row_mapper.map_rows(rows)
+
+    def iter_pages(self):
+        # type: () -> Any
+        """Yield a :class:`Page` for each page of the result of the
+        executed query, with the rows returned by the coordinator in that
+        page. Pages without rows are skipped."""
+        for rows in self._result.iter_pages():
+            if not rows:
+                continue
+            if self._cancelled:
+                raise exceptions.TrinoUserError("Query has been cancelled", self.query_id)
+            yield Page(rows, self._columns, dict(self._stats))
+
     def execute(self, additional_http_headers=None):
         # type: () -> TrinoResult
         """Initiate a Trino query by sending the SQL statement
@@ -514,22 +1255,78 @@ class TrinoQuery(object):
         if self._cancelled:
             raise exceptions.TrinoUserError("Query has been cancelled", self.query_id)
 
-        response = self._request.post(self._sql, additional_http_headers)
-        status = self._request.process(response)
+        if self._hooks is not None:
+            self._tracker = trino.instrumentation.QueryTracker(self._hooks, self._sql)
+        status = self._request_page(
+            lambda: self._request.post(self._sql, additional_http_headers), self._update_initial_state
+        )
+        self._result = TrinoResult(self, status.rows)
+        return self._result
+
+    def _request_page(self, send, update):
+        # type: (Any, Any) -> TrinoStatus
+        """Send a request with ``send`` and process its response, updating
+        the state of the query with ``update`` once its rows have been read"""
+        tracker = self._tracker
+        if tracker is None:
+            response = send()
+            status = self._request.process(response)
+            self._update_when_done(status, response, update)
+            return status
+
+        start = time.time()
+        try:
+            response = send()
+            fetched = time.time()
+            status = self._request.process(response)
+        except Exception as err:
+            tracker.finish(self.query_id, self._stats, err)
+            raise
+        decoded = time.time()
+
+        def update_and_track(status, response):
+            update(status, response)
+            tracker.page(self.query_id, self._stats, status.rows, response, fetched - start, decoded - fetched)
+            if self._finished:
+                tracker.finish(self.query_id, self._stats)
+
+        self._update_when_done(status, response, update_and_track)
+        return status
+
+    def _update_when_done(self, status, response, update):
+        # type: (TrinoStatus, Any, Any) -> None
+        """Update the state of the query with ``status`` once its rows have
+        been read"""
+        if not isinstance(status.rows, StreamedRows):
+            update(status, response)
+            return
+        # the members that precede the rows are already known
+        self.query_id = status.id
+        if status.columns:
+            self._columns = status.columns
+        self._response_headers = response.headers
+        status.rows.add_done_callback(lambda: update(status, response))
+
+    def _update_initial_state(self, status, response=None):
+        # type: (TrinoStatus, Any) -> None
         self.query_id = status.id
+        if status.columns:
+            self._columns = status.columns
         self._stats.update({u"queryId": self.query_id})
         self._stats.update(status.stats)
         self._warnings = getattr(status, "warnings", [])
         if status.next_uri is None:
             self._finished = True
-        self._result = TrinoResult(self, status.rows)
-        return self._result
+        self._publish_progress()
 
     def fetch(self):
         # type: () -> List[List[Any]]
         """Continue fetching data for the current query_id"""
-        response = self._request.get(self._request.next_uri)
-        status = self._request.process(response)
+        status = self._request_page(lambda: self._request.get(self._request.next_uri), self._update_state)
+        return status.rows
+
+    def _update_state(self, status, response):
+        # type: (TrinoStatus, Any) -> None
         if status.columns:
             self._columns = status.columns
         self._stats.update(status.stats)
@@ -537,7 +1334,7 @@ class TrinoQuery(object):
         self._response_headers = response.headers
         if status.next_uri is None:
             self._finished = True
-        return status.rows
+        self._publish_progress()
 
     def cancel(self):
         # type: () -> None
@@ -546,15 +1343,23 @@ class TrinoQuery(object):
             return
 
         self._cancelled = True
-        url = self._request.get_url("/v1/query/{}".format(self.query_id))
+        if self._tracker is not None:
+            self._tracker.finish(self.query_id, self._stats, state="CANCELLED")
         logger.debug("cancelling query: %s", self.query_id)
-        response = self._request.delete(url)
+        response = self._request.delete(self.cancel_url)
         logger.info(response)
+        # the query no longer counts as outstanding on its coordinator
+        self._request._release_coordinator()
         if response.status_code == requests.codes.no_content:
             logger.debug("query cancelled: %s", self.query_id)
             return
         self._request.raise_response_error(response)
 
+    @property
+    def cancel_url(self):
+        # type: () -> Text
+        return self._request.get_url("/v1/query/{}".format(self.query_id))
+
     def is_finished(self):
         # type: () -> bool
         return self._finished
@@ -562,3 +1367,170 @@ class TrinoQuery(object):
     @property
     def response_headers(self):
         return self._response_headers
+
+
+class QueryOutcome(object):
+    """
+    Outcome of a query run by a :class:`QueryExecutor`.
+
+    ``index`` is the position of the statement in the statements given to
+    :meth:`QueryExecutor.execute`. ``rows`` holds all the rows of the result
+    when the query succeeded, ``error`` the exception raised otherwise.
+    ``stats`` are the last :attr:`TrinoQuery.stats` of the query and
+    ``elapsed`` the seconds taken by the client to run it.
+    """
+
+    def __init__(self, index, sql, query, elapsed, rows=None, error=None):
+        # type: (int, Text, TrinoQuery, float, Optional[List[Any]], Optional[Exception]) -> None
+        self.index = index
+        self.sql = sql
+        self.query_id = query.query_id
+        self.columns = query.columns
+        self.stats = query.stats
+        self.elapsed = elapsed
+        self.rows = rows
+        self.error = error
+
+    @property
+    def succeeded(self):
+        # type: () -> bool
+        return self.error is None
+
+    def __repr__(self):
+        return "QueryOutcome(index={}, query_id={}, error={!r})".format(
+            self.index, self.query_id, self.error
+        )
+
+
+class QueryExecutor(object):
+    """
+    Run SQL statements concurrently in worker threads.
+
+    Each statement is run by its own :class:`TrinoQuery` and
+    :class:`TrinoRequest`, created with ``kwargs``, e.g. ``host``, ``port``
+    and ``user``. The requests share one ``requests.Session`` whose pool keeps
+    up to ``max_workers`` HTTP connections per host, configured by
+    ``transport``, a :class:`trino.transport.TransportConfig`, unless
+    ``http_session`` is given: ::
+
+        >> executor = QueryExecutor(host="coordinator", port=8080, user="test", max_workers=8)
+        >> for outcome in executor.execute(statements):
+        ..     print(outcome.sql, outcome.stats["elapsedTimeMillis"], len(outcome.rows))
+
+    :param max_workers: maximum number of queries running at once.
+    :param cancel_on_error: when a query fails, cancel the running queries,
+                            skip the pending ones and raise its error instead
+                            of returning its :class:`QueryOutcome`.
+    :param experimental_python_types: convert the values of the rows into
+                                      Python types, see :mod:`trino.mapper`.
+    """
+
+    def __init__(
+        self,
+        max_workers=constants.DEFAULT_QUERY_EXECUTOR_MAX_WORKERS,  # type: int
+        cancel_on_error=False,  # type: bool
+        experimental_python_types=False,  # type: bool
+        transport=None,  # type: Optional[Any]
+        **kwargs  # type: Any
+    ):
+        # type: (...) -> None
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.max_workers = max_workers
+        self.cancel_on_error = cancel_on_error
+        self.experimental_python_types = experimental_python_types
+        self._owns_http_session = kwargs.get("http_session") is None
+        if self._owns_http_session:
+            http_session = TrinoRequest.http.Session()
+            http_session.verify = kwargs.pop("verify", True)
+            if transport is None:
+                transport = trino.transport.TransportConfig(pool_maxsize=max_workers)
+            kwargs["http_session"] = transport.configure(http_session)
+        self._request_kwargs = kwargs
+
+    def _create_request(self):
+        # type: () -> TrinoRequest
+        return TrinoRequest(**self._request_kwargs)
+
+    def execute(self, statements):
+        # type: (Any) -> Any
+        """
+        Run ``statements`` and yield a :class:`QueryOutcome` per statement in
+        the order the queries complete.
+
+        The rows of each result are fetched by the worker thread running its
+        query. The queries still running are cancelled when the caller stops
+        iterating before the end.
+        """
+        pending = queue.Queue()  # type: queue.Queue
+        count = 0
+        for index, sql in enumerate(statements):
+            pending.put((index, sql))
+            count += 1
+        completed = queue.Queue()  # type: queue.Queue
+        stopped = threading.Event()
+        running = {}  # type: Dict[int, TrinoQuery]
+        lock = threading.Lock()
+        for number in range(min(self.max_workers, count)):
+            worker = threading.Thread(
+                target=self._work,
+                args=(pending, completed, stopped, running, lock),
+                name="trino-executor-{}".format(number),
+            )
+            worker.daemon = True
+            worker.start()
+        try:
+            for _ in range(count):
+                outcome = completed.get()
+                if outcome.error is not None and self.cancel_on_error:
+                    raise outcome.error
+                yield outcome
+        finally:
+            self._cancel(stopped, running, lock)
+
+    def _work(self, pending, completed, stopped, running, lock):
+        while not stopped.is_set():
+            try:
+                index, sql = pending.get_nowait()
+            except queue.Empty:
+                return
+            query = TrinoQuery(
+                self._create_request(), sql, experimental_python_types=self.experimental_python_types
+            )
+            with lock:
+                running[index] = query
+            start = time.time()
+            try:
+                result = query.execute()
+                if stopped.is_set():
+                    # cancelled before the query id was known
+                    query.cancel()
+                    raise exceptions.TrinoUserError("Query has been cancelled", query.query_id)
+                outcome = QueryOutcome(index, sql, query, time.time() - start, rows=list(result))
+            except Exception as err:
+                outcome = QueryOutcome(index, sql, query, time.time() - start, error=err)
+            finally:
+                with lock:
+                    running.pop(index, None)
+            completed.put(outcome)
+
+    def _cancel(self, stopped, running, lock):
+        stopped.set()
+        with lock:
+            queries = list(running.values())
+        for query in queries:
+            try:
+                query.cancel()
+            except Exception as err:
+                logger.debug("failed to cancel query %s: %s", query.query_id, err)
+
+    def close(self):
+        # type: () -> None
+        if self._owns_http_session:
+            self._request_kwargs["http_session"].close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
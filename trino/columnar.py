@@ -0,0 +1,221 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+This module converts the result of a query into NumPy arrays, one per column.
+
+Each page returned by the coordinator is appended to a growable buffer of
+fixed size values per column, along with a mask of the NULL values, instead
+of being kept as lists of Python objects. The column types are read from the
+``typeSignature`` of the columns of the query:
+
+- ``tinyint``, ``smallint``, ``integer`` and ``bigint`` become ``int64``
+- ``real`` and ``double`` become ``float64``
+- ``boolean`` becomes ``bool``
+- ``date`` becomes ``datetime64[D]``
+- ``timestamp(p)`` becomes ``datetime64[ms]``, ``datetime64[us]`` or
+  ``datetime64[ns]`` depending on its precision
+- other types are kept as Python objects in ``object`` arrays
+
+Columns of fixed size values that contain NULL values are returned as
+``numpy.ma.MaskedArray``.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import array
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Text  # NOQA for mypy types
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from trino import datatypes
+
+
+__all__ = ["to_numpy"]
+
+
+# Python 2 arrays have fromstring() only
+_array_frombytes = getattr(array.array, "frombytes", None) or array.array.fromstring
+
+
+def _get_int64_typecode():
+    # Python 2 arrays have no "q" typecode, and their "l" values are 64-bit on
+    # most 64-bit platforms
+    for typecode in ("q", "l"):
+        try:
+            if array.array(typecode).itemsize == 8:
+                return typecode
+        except ValueError:
+            pass
+    return None
+
+
+_INT64_TYPECODE = _get_int64_typecode()
+
+
+INTEGER_TYPES = ("tinyint", "smallint", "integer", "bigint")
+FLOAT_TYPES = ("real", "double")
+DEFAULT_TIMESTAMP_PRECISION = 3
+
+
+def _check_numpy():
+    if numpy is None:
+        raise RuntimeError("unable to import numpy")
+
+
+class ColumnBuffer(object):
+    """Growable buffer of the fixed size values of a column"""
+
+    def __init__(self, typecode, dtype, null_value, convert):
+        if typecode is None:
+            raise RuntimeError("64-bit integer arrays are not supported on this platform")
+        self._values = array.array(typecode)
+        self._mask = bytearray()
+        self._dtype = dtype
+        self._null_value = null_value
+        self._convert = convert
+        self._has_nulls = False
+
+    def extend(self, values):
+        # type: (List[Any]) -> None
+        size = len(self._values)
+        try:
+            # fast path for pages without NULL values or values to convert
+            self._values.extend(values)
+        except TypeError:
+            del self._values[size:]
+            self._extend_values(values)
+        else:
+            self._mask.extend(bytearray(len(values)))
+
+    def _extend_values(self, values):
+        append = self._values.append
+        mask = self._mask
+        convert = self._convert
+        for value in values:
+            if value is None:
+                append(self._null_value)
+                mask.append(1)
+                self._has_nulls = True
+            else:
+                append(convert(value))
+                mask.append(0)
+
+    def build(self):
+        data = numpy.frombuffer(self._values, dtype=self._values.typecode).view(self._dtype)
+        if self._has_nulls:
+            return numpy.ma.MaskedArray(data, mask=numpy.frombuffer(self._mask, dtype=numpy.bool_))
+        return data
+
+
+class DatetimeColumnBuffer(ColumnBuffer):
+    """Growable buffer of the values of a date or timestamp column
+
+    Values are parsed one page at a time by NumPy and stored as 64-bit integers.
+    """
+
+    def __init__(self, dtype):
+        super(DatetimeColumnBuffer, self).__init__(_INT64_TYPECODE, dtype, 0, None)
+
+    def extend(self, values):
+        # type: (List[Any]) -> None
+        # NumPy parses None as NaT
+        page = numpy.array(values, dtype=self._dtype)
+        _array_frombytes(self._values, page.view(numpy.int64).tobytes())
+        mask = [value is None for value in values]
+        self._has_nulls = self._has_nulls or any(mask)
+        self._mask.extend(bytearray(mask))
+
+
+class ObjectColumnBuffer(object):
+    """Buffer of the values of a column kept as Python objects"""
+
+    def __init__(self):
+        self._values = []  # type: List[Any]
+
+    def extend(self, values):
+        # type: (List[Any]) -> None
+        self._values.extend(values)
+
+    def build(self):
+        data = numpy.empty(len(self._values), dtype=object)
+        for index, value in enumerate(self._values):
+            data[index] = value
+        return data
+
+
+def create_column_buffer(column):
+    # type: (Dict[Text, Any]) -> Any
+    signature = datatypes.get_signature(column)
+    raw_type = signature["rawType"]
+    if raw_type in INTEGER_TYPES:
+        return ColumnBuffer(_INT64_TYPECODE, numpy.int64, 0, int)
+    if raw_type in FLOAT_TYPES:
+        # Trino sends NaN and infinity values as strings
+        return ColumnBuffer("d", numpy.float64, float("nan"), float)
+    if raw_type == "boolean":
+        return ColumnBuffer("b", numpy.bool_, 0, bool)
+    if raw_type == "date":
+        return DatetimeColumnBuffer("datetime64[D]")
+    if raw_type == "timestamp":
+        precision = (datatypes.get_long_arguments(signature) or [DEFAULT_TIMESTAMP_PRECISION])[0]
+        if precision <= 3:
+            return DatetimeColumnBuffer("datetime64[ms]")
+        if precision <= 6:
+            return DatetimeColumnBuffer("datetime64[us]")
+        return DatetimeColumnBuffer("datetime64[ns]")
+    return ObjectColumnBuffer()
+
+
+def get_column_names(columns):
+    # type: (List[Dict[Text, Any]]) -> List[Text]
+    """Return the names of the columns, suffixed by their position when
+    several columns have the same name"""
+    names = []  # type: List[Text]
+    for index, column in enumerate(columns):
+        name = column["name"]
+        if name in names:
+            name = "{}_{}".format(name, index)
+        names.append(name)
+    return names
+
+
+def to_numpy(query, pages):
+    # type: (Any, Iterable[List[List[Any]]]) -> Dict[Text, Any]
+    """Append the rows of ``pages`` column by column and return a dict of
+    NumPy arrays keyed by column name
+
+    :param query: :class:`trino.client.TrinoQuery` that returns the pages.
+                  Its columns are known after the first page is fetched.
+    :param pages: iterable on the lists of rows of each page.
+    """
+    _check_numpy()
+    buffers = None
+    for rows in pages:
+        if not rows:
+            continue
+        if buffers is None:
+            buffers = [create_column_buffer(column) for column in query.columns]
+        for index, buffer in enumerate(buffers):
+            buffer.extend([row[index] for row in rows])
+
+    columns = query.columns or []
+    if buffers is None:
+        buffers = [create_column_buffer(column) for column in columns]
+    return OrderedDict(
+        (name, buffer.build()) for name, buffer in zip(get_column_names(columns), buffers)
+    )
@@ -23,6 +23,34 @@ DEFAULT_SCHEMA = None  # type: Optional[Text]
 DEFAULT_AUTH = None  # type: Optional[Any]
 DEFAULT_MAX_ATTEMPTS = 3
 DEFAULT_REQUEST_TIMEOUT = 30.0  # type: float
+DEFAULT_PREFETCH_PAGES = 0
+DEFAULT_EXECUTEMANY_BATCH_ROWS = 1000
+DEFAULT_EXECUTEMANY_BATCH_BYTES = 512 * 1024
+DEFAULT_MAX_COORDINATOR_FAILURES = 3
+DEFAULT_HEALTH_CHECK_INTERVAL = 30.0  # type: Optional[float]
+DEFAULT_HTTP_POOL_CONNECTIONS = 10
+DEFAULT_HTTP_POOL_MAXSIZE = 10
+DEFAULT_POOL_MAX_SIZE = 10
+DEFAULT_POOL_TIMEOUT = 30.0  # type: float
+DEFAULT_POOL_MAX_IDLE_TIME = 600.0  # type: Optional[float]
+DEFAULT_POOL_HEALTH_CHECK_IDLE_TIME = 30.0  # type: Optional[float]
+DEFAULT_RESULT_CACHE_TTL = 60.0  # type: float
+DEFAULT_RESULT_CACHE_MAX_ENTRIES = 128
+DEFAULT_RESULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_QUERY_EXECUTOR_MAX_WORKERS = 8
+DEFAULT_PARTITIONS = 4
+DEFAULT_PARTITION_BUFFER_PAGES = 2
+DEFAULT_RETRY_MAX_DELAY = 30.0  # type: float
+DEFAULT_RETRY_BUDGET_TOKENS = 10
+DEFAULT_RETRY_BUDGET_REFILL_RATE = 1.0  # type: float
+DEFAULT_CIRCUIT_BREAKER_FAILURES = 5
+DEFAULT_CIRCUIT_BREAKER_RESET_TIMEOUT = 30.0  # type: float
+DEFAULT_HEDGING_PERCENTILE = 95.0  # type: float
+DEFAULT_HEDGING_MIN_DELAY = 0.05  # type: float
+DEFAULT_HEDGING_INITIAL_DELAY = 1.0  # type: float
+DEFAULT_HEDGING_WINDOW = 200
+DEFAULT_HEDGING_MIN_SAMPLES = 20
+DEFAULT_HEDGING_MAX_WORKERS = 16
 
 HTTP = "http"
 HTTPS = "https"
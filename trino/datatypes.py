@@ -0,0 +1,100 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+This module reads the types of the columns of a query result and parses the
+JSON representation of their values. It is shared by the conversions of
+results: :mod:`trino.mapper`, :mod:`trino.arrow` and :mod:`trino.columnar`.
+
+The type of a column is read from its ``typeSignature``, e.g.
+``{"rawType": "decimal", "arguments": [{"kind": "LONG", "value": 10}, ...]}``,
+or from the name of its ``type`` when the coordinator does not send it.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import base64
+import datetime
+from typing import Any, Dict, List, Text, Tuple  # NOQA for mypy types
+
+
+def get_signature(column):
+    # type: (Dict[Text, Any]) -> Dict[Text, Any]
+    """Return the type signature of a column of a query"""
+    return column.get("typeSignature") or {"rawType": column["type"].split("(", 1)[0]}
+
+
+def get_type_arguments(signature):
+    # type: (Dict[Text, Any]) -> List[Dict[Text, Any]]
+    """Return the signatures of the types of the elements of an ``array``,
+    or of the keys and values of a ``map``"""
+    return [
+        argument["value"]
+        for argument in signature.get("arguments", [])
+        if argument.get("kind") in ("TYPE", "TYPE_SIGNATURE")
+    ]
+
+
+def get_long_arguments(signature):
+    # type: (Dict[Text, Any]) -> List[int]
+    """Return the numeric arguments of a type, e.g. the precision and the
+    scale of a ``decimal``"""
+    return [
+        argument["value"]
+        for argument in signature.get("arguments", [])
+        if argument.get("kind") in ("LONG", "LONG_LITERAL")
+    ]
+
+
+def get_fields(signature):
+    # type: (Dict[Text, Any]) -> List[Tuple[Text, Dict[Text, Any]]]
+    """Return the name and the signature of the type of each field of a
+    ``row``. Anonymous fields are named after their position, e.g.
+    ``field0``."""
+    fields = []
+    for index, argument in enumerate(signature.get("arguments", [])):
+        value = argument["value"]
+        field_name = value.get("fieldName") or {}
+        fields.append((field_name.get("name") or "field{}".format(index), value["typeSignature"]))
+    return fields
+
+
+def parse_date(value):
+    # type: (Text) -> datetime.date
+    year, month, day = value.split("-")
+    return datetime.date(int(year), int(month), int(day))
+
+
+def parse_time_fields(value):
+    # type: (Text) -> Tuple[int, int, int, int]
+    """Return the hour, minute, second and microsecond of ``HH:MM:SS[.f]``.
+    The fraction of second is truncated to microseconds."""
+    time, _, fraction = value.partition(".")
+    hour, minute, second = time.split(":")
+    return int(hour), int(minute), int(second), int((fraction + "000000")[:6])
+
+
+def parse_time(value):
+    # type: (Text) -> datetime.time
+    return datetime.time(*parse_time_fields(value))
+
+
+def parse_timestamp(value):
+    # type: (Text) -> datetime.datetime
+    date, _, time = value.partition(" ")
+    return datetime.datetime.combine(parse_date(date), parse_time(time))
+
+
+def parse_binary(value):
+    # type: (Text) -> bytes
+    return base64.b64decode(value)
@@ -21,7 +21,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
-from typing import Any, List, Optional  # NOQA for mypy types
+from typing import Any, Dict, List, Optional, Tuple  # NOQA for mypy types
 
 try:
     from urllib.parse import urlencode
@@ -29,20 +29,32 @@ except ImportError:
     # Python 2
     from urllib import urlencode
 
+import contextlib
 import copy
 import uuid
 import datetime
+import itertools
 import re
 import math
+import threading
+import time
+from collections import OrderedDict, deque
 
 from trino import constants
+import trino.arrow
 import trino.exceptions
 import trino.client
+import trino.columnar
+import trino.loadbalancing
 import trino.logging
+import trino.parallel
+import trino.result_cache
+import trino.spool
+import trino.transport
 from trino.transaction import Transaction, IsolationLevel, NO_TRANSACTION
 
 
-__all__ = ["connect", "Connection", "Cursor"]
+__all__ = ["connect", "Connection", "ConnectionPool", "Cursor", "PreparedStatementCache"]
 
 
 apilevel = "2.0"
@@ -51,6 +63,56 @@ paramstyle = "qmark"
 
 logger = trino.logging.get_logger(__name__)
 
+_INSERT_VALUES_RE = re.compile(
+    r"^\s*INSERT\s+INTO\s.*?\bVALUES\s*(?P<row>\(.*\))\s*$",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+def _split_placeholders(sql):
+    """
+    Split ``sql`` around its ``?`` placeholders, ignoring the ones in string
+    literals and quoted identifiers.
+
+    :return: list of the SQL fragments, that has one more element than the
+        number of placeholders.
+    """
+    fragments = []
+    start = 0
+    quote = None
+    for index, char in enumerate(sql):
+        if quote is not None:
+            # a doubled quote is an escaped quote and toggles the state twice
+            if char == quote:
+                quote = None
+        elif char in ("'", '"'):
+            quote = char
+        elif char == "?":
+            fragments.append(sql[start:index])
+            start = index + 1
+    fragments.append(sql[start:])
+    return fragments
+
+
+def _is_single_group(sql):
+    """Return whether ``sql`` is one parenthesized group, e.g. ``(?, ?)`` but
+    not ``(?), (?)``"""
+    depth = 0
+    quote = None
+    for index, char in enumerate(sql):
+        if quote is not None:
+            if char == quote:
+                quote = None
+        elif char in ("'", '"'):
+            quote = char
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                return index == len(sql) - 1
+    return False
+
 
 def connect(*args, **kwargs):
     """Constructor for creating a connection to the database.
@@ -62,12 +124,120 @@ def connect(*args, **kwargs):
     return Connection(*args, **kwargs)
 
 
+class PreparedStatementCache(object):
+    """LRU cache of the prepared statements of a connection.
+
+    Statements are keyed by their SQL text and map to the name of the
+    statement and the value of the ``X-Trino-Added-Prepare`` header returned
+    by the PREPARE statement. :meth:`put` returns the statements evicted to
+    make room for a new one, which the caller is expected to deallocate.
+
+    ``hits`` and ``misses`` count the lookups made with :meth:`get`.
+    """
+
+    def __init__(self, max_size):
+        # type: (int) -> None
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._statements = OrderedDict()  # type: OrderedDict
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._statements)
+
+    def get(self, sql):
+        # type: (str) -> Optional[Tuple[str, str]]
+        """Return the ``(statement_name, added_prepare_header)`` of ``sql``"""
+        with self._lock:
+            statement = self._statements.pop(sql, None)
+            if statement is None:
+                self.misses += 1
+                return None
+            self._statements[sql] = statement
+            self.hits += 1
+            return statement
+
+    def put(self, sql, statement_name, added_prepare_header):
+        # type: (str, str, str) -> List[Tuple[str, str]]
+        """Add a prepared statement and return the evicted ones"""
+        with self._lock:
+            evicted = []
+            replaced = self._statements.pop(sql, None)
+            if replaced is not None:
+                evicted.append(replaced)
+            self._statements[sql] = (statement_name, added_prepare_header)
+            while len(self._statements) > self.max_size:
+                evicted.append(self._statements.popitem(last=False)[1])
+            return evicted
+
+    def clear(self):
+        # type: () -> List[Tuple[str, str]]
+        """Remove and return all the prepared statements"""
+        with self._lock:
+            statements = list(self._statements.values())
+            self._statements.clear()
+            return statements
+
+
 class Connection(object):
     """Trino supports transactions and the ability to either commit or rollback
     a sequence of SQL statements. A single query i.e. the execution of a SQL
     statement, can also be cancelled. Transactions are not supported by this
     client implementation yet.
 
+    ``host`` is either the name of the coordinator or a list of coordinators
+    given as ``host``, ``host:port`` or ``(host, port)``. Queries are then
+    balanced between the coordinators by a
+    :class:`trino.loadbalancing.LoadBalancer` according to
+    ``load_balancing_policy``, and coordinators that repeatedly fail are
+    ejected until their health check succeeds. ``port`` is the default port
+    of the coordinators.
+
+    When ``prepared_statement_cache_size`` is set, the statements prepared
+    for :meth:`Cursor.execute` with parameters are kept in a
+    :class:`PreparedStatementCache` of that size and reused by the cursors of
+    the connection. They are only deallocated when evicted from the cache or
+    when the connection is closed.
+
+    ``http_session`` is a ``requests.Session`` to send the requests with,
+    e.g. to share its pool of HTTP connections with other connections. One
+    is created by default, configured by ``transport``, a
+    :class:`trino.transport.TransportConfig`.
+
+    When ``experimental_python_types`` is true, the values of the rows
+    fetched by the cursors are converted into Python types, e.g.
+    ``decimal.Decimal`` or ``datetime.datetime``, instead of being returned
+    as decoded from JSON. See :mod:`trino.mapper`.
+
+    ``result_cache`` is a :class:`trino.result_cache.ResultCache` that answers
+    the ``SELECT`` statements executed again by the cursors with the rows
+    previously fetched, without sending any request. It can be shared by
+    several connections.
+
+    ``retry_policy`` is a :class:`trino.exceptions.RetryPolicy` that limits
+    the retries of the requests with a retry budget, a circuit breaker and a
+    deadline. It replaces the default exponential backoff.
+
+    ``hedging`` is a :class:`trino.hedging.HedgingPolicy` that sends the
+    fetch of a page a second time when it does not answer within a
+    percentile of the latencies of the previous fetches, to cut the tail
+    latency of the queries. It can be shared by several connections.
+
+    ``hooks`` is a list of objects called during the lifecycle of the
+    queries with the timings of their requests and pages, such as a
+    :class:`trino.instrumentation.MetricsCollector`. See
+    :mod:`trino.instrumentation`.
+
+    ``progress_callback`` is called with the
+    :class:`trino.client.QueryProgress` of the queries executed by the
+    cursors each time their stats are updated, e.g. to cancel the queries
+    that process too many rows. When ``prefetch_pages`` is set, the pages of
+    the queries are then fetched in the background from
+    :meth:`Cursor.execute` on, so that their progress keeps being published
+    before their rows are read.
     """
 
     def __init__(
@@ -86,7 +256,21 @@ class Connection(object):
         max_attempts=constants.DEFAULT_MAX_ATTEMPTS,
         request_timeout=constants.DEFAULT_REQUEST_TIMEOUT,
         isolation_level=IsolationLevel.AUTOCOMMIT,
-        verify=True
+        verify=True,
+        prefetch_pages=constants.DEFAULT_PREFETCH_PAGES,
+        prepared_statement_cache_size=0,
+        load_balancing_policy="round_robin",
+        health_check_interval=constants.DEFAULT_HEALTH_CHECK_INTERVAL,
+        json_decoder=None,
+        stream_rows=False,
+        experimental_python_types=False,
+        http_session=None,
+        transport=None,
+        result_cache=None,
+        retry_policy=None,
+        hedging=None,
+        hooks=None,
+        progress_callback=None,
     ):
         self.host = host
         self.port = port
@@ -94,16 +278,51 @@ class Connection(object):
         self.source = source
         self.catalog = catalog
         self.schema = schema
+        if session_properties is not None:
+            # shared by the requests of the connection, which update it with
+            # the session properties set by the queries
+            session_properties = trino.client.VersionedDict(session_properties)
         self.session_properties = session_properties
-        # mypy cannot follow module import
-        self._http_session = trino.client.TrinoRequest.http.Session()
-        self._http_session.verify = verify
+        if http_session is not None:
+            self._http_session = http_session
+        else:
+            # mypy cannot follow module import
+            self._http_session = trino.client.TrinoRequest.http.Session()
+            self._http_session.verify = verify
+            if transport is not None:
+                transport.configure(self._http_session)
         self.http_headers = http_headers
         self.http_scheme = http_scheme
         self.auth = auth
         self.redirect_handler = redirect_handler
         self.max_attempts = max_attempts
         self.request_timeout = request_timeout
+        self.prefetch_pages = prefetch_pages
+        self.json_decoder = json_decoder
+        self.stream_rows = stream_rows
+        self.experimental_python_types = experimental_python_types
+        self.result_cache = result_cache
+        self.retry_policy = retry_policy
+        self.hedging = hedging
+        self.hooks = hooks
+        self.progress_callback = progress_callback
+        if isinstance(host, (list, tuple)):
+            self._load_balancer = trino.loadbalancing.LoadBalancer(
+                trino.loadbalancing.parse_coordinators(host, port),
+                policy=load_balancing_policy,
+                health_check_interval=health_check_interval,
+                http_session=self._http_session,
+                http_scheme=http_scheme,
+                request_timeout=request_timeout,
+            )  # type: Optional[trino.loadbalancing.LoadBalancer]
+        else:
+            self._load_balancer = None
+        if prepared_statement_cache_size:
+            self._prepared_statement_cache = PreparedStatementCache(
+                prepared_statement_cache_size
+            )  # type: Optional[PreparedStatementCache]
+        else:
+            self._prepared_statement_cache = None
 
         self._isolation_level = isolation_level
         self._request = None
@@ -117,6 +336,16 @@ class Connection(object):
     def transaction(self):
         return self._transaction
 
+    @property
+    def load_balancer(self):
+        # type: () -> Optional[trino.loadbalancing.LoadBalancer]
+        return self._load_balancer
+
+    @property
+    def prepared_statement_cache(self):
+        # type: () -> Optional[PreparedStatementCache]
+        return self._prepared_statement_cache
+
     def __enter__(self):
         return self
 
@@ -129,9 +358,17 @@ class Connection(object):
             self.close()
 
     def close(self):
-        """Trino does not have anything to close"""
+        """Deallocate the cached prepared statements, Trino does not have
+        anything else to close"""
         # TODO cancel outstanding queries?
-        pass
+        if self._prepared_statement_cache is not None:
+            statements = self._prepared_statement_cache.clear()
+            if statements:
+                cursor = Cursor(self, self._create_request())
+                for statement_name, added_prepare_header in statements:
+                    cursor._deallocate_prepare_statement(added_prepare_header, statement_name)
+        if self._load_balancer is not None:
+            self._load_balancer.close()
 
     def start_transaction(self):
         self._transaction = Transaction(self._create_request())
@@ -151,9 +388,18 @@ class Connection(object):
         self._transaction = None
 
     def _create_request(self):
+        if self._load_balancer is not None:
+            # the coordinator is picked for each query
+            coordinator = self._load_balancer.coordinators[0]
+            host, port = coordinator.host, coordinator.port
+        else:
+            host, port = self.host, self.port
+        retry_kwargs = {}
+        if self.retry_policy is not None:
+            retry_kwargs["handle_retry"] = self.retry_policy
         return trino.client.TrinoRequest(
-            self.host,
-            self.port,
+            host,
+            port,
             self.user,
             self.source,
             self.catalog,
@@ -167,6 +413,13 @@ class Connection(object):
             self.redirect_handler,
             self.max_attempts,
             self.request_timeout,
+            prefetch_pages=self.prefetch_pages,
+            load_balancer=self._load_balancer,
+            json_decoder=self.json_decoder,
+            stream_rows=self.stream_rows,
+            hedging=self.hedging,
+            hooks=self.hooks,
+            **retry_kwargs
         )
 
     def cursor(self):
@@ -180,6 +433,264 @@ class Connection(object):
         return Cursor(self, request)
 
 
+class ConnectionPool(object):
+    """
+    Pool of :class:`Connection` objects shared by threads.
+
+    :param min_size: number of connections kept in the pool even when they
+                     are idle. They are created with the pool.
+    :param max_size: maximum number of connections checked out at once.
+    :param timeout: seconds :meth:`acquire` waits for a connection when
+                    ``max_size`` connections are checked out before raising
+                    :class:`trino.exceptions.OperationalError`.
+    :param max_idle_time: seconds after which an idle connection is closed,
+                          unless the pool would hold fewer than ``min_size``
+                          connections. ``None`` keeps idle connections.
+    :param health_check_idle_time: connections that have been idle for more
+                                   seconds are health checked with a request
+                                   to the ``/v1/info`` endpoint of the
+                                   coordinator before being checked out, and
+                                   replaced if the check fails. ``None``
+                                   disables health checks.
+    :param kwargs: arguments of the :class:`Connection` objects.
+
+    The connections share one ``requests.Session`` configured by the
+    ``transport`` argument, a :class:`trino.transport.TransportConfig`. By
+    default it keeps up to ``max_size`` HTTP connections per host, so that
+    their TCP and TLS connections are reused. When a connection is released, its
+    transaction is rolled back and its catalog, schema and session
+    properties are reset to the ones given to the pool.
+
+    Idle connections are evicted when a connection is acquired or released,
+    there is no background thread. ::
+
+        pool = ConnectionPool(max_size=8, host="localhost", user="the-user")
+        with pool.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            rows = cur.fetchall()
+    """
+
+    def __init__(
+        self,
+        min_size=0,
+        max_size=constants.DEFAULT_POOL_MAX_SIZE,
+        timeout=constants.DEFAULT_POOL_TIMEOUT,
+        max_idle_time=constants.DEFAULT_POOL_MAX_IDLE_TIME,
+        health_check_idle_time=constants.DEFAULT_POOL_HEALTH_CHECK_IDLE_TIME,
+        **kwargs
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        if not 0 <= min_size <= max_size:
+            raise ValueError("min_size must be between 0 and max_size")
+        if "http_session" in kwargs:
+            raise ValueError("the connections of a pool share its own http_session")
+        transport = kwargs.pop("transport", None)
+        if transport is None:
+            transport = trino.transport.TransportConfig(pool_maxsize=max_size)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle_time = max_idle_time
+        self.health_check_idle_time = health_check_idle_time
+        self._kwargs = kwargs
+
+        self._http_session = trino.client.TrinoRequest.http.Session()
+        self._http_session.verify = kwargs.get("verify", True)
+        transport.configure(self._http_session)
+
+        self._condition = threading.Condition()
+        self._idle = deque()  # type: deque
+        self._in_use = set()  # type: set
+        self._size = 0
+        self._closed = False
+        for _ in range(min_size):
+            self._idle.append((self._connect(), time.time()))
+            self._size += 1
+
+    @property
+    def size(self):
+        # type: () -> int
+        """Number of open connections, idle or checked out"""
+        return self._size
+
+    @property
+    def idle(self):
+        # type: () -> int
+        return len(self._idle)
+
+    def _connect(self):
+        # type: () -> Connection
+        return Connection(http_session=self._http_session, **self._kwargs)
+
+    def acquire(self, timeout=None):
+        # type: (Optional[float]) -> Connection
+        """Check out a connection, waiting up to ``timeout`` seconds (the
+        ``timeout`` of the pool by default) for one to be released"""
+        if timeout is None:
+            timeout = self.timeout
+        deadline = time.time() + timeout
+        while True:
+            evicted = []  # type: List[Connection]
+            try:
+                with self._condition:
+                    connection, released_at = self._checkout(deadline, timeout, evicted)
+            finally:
+                self._close_all(evicted)
+            if connection is None:
+                try:
+                    connection = self._connect()
+                except Exception:
+                    self._discard(None)
+                    raise
+            elif not self._check_health(connection, released_at):
+                self._discard(connection)
+                continue
+            with self._condition:
+                self._in_use.add(connection)
+            return connection
+
+    def _checkout(self, deadline, timeout, evicted):
+        # type: (float, float, List[Connection]) -> Tuple[Optional[Connection], Optional[float]]
+        """Pop an idle connection, or reserve room for a new one by returning
+        ``None``. Must be called with the condition held."""
+        while True:
+            if self._closed:
+                raise trino.exceptions.ProgrammingError("the connection pool is closed")
+            evicted.extend(self._evict_idle())
+            if self._idle:
+                # the most recently used connection is the most likely to
+                # have open HTTP connections
+                return self._idle.pop()
+            if self._size < self.max_size:
+                self._size += 1
+                return None, None
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise trino.exceptions.OperationalError(
+                    "timed out after {}s waiting for a connection".format(timeout)
+                )
+            self._condition.wait(remaining)
+
+    def _evict_idle(self):
+        # type: () -> List[Connection]
+        """Remove and return the connections idle for too long. Must be
+        called with the condition held."""
+        evicted = []  # type: List[Connection]
+        if self.max_idle_time is None:
+            return evicted
+        expired = time.time() - self.max_idle_time
+        while self._idle and self._size > self.min_size and self._idle[0][1] < expired:
+            evicted.append(self._idle.popleft()[0])
+            self._size -= 1
+        return evicted
+
+    def _check_health(self, connection, released_at):
+        # type: (Connection, float) -> bool
+        if (
+            self.health_check_idle_time is None
+            or time.time() - released_at <= self.health_check_idle_time
+            # the load balancer checks the health of the coordinators
+            or connection.load_balancer is not None
+        ):
+            return True
+        url = "{}://{}:{}{}".format(
+            connection.http_scheme,
+            connection.host,
+            connection.port,
+            trino.loadbalancing.URL_INFO_PATH,
+        )
+        try:
+            response = self._http_session.get(url, timeout=connection.request_timeout)
+        except Exception as err:
+            logger.debug("health check of %s failed: %s", url, err)
+            return False
+        return response.ok
+
+    def release(self, connection):
+        # type: (Connection) -> None
+        """Return a connection checked out with :meth:`acquire` to the pool"""
+        with self._condition:
+            if connection not in self._in_use:
+                raise trino.exceptions.ProgrammingError("connection does not belong to the pool")
+            self._in_use.discard(connection)
+        try:
+            self._reset(connection)
+        except Exception as err:
+            logger.warning("discarding a connection that failed to reset: %s", err)
+            self._discard(connection)
+            return
+        with self._condition:
+            if self._closed:
+                self._size -= 1
+                evicted = [connection]
+            else:
+                self._idle.append((connection, time.time()))
+                evicted = self._evict_idle()
+            self._condition.notify()
+        self._close_all(evicted)
+
+    def _reset(self, connection):
+        # type: (Connection) -> None
+        if connection.transaction is not None:
+            connection.rollback()
+        connection.catalog = self._kwargs.get("catalog", constants.DEFAULT_CATALOG)
+        connection.schema = self._kwargs.get("schema", constants.DEFAULT_SCHEMA)
+        session_properties = self._kwargs.get("session_properties")
+        if session_properties is not None:
+            session_properties = trino.client.VersionedDict(session_properties)
+        connection.session_properties = session_properties
+
+    def _discard(self, connection):
+        # type: (Optional[Connection]) -> None
+        """Give up a connection, or the room reserved for a new one"""
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+        if connection is not None:
+            self._close(connection)
+
+    def _close(self, connection):
+        # type: (Connection) -> None
+        try:
+            connection.close()
+        except Exception as err:
+            logger.warning("failed to close a connection: %s", err)
+
+    def _close_all(self, connections):
+        # type: (List[Connection]) -> None
+        for connection in connections:
+            self._close(connection)
+
+    @contextlib.contextmanager
+    def connection(self, timeout=None):
+        """Context manager that checks out a connection and releases it"""
+        connection = self.acquire(timeout)
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def close(self):
+        # type: () -> None
+        """Close the idle connections. The connections that are checked out
+        are closed when they are released."""
+        with self._condition:
+            self._closed = True
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._condition.notify_all()
+        self._close_all(idle)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
 class Cursor(object):
     """Database cursor.
 
@@ -197,6 +708,8 @@ class Cursor(object):
         self._request = request
 
         self.arraysize = 1
+        self.executemany_batch_rows = constants.DEFAULT_EXECUTEMANY_BATCH_ROWS
+        self.executemany_batch_bytes = constants.DEFAULT_EXECUTEMANY_BATCH_BYTES
         self._iterator = None
         self._query = None
 
@@ -241,6 +754,19 @@ class Cursor(object):
             return self._query.warnings
         return None
 
+    def progress(self):
+        """Return the :class:`trino.client.QueryProgress` of the last
+        executed query, built from its stats, or ``None`` when no query was
+        executed.
+
+        The stats are updated by each response of the coordinator, so the
+        progress advances as the rows are fetched, or in the background when
+        the connection has a ``progress_callback`` and ``prefetch_pages``.
+        """
+        if self._query is None:
+            return None
+        return self._query.progress
+
     def setinputsizes(self, sizes):
         raise trino.exceptions.NotSupportedError
 
@@ -293,7 +819,11 @@ class Cursor(object):
 
         # No need to deepcopy _request here because this is the actual request
         # operation
-        return trino.client.TrinoQuery(self._request, sql=sql)
+        return trino.client.TrinoQuery(
+            self._request, sql=sql,
+            experimental_python_types=self._connection.experimental_python_types,
+            progress_callback=self._connection.progress_callback,
+        )
 
     def _format_prepared_param(self, param):
         """
@@ -373,13 +903,82 @@ class Cursor(object):
     def _generate_unique_statement_name(self):
         return 'st_' + uuid.uuid4().hex.replace('-', '')
 
+    def _execute_cached_prepared_statement(self, operation, params):
+        cache = self._connection.prepared_statement_cache
+        statement = cache.get(operation)
+        if statement is None:
+            statement_name = self._generate_unique_statement_name()
+            added_prepare_header = self._prepare_statement(operation, statement_name)
+            for evicted_name, evicted_header in cache.put(
+                operation, statement_name, added_prepare_header
+            ):
+                self._deallocate_prepare_statement(evicted_header, evicted_name)
+        else:
+            statement_name, added_prepare_header = statement
+
+        self._query = self._get_added_prepare_statement_trino_query(
+            statement_name, params
+        )
+        return self._query.execute(
+            additional_http_headers={
+                constants.HEADER_PREPARED_STATEMENT: added_prepare_header
+            }
+        )
+
     def execute(self, operation, params=None):
+        self._close_result()
+        cache_key = self._get_result_cache_key(operation, params)
+        if cache_key is not None:
+            cached = self._connection.result_cache.get(cache_key)
+            if cached is not None:
+                columns, rows = cached
+                self._query = trino.result_cache.CachedQuery(self._request, operation, columns, rows)
+                result = self._query.execute()
+                self._iterator = iter(result)
+                return result
+
+        result = self._execute(operation, params)
+        if cache_key is not None:
+            result = self._connection.result_cache.record(cache_key, self._query, result)
+        if self._connection.progress_callback is not None:
+            # keep following the query, and publishing its progress, before
+            # its rows are read
+            result.prefetch()
+        self._iterator = iter(result)
+        return result
+
+    def _get_result_cache_key(self, operation, params):
+        """Return the key of the result of ``operation`` in the result cache
+        of the connection, or ``None`` when it is not cached"""
+        cache = self._connection.result_cache
+        if cache is None or self._connection.isolation_level != IsolationLevel.AUTOCOMMIT:
+            return None
+        sql = trino.result_cache.normalize_sql(operation)
+        if not trino.result_cache.is_cacheable(sql):
+            return None
+        connection = self._connection
+        return trino.result_cache.make_key(
+            sql,
+            list(params) if params else None,
+            host=connection.host,
+            port=connection.port,
+            user=connection.user,
+            catalog=connection.catalog,
+            schema=connection.schema,
+            session_properties=connection.session_properties,
+            experimental_python_types=connection.experimental_python_types,
+        )
+
+    def _execute(self, operation, params):
         if params:
             assert isinstance(params, (list, tuple)), (
                 'params must be a list or tuple containing the query '
                 'parameter values'
             )
 
+            if self._connection.prepared_statement_cache is not None:
+                return self._execute_cached_prepared_statement(operation, params)
+
             statement_name = self._generate_unique_statement_name()
             # Send prepare statement
             added_prepare_header = self._prepare_statement(
@@ -404,13 +1003,105 @@ class Cursor(object):
                 self._deallocate_prepare_statement(added_prepare_header, statement_name)
 
         else:
-            self._query = trino.client.TrinoQuery(self._request, sql=operation)
+            self._query = trino.client.TrinoQuery(
+                self._request, sql=operation,
+                experimental_python_types=self._connection.experimental_python_types,
+                progress_callback=self._connection.progress_callback,
+            )
             result = self._query.execute()
+        return result
+
+    def execute_partitioned(
+        self,
+        operation,
+        column,
+        lower=None,
+        upper=None,
+        partitions=constants.DEFAULT_PARTITIONS,
+        method=trino.parallel.RANGE,
+        ordered=False,
+    ):
+        """
+        Execute ``operation`` as ``partitions`` concurrent queries, each
+        filtering its result on ``column``, and fetch their rows as one
+        result.
+
+        With the ``range`` method, ``[lower, upper)`` is split into ranges of
+        equal width and the values out of the bounds belong to the first or
+        the last partition. With the ``hash`` method, rows are partitioned on
+        a hash of ``column``. When ``ordered`` is true, each partition is
+        sorted by ``column`` and the partitions are returned one after the
+        other, so that the rows of the ``range`` method are sorted by
+        ``column``. Otherwise pages are returned as soon as they are fetched.
+        See :mod:`trino.parallel`.
+        """
+        if self._connection.isolation_level != IsolationLevel.AUTOCOMMIT:
+            raise trino.exceptions.NotSupportedError(
+                "partitioned queries cannot run in a transaction"
+            )
+        statements = trino.parallel.partition_statements(
+            operation, column, lower, upper, partitions, method, ordered
+        )
+        self._close_result()
+        self._query = trino.parallel.PartitionedQuery(
+            self._connection._create_request,
+            statements,
+            ordered=ordered,
+            experimental_python_types=self._connection.experimental_python_types,
+        )
+        result = self._query.execute()
         self._iterator = iter(result)
         return result
 
     def executemany(self, operation, seq_of_params):
-        raise trino.exceptions.NotSupportedError
+        """
+        PEP-0249: Prepare a database operation and execute it against all
+        parameter sequences found in the sequence ``seq_of_params``.
+
+        ``INSERT INTO ... VALUES (?, ...)`` statements are rewritten into
+        multi-row ``VALUES`` lists: the parameters are formatted as SQL
+        literals and each batch is sent as one query. A batch is cut when it
+        reaches ``executemany_batch_rows`` rows or when its SQL text would
+        exceed ``executemany_batch_bytes`` bytes. Other statements are
+        executed once per parameter sequence.
+        """
+        match = _INSERT_VALUES_RE.match(operation)
+        if match is None or not _is_single_group(match.group("row")):
+            for params in seq_of_params:
+                self.execute(operation, params)
+                self.fetchall()
+            return
+
+        prefix = operation[:match.start("row")]
+        fragments = _split_placeholders(match.group("row"))
+        batch = []  # type: List[str]
+        batch_bytes = len(prefix.encode("utf-8"))
+        for params in seq_of_params:
+            if len(params) != len(fragments) - 1:
+                raise trino.exceptions.ProgrammingError(
+                    "expected {} parameters, got {}".format(len(fragments) - 1, len(params))
+                )
+            row = fragments[0] + "".join(
+                self._format_prepared_param(param) + fragment
+                for param, fragment in zip(params, fragments[1:])
+            )
+            row_bytes = len(row.encode("utf-8")) + 1  # including the separator
+            if batch and (
+                len(batch) >= self.executemany_batch_rows
+                or batch_bytes + row_bytes > self.executemany_batch_bytes
+            ):
+                self._execute_batch(prefix, batch)
+                batch = []
+                batch_bytes = len(prefix.encode("utf-8"))
+            batch.append(row)
+            batch_bytes += row_bytes
+        if batch:
+            self._execute_batch(prefix, batch)
+
+    def _execute_batch(self, prefix, rows):
+        logger.debug("inserting a batch of %s rows", len(rows))
+        self.execute(prefix + ",".join(rows))
+        self.fetchall()
 
     def fetchone(self):
         # type: () -> Optional[List[Any]]
@@ -455,21 +1146,118 @@ class Cursor(object):
         if size is None:
             size = self.arraysize
 
-        result = []
-        for _ in range(size):
-            row = self.fetchone()
-            if row is None:
-                break
-            result.append(row)
-
-        return result
+        # take the rows from the pages in bulk
+        try:
+            return list(itertools.islice(self._iterator, size))
+        except trino.exceptions.HttpError as err:
+            raise trino.exceptions.OperationalError(str(err))
 
     def genall(self):
         return self._query.result
 
+    def iter_pages(self):
+        """
+        Return a generator of :class:`trino.client.Page`, one per page of the
+        remaining rows of the query result, with the columns of the result
+        and a snapshot of the stats of the query.
+
+        Pages are returned as sent by the coordinator, without splitting them
+        into rows. It is meant to be called instead of the other fetch
+        methods, and raises :class:`trino.exceptions.ProgrammingError` once
+        some of the rows have been fetched by them.
+        """
+        pages = self._query.iter_pages()
+        while True:
+            try:
+                page = next(pages)
+            except StopIteration:
+                return
+            except trino.exceptions.HttpError as err:
+                raise trino.exceptions.OperationalError(str(err))
+            yield page
+
+    def fetch_numpy(self):
+        # type: () -> Dict[str, Any]
+        """
+        Fetch the remaining rows of the query result as a dict of NumPy
+        arrays keyed by column name. It requires NumPy.
+
+        Each page is appended to typed buffers as it is fetched. See
+        :mod:`trino.columnar` for the mapping of Trino types to NumPy types,
+        which applies to the values sent by the coordinator whatever
+        ``experimental_python_types``. It is meant to be called instead of
+        the other fetch methods, and raises
+        :class:`trino.exceptions.ProgrammingError` once some of the rows have
+        been fetched by them.
+        """
+        try:
+            return trino.columnar.to_numpy(self._query, self._query.result.iter_pages(convert=False))
+        except trino.exceptions.HttpError as err:
+            raise trino.exceptions.OperationalError(str(err))
+
+    def fetch_arrow_batches(self):
+        """
+        Return a generator of ``pyarrow.RecordBatch``, one per page of the
+        remaining rows of the query result. It requires pyarrow.
+
+        The schema is derived from the types of the columns. See
+        :mod:`trino.arrow` for the type mapping, which applies to the values
+        sent by the coordinator whatever ``experimental_python_types``. It is
+        meant to be called instead of the other fetch methods, and raises
+        :class:`trino.exceptions.ProgrammingError` once some of the rows have
+        been fetched by them.
+        """
+        batches = trino.arrow.iter_record_batches(self._query, self._query.result.iter_pages(convert=False))
+        while True:
+            try:
+                batch = next(batches)
+            except StopIteration:
+                return
+            except trino.exceptions.HttpError as err:
+                raise trino.exceptions.OperationalError(str(err))
+            yield batch
+
+    def fetch_arrow_table(self):
+        """
+        Fetch the remaining rows of the query result as a ``pyarrow.Table``.
+        """
+        try:
+            return trino.arrow.to_table(self._query, self._query.result.iter_pages(convert=False))
+        except trino.exceptions.HttpError as err:
+            raise trino.exceptions.OperationalError(str(err))
+
+    def fetch_spooled(self, path=None):
+        # type: (Optional[str]) -> trino.spool.SpooledRows
+        """
+        Write the remaining rows of the query result to a spool file as each
+        page is fetched, and return a :class:`trino.spool.SpooledRows` that
+        reads them back through a memory map.
+
+        The rows can then be iterated several times, sliced or accessed by
+        row number without holding them in memory. Without ``path`` the file
+        is temporary and removed when the ``SpooledRows`` is closed. It is
+        meant to be called instead of the other fetch methods, and raises
+        :class:`trino.exceptions.ProgrammingError` once some of the rows have
+        been fetched by them.
+        """
+        try:
+            return trino.spool.spool(
+                self._query,
+                self._query.result.iter_pages(convert=False),
+                path,
+                experimental_python_types=self._connection.experimental_python_types,
+            )
+        except trino.exceptions.HttpError as err:
+            raise trino.exceptions.OperationalError(str(err))
+
     def fetchall(self):
         # type: () -> List[List[Any]]
-        return list(self.genall())
+        """Fetch the remaining rows, from the same iterator as
+        :meth:`fetchone` and :meth:`fetchmany`"""
+        try:
+            return list(self._iterator)
+        except trino.exceptions.HttpError as err:
+            raise trino.exceptions.OperationalError(str(err))
 
     def cancel(self):
         if self._query is None:
@@ -477,9 +1265,21 @@ class Cursor(object):
                 "Cancel query failed; no running query"
             )
         self._query.cancel()
+        self._close_result()
 
     def close(self):
-        self._connection.close()
+        """Stop the threads that fetch the result of the last query in the
+        background, the prefetcher of its pages or the workers of a
+        partitioned query, and cancel the query when its result has not been
+        fully fetched. The other resources of a cursor are owned by its
+        connection, see :meth:`Connection.close`"""
+        self._close_result()
+
+    def _close_result(self):
+        # the threads keep fetching pages until the result is fully fetched
+        # or it is closed
+        if self._query is not None:
+            self._query.result.close()
 
 
 Date = datetime.date
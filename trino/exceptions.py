@@ -13,6 +13,10 @@
 
 This module defines exceptions for Trino operations. It follows the structure
 defined in pep-0249.
+
+It also implements the retry of HTTP requests: :func:`retry_with` and a
+:class:`RetryPolicy` with a :class:`RetryBudget`, a :class:`CircuitBreaker`
+and a deadline.
 """
 
 from __future__ import absolute_import
@@ -21,8 +25,11 @@ from __future__ import print_function
 
 import functools
 import random
+import threading
 import time
+from typing import Any, Dict, Optional  # NOQA for mypy types
 
+from trino import constants
 import trino.logging
 
 logger = trino.logging.get_logger(__name__)
@@ -36,6 +43,12 @@ class Http503Error(HttpError):
     pass
 
 
+class CircuitOpenError(HttpError):
+    """Raised without sending a request while a :class:`CircuitBreaker` is
+    open"""
+    pass
+
+
 class TrinoError(Exception):
     pass
 
@@ -108,22 +121,46 @@ class TrinoUserError(TrinoQueryError):
 
 
 def retry_with(handle_retry, exceptions, conditions, max_attempts):
+    """
+    Decorate a function to call it again while it raises one of
+    ``exceptions`` or its result matches one of ``conditions``, up to
+    ``max_attempts`` times.
+
+    ``handle_retry.retry(func, args, kwargs, err, attempt)`` is called before
+    each new attempt and may return ``False`` to stop retrying. When
+    ``handle_retry`` has a ``start(max_attempts)`` method, such as
+    :class:`RetryPolicy`, it is called for each call of the function and
+    returns the object whose
+    ``retry()`` method is called, and whose optional ``before_attempt()`` and
+    ``on_success()`` methods are called before each attempt and after a
+    successful one.
+    """
     def wrapper(func):
         @functools.wraps(func)
         def decorated(*args, **kwargs):
             error = None
             result = None
+            start = getattr(handle_retry, "start", None)
+            handler = start(max_attempts) if start is not None else handle_retry
+            before_attempt = getattr(handler, "before_attempt", None)
+            on_success = getattr(handler, "on_success", None)
             for attempt in range(1, max_attempts + 1):
+                if before_attempt is not None:
+                    before_attempt(attempt)
                 try:
                     result = func(*args, **kwargs)
                     if any(guard(result) for guard in conditions):
-                        handle_retry.retry(func, args, kwargs, None, attempt)
+                        if handler.retry(func, args, kwargs, None, attempt) is False:
+                            break
                         continue
+                    if on_success is not None:
+                        on_success()
                     return result
                 except Exception as err:
                     error = err
                     if any(isinstance(err, exc) for exc in exceptions):
-                        handle_retry.retry(func, args, kwargs, err, attempt)
+                        if handler.retry(func, args, kwargs, err, attempt) is False:
+                            break
                         continue
                     break
             logger.info("failed after %s attempts", attempt)
@@ -164,6 +201,244 @@ class RetryWithExponentialBackoff(object):
         time.sleep(delay)
 
 
+class RetryBudget(object):
+    """
+    Token bucket limiting the rate of retries.
+
+    Each retry takes a token. The bucket holds up to ``max_tokens`` tokens
+    and is refilled with ``refill_rate`` tokens per second. When it is
+    empty, requests fail instead of being retried, so that clients do not
+    all retry at once against an overloaded coordinator. A budget is
+    thread-safe and can be shared by the connections of a process.
+    """
+
+    def __init__(
+        self,
+        max_tokens=constants.DEFAULT_RETRY_BUDGET_TOKENS,
+        refill_rate=constants.DEFAULT_RETRY_BUDGET_REFILL_RATE,
+    ):
+        self.max_tokens = float(max_tokens)
+        self.refill_rate = float(refill_rate)
+        self._tokens = self.max_tokens
+        self._updated = time.time()
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.denied = 0
+
+    def _refill(self):
+        now = time.time()
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._updated) * self.refill_rate)
+        self._updated = now
+
+    @property
+    def tokens(self):
+        # type: () -> float
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def try_acquire(self):
+        # type: () -> bool
+        """Take a token and return whether there was one"""
+        with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                self.denied += 1
+                return False
+            self._tokens -= 1
+            self.acquired += 1
+            return True
+
+
+class CircuitBreaker(object):
+    """
+    Fail fast after ``failure_threshold`` consecutive failures.
+
+    The breaker is ``closed`` while requests succeed. It opens after
+    ``failure_threshold`` consecutive connection errors or 503 responses,
+    and then raises :class:`CircuitOpenError` without sending requests.
+    After ``reset_timeout`` seconds it is ``half_open``: one request is sent,
+    and it closes if that request succeeds or opens again otherwise.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold=constants.DEFAULT_CIRCUIT_BREAKER_FAILURES,
+        reset_timeout=constants.DEFAULT_CIRCUIT_BREAKER_RESET_TIMEOUT,
+    ):
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be at least 1")
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._trial = False
+        self._trial_started = 0.0
+        self._lock = threading.Lock()
+        self.consecutive_failures = 0
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self):
+        # type: () -> str
+        with self._lock:
+            if self._state == self.OPEN and time.time() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def before_request(self):
+        # type: () -> None
+        """Raise :class:`CircuitOpenError` if the request must not be sent"""
+        with self._lock:
+            if self._state == self.OPEN:
+                if time.time() - self._opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    raise CircuitOpenError("circuit breaker is open")
+                self._state = self.HALF_OPEN
+                self._trial = False
+            if self._state == self.HALF_OPEN:
+                # a trial whose outcome was not recorded expires
+                if self._trial and time.time() - self._trial_started < self.reset_timeout:
+                    self.rejected += 1
+                    raise CircuitOpenError("circuit breaker is half open")
+                self._trial = True
+                self._trial_started = time.time()
+
+    def record_success(self):
+        # type: () -> None
+        with self._lock:
+            self.consecutive_failures = 0
+            self._state = self.CLOSED
+            self._trial = False
+
+    def record_failure(self):
+        # type: () -> None
+        with self._lock:
+            self.consecutive_failures += 1
+            if self._state == self.HALF_OPEN or (
+                self._state == self.CLOSED and self.consecutive_failures >= self.failure_threshold
+            ):
+                self._state = self.OPEN
+                self._opened_at = time.time()
+                self._trial = False
+                self.opened += 1
+
+
+class RetryPolicy(object):
+    """
+    Retry policy of the requests of a connection, given as its
+    ``retry_policy``.
+
+    :param backoff: function returning the delay before an attempt. By
+                    default the delay grows exponentially from 100ms, with
+                    jitter, up to ``max_delay`` seconds.
+    :param budget: :class:`RetryBudget` limiting the rate of retries.
+    :param circuit_breaker: :class:`CircuitBreaker` that fails fast while
+                            the coordinator keeps failing.
+    :param deadline: seconds after the first attempt of a request past which
+                     it is not retried.
+    :param max_delay: maximum delay of the default ``backoff``.
+
+    The budget and the circuit breaker can be shared by several policies.
+    :attr:`metrics` counts the attempts, retries and failures. A policy is
+    shared by the requests of a connection and is not copied by
+    ``copy.deepcopy``.
+    """
+
+    def __init__(
+        self,
+        backoff=None,
+        budget=None,  # type: Optional[RetryBudget]
+        circuit_breaker=None,  # type: Optional[CircuitBreaker]
+        deadline=None,  # type: Optional[float]
+        max_delay=constants.DEFAULT_RETRY_MAX_DELAY,  # type: float
+    ):
+        self.backoff = backoff or DelayExponential(max_delay=max_delay)
+        self.budget = budget
+        self.circuit_breaker = circuit_breaker
+        self.deadline = deadline
+        self._lock = threading.Lock()
+        self._counters = {
+            "attempts": 0,
+            "retries": 0,
+            "failures": 0,
+            "budget_exhausted": 0,
+            "deadline_exceeded": 0,
+        }
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    @property
+    def metrics(self):
+        # type: () -> Dict[str, Any]
+        """Counters of the policy and state of its budget and breaker"""
+        with self._lock:
+            metrics = dict(self._counters)  # type: Dict[str, Any]
+        if self.budget is not None:
+            metrics["budget_tokens"] = self.budget.tokens
+        if self.circuit_breaker is not None:
+            metrics["circuit_state"] = self.circuit_breaker.state
+            metrics["circuit_opened"] = self.circuit_breaker.opened
+            metrics["circuit_rejected"] = self.circuit_breaker.rejected
+        return metrics
+
+    def start(self, max_attempts):
+        # type: (int) -> _RetryCall
+        return _RetryCall(self, max_attempts)
+
+
+class _RetryCall(object):
+    """Retry state of one call decorated by :func:`retry_with`"""
+
+    def __init__(self, policy, max_attempts):
+        # type: (RetryPolicy, int) -> None
+        self._policy = policy
+        self._max_attempts = max_attempts
+        self._started = time.time()
+
+    def before_attempt(self, attempt):
+        # type: (int) -> None
+        self._policy._count("attempts")
+        if self._policy.circuit_breaker is not None:
+            self._policy.circuit_breaker.before_request()
+
+    def on_success(self):
+        # type: () -> None
+        if self._policy.circuit_breaker is not None:
+            self._policy.circuit_breaker.record_success()
+
+    def retry(self, func, args, kwargs, err, attempt):
+        # type: (Any, Any, Any, Optional[Exception], int) -> bool
+        policy = self._policy
+        policy._count("failures")
+        if policy.circuit_breaker is not None:
+            policy.circuit_breaker.record_failure()
+        if attempt >= self._max_attempts:
+            return False
+        delay = policy.backoff(attempt)
+        if policy.deadline is not None and time.time() + delay - self._started > policy.deadline:
+            logger.debug("not retrying past the deadline of %ss", policy.deadline)
+            policy._count("deadline_exceeded")
+            return False
+        if policy.budget is not None and not policy.budget.try_acquire():
+            logger.debug("not retrying, the retry budget is exhausted")
+            policy._count("budget_exhausted")
+            return False
+        policy._count("retries")
+        time.sleep(delay)
+        return True
+
+
 # PEP 249
 class Error(Exception):
     pass
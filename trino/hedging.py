@@ -0,0 +1,283 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+This module implements hedged requests to cut the tail latency of the
+fetches of result pages.
+
+A GET of a ``nextUri`` that has not answered within a threshold is sent a
+second time, and the first response is used. The other one is closed when
+it arrives. This is safe because fetching the same ``nextUri`` again returns
+the same page. The threshold adapts to a percentile of the latencies of the
+recent requests: ::
+
+    >> hedging = HedgingPolicy(percentile=95)
+    >> conn = trino.dbapi.connect(host="coordinator", hedging=hedging)
+    >> ...
+    >> hedging.metrics
+    {'requests': 120, 'hedged': 7, 'hedge_wins': 5, ...}
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional  # NOQA for mypy types
+
+from trino import constants
+import trino.logging
+
+try:
+    import queue
+except ImportError:
+    # Python 2
+    import Queue as queue  # type: ignore
+
+
+__all__ = ["HedgingPolicy"]
+
+
+logger = trino.logging.get_logger(__name__)
+
+PRIMARY = "primary"
+HEDGE = "hedge"
+
+
+class LatencyTracker(object):
+    """Latencies of the last ``window`` requests"""
+
+    def __init__(self, window):
+        # type: (int) -> None
+        self._latencies = deque(maxlen=window)  # type: deque
+
+    def __len__(self):
+        return len(self._latencies)
+
+    def add(self, latency):
+        # type: (float) -> None
+        self._latencies.append(latency)
+
+    def percentile(self, percentile):
+        # type: (float) -> Optional[float]
+        if not self._latencies:
+            return None
+        latencies = sorted(self._latencies)
+        index = min(len(latencies) - 1, int(len(latencies) * percentile / 100.0))
+        return latencies[index]
+
+
+class WorkerPool(object):
+    """
+    Daemon threads running tasks, started as the tasks are submitted up to
+    ``max_workers`` and stopped once they have been idle for
+    :attr:`IDLE_TIMEOUT` seconds. The tasks that are submitted while all the
+    workers are busy wait for one of them.
+    """
+
+    IDLE_TIMEOUT = 60.0  # seconds
+
+    def __init__(self, max_workers, name):
+        # type: (int, str) -> None
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.max_workers = max_workers
+        self._name = name
+        self._tasks = queue.Queue()  # type: queue.Queue
+        self._lock = threading.Lock()
+        self._workers = 0
+        # workers waiting for a task, minus the tasks waiting for a worker
+        self._idle = 0
+
+    @property
+    def workers(self):
+        # type: () -> int
+        with self._lock:
+            return self._workers
+
+    def submit(self, task, *args):
+        # type: (Callable[..., Any], *Any) -> None
+        with self._lock:
+            self._tasks.put((task, args))
+            if self._idle > 0 or self._workers >= self.max_workers:
+                self._idle -= 1
+                return
+            self._workers += 1
+        thread = threading.Thread(target=self._work, name=self._name)
+        thread.daemon = True
+        thread.start()
+
+    def _work(self):
+        while True:
+            try:
+                task, args = self._tasks.get(timeout=self.IDLE_TIMEOUT)
+            except queue.Empty:
+                with self._lock:
+                    if self._tasks.empty():
+                        self._workers -= 1
+                        self._idle -= 1
+                        return
+                continue
+            try:
+                task(*args)
+            except Exception:
+                logger.exception("task of %s failed", self._name)
+            with self._lock:
+                self._idle += 1
+
+
+class _HedgedCall(object):
+    """Requests of a call of :meth:`HedgingPolicy.call`. The responses that
+    arrive once the call has returned are closed."""
+
+    def __init__(self, policy, send, args, kwargs):
+        # type: (HedgingPolicy, Callable[..., Any], Any, Any) -> None
+        self.responses = queue.Queue()  # type: queue.Queue
+        self._policy = policy
+        self._send = send
+        self._args = args
+        self._kwargs = kwargs
+        self._returned = False
+        self._lock = threading.Lock()
+
+    def run(self, name):
+        # type: (str) -> None
+        start = time.time()
+        try:
+            response = self._send(*self._args, **self._kwargs)
+        except Exception as err:
+            response, error = None, err
+        else:
+            error = None
+            self._policy._record_latency(time.time() - start)
+        with self._lock:
+            if not self._returned:
+                self.responses.put((name, response, error))
+                return
+        if response is not None:
+            response.close()
+
+    def close(self):
+        # type: () -> None
+        """Close the responses that have not been returned"""
+        with self._lock:
+            self._returned = True
+        while True:
+            try:
+                _, response, _ = self.responses.get_nowait()
+            except queue.Empty:
+                return
+            if response is not None:
+                response.close()
+
+
+class HedgingPolicy(object):
+    """
+    Send a second request when the first one is slower than a threshold.
+
+    :param percentile: percentile of the latencies of the last ``window``
+                       requests used as threshold.
+    :param min_delay: minimum threshold in seconds, so that fast requests
+                      are not all sent twice.
+    :param initial_delay: threshold until ``min_samples`` latencies have
+                          been observed.
+    :param max_workers: maximum number of threads sending the requests. They
+                        are reused from a request to the next.
+
+    A policy is thread-safe and can be shared by several connections. It is
+    not copied by ``copy.deepcopy``. :attr:`metrics` counts the requests,
+    the hedged requests and the requests won by the hedge.
+    """
+
+    def __init__(
+        self,
+        percentile=constants.DEFAULT_HEDGING_PERCENTILE,  # type: float
+        min_delay=constants.DEFAULT_HEDGING_MIN_DELAY,  # type: float
+        initial_delay=constants.DEFAULT_HEDGING_INITIAL_DELAY,  # type: float
+        window=constants.DEFAULT_HEDGING_WINDOW,  # type: int
+        min_samples=constants.DEFAULT_HEDGING_MIN_SAMPLES,  # type: int
+        max_workers=constants.DEFAULT_HEDGING_MAX_WORKERS,  # type: int
+    ):
+        # type: (...) -> None
+        if not 0 < percentile <= 100:
+            raise ValueError("percentile must be in (0, 100]")
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self._latencies = LatencyTracker(window)
+        self._workers = WorkerPool(max_workers, "trino-hedging")
+        self._lock = threading.Lock()
+        self._counters = {
+            "requests": 0,
+            "hedged": 0,
+            "hedge_wins": 0,
+            "failures": 0,
+        }
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    @property
+    def delay(self):
+        # type: () -> float
+        """Seconds after which a request is sent again"""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return self.initial_delay
+            return max(self.min_delay, self._latencies.percentile(self.percentile))
+
+    @property
+    def metrics(self):
+        # type: () -> Dict[str, Any]
+        with self._lock:
+            metrics = dict(self._counters)  # type: Dict[str, Any]
+        metrics["delay"] = self.delay
+        return metrics
+
+    def _record_latency(self, latency):
+        # type: (float) -> None
+        with self._lock:
+            self._latencies.add(latency)
+
+    def call(self, send, *args, **kwargs):
+        # type: (Callable[..., Any], *Any, **Any) -> Any
+        """Return the first response of ``send(*args, **kwargs)``, sent a
+        second time if it does not answer within :attr:`delay`"""
+        self._count("requests")
+        call = _HedgedCall(self, send, args, kwargs)
+        self._workers.submit(call.run, PRIMARY)
+        outstanding = 1
+        try:
+            name, response, error = call.responses.get(timeout=self.delay)
+        except queue.Empty:
+            self._count("hedged")
+            logger.debug("sending a hedged request after %ss", self.delay)
+            self._workers.submit(call.run, HEDGE)
+            outstanding = 2
+            name, response, error = call.responses.get()
+        outstanding -= 1
+        if error is not None and outstanding:
+            # the other request may still succeed
+            self._count("failures")
+            name, response, error = call.responses.get()
+        call.close()
+        if error is not None:
+            raise error
+        if name == HEDGE:
+            self._count("hedge_wins")
+        return response
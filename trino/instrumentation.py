@@ -0,0 +1,649 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+This module implements hooks called during the lifecycle of the queries, to
+see where their time goes.
+
+A hook is an object with some of the methods of :class:`QueryHooks`:
+
+- ``on_request_start(event)`` and ``on_request_end(event)`` around each
+  HTTP request sent to the coordinator, retries included, with a
+  :class:`RequestEvent`.
+- ``on_retry(event)`` after a failed request, with a :class:`RetryEvent`.
+- ``on_page(event)`` for each page of a query once its rows have been
+  decoded, with a :class:`PageEvent`.
+- ``on_query_finish(event)`` once a query has finished, failed or been
+  cancelled, with a :class:`QueryEvent`.
+
+The hooks are given to :class:`trino.dbapi.Connection` or
+:class:`trino.client.TrinoRequest`. Nothing is measured when there are
+none. :class:`MetricsCollector` aggregates the events into counters and
+histograms, exported with :func:`prometheus_text`, while
+:class:`OpenTelemetryHooks` records them with the instruments of an
+OpenTelemetry meter: ::
+
+    >> metrics = MetricsCollector()
+    >> conn = trino.dbapi.connect(host="coordinator", hooks=[metrics])
+    >> ...
+    >> print(prometheus_text(metrics))
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import bisect
+import functools
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Text, Tuple  # NOQA for mypy types
+
+import trino.logging
+
+
+__all__ = [
+    "MetricsCollector",
+    "OpenTelemetryHooks",
+    "QueryHooks",
+    "prometheus_text",
+]
+
+
+logger = trino.logging.get_logger(__name__)
+
+EVENTS = ("on_request_start", "on_request_end", "on_retry", "on_page", "on_query_finish")
+
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+ROWS_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000)
+BYTES_BUCKETS = (1024, 16 * 1024, 128 * 1024, 1024 * 1024, 8 * 1024 * 1024, 64 * 1024 * 1024)
+
+
+class RequestEvent(object):
+    """
+    HTTP request sent to the coordinator.
+
+    ``elapsed``, ``status_code``, ``bytes`` (the ``Content-Length`` of the
+    response) and ``error`` are only set by ``on_request_end``.
+    """
+
+    def __init__(self, method, url):
+        # type: (Text, Text) -> None
+        self.method = method
+        self.url = url
+        self.start = time.time()
+        self.elapsed = None  # type: Optional[float]
+        self.status_code = None  # type: Optional[int]
+        self.bytes = None  # type: Optional[int]
+        self.error = None  # type: Optional[Exception]
+
+    def __repr__(self):
+        return "RequestEvent(method={}, url={}, elapsed={}, status_code={}, bytes={}, error={!r})".format(
+            self.method, self.url, self.elapsed, self.status_code, self.bytes, self.error
+        )
+
+
+class RetryEvent(object):
+    """
+    Failed attempt of a request. ``error`` is ``None`` when it failed with a
+    503 response. ``backoff`` is the time spent by the retry handler before
+    the next attempt and ``retried`` is false when it gave up.
+    """
+
+    def __init__(self, url, attempt, error, backoff, retried):
+        # type: (Optional[Text], int, Optional[Exception], float, bool) -> None
+        self.url = url
+        self.attempt = attempt
+        self.error = error
+        self.backoff = backoff
+        self.retried = retried
+
+    def __repr__(self):
+        return "RetryEvent(url={}, attempt={}, error={!r}, backoff={}, retried={})".format(
+            self.url, self.attempt, self.error, self.backoff, self.retried
+        )
+
+
+class PageEvent(object):
+    """
+    Page of a query.
+
+    ``fetch_seconds`` is the time taken by the HTTP request of the page,
+    retries included, and ``decode_seconds`` the time taken to decode its
+    body. ``rows`` is ``None`` for the pages read with ``stream_rows``, whose
+    rows are decoded while they are consumed, and ``bytes`` is ``None`` when
+    the size of the response is not known. ``stats`` are the stats of the
+    query after the page.
+    """
+
+    def __init__(self, query_id, number, rows, bytes, fetch_seconds, decode_seconds, stats):
+        # type: (Optional[Text], int, Optional[int], Optional[int], float, float, Dict[Text, Any]) -> None
+        self.query_id = query_id
+        self.number = number
+        self.rows = rows
+        self.bytes = bytes
+        self.fetch_seconds = fetch_seconds
+        self.decode_seconds = decode_seconds
+        self.stats = stats
+
+    def __repr__(self):
+        return "PageEvent(query_id={}, number={}, rows={}, bytes={}, fetch_seconds={}, decode_seconds={})".format(
+            self.query_id, self.number, self.rows, self.bytes, self.fetch_seconds, self.decode_seconds
+        )
+
+
+class QueryEvent(object):
+    """
+    Query that has finished, failed or been cancelled.
+
+    ``elapsed`` is the time since the query was sent. It is split into
+    ``fetch_seconds`` spent in the HTTP requests of the pages,
+    ``decode_seconds`` spent decoding them and :attr:`client_seconds`, the
+    rest of the time, spent by the application handling the rows.
+    ``queued_seconds`` is the time the query waited in the queue of the
+    coordinator, according to its stats.
+    """
+
+    def __init__(
+        self,
+        query_id,  # type: Optional[Text]
+        sql,  # type: Text
+        state,  # type: Optional[Text]
+        elapsed,  # type: float
+        pages,  # type: int
+        rows,  # type: Optional[int]
+        bytes,  # type: int
+        fetch_seconds,  # type: float
+        decode_seconds,  # type: float
+        stats,  # type: Dict[Text, Any]
+        error=None,  # type: Optional[Exception]
+    ):
+        # type: (...) -> None
+        self.query_id = query_id
+        self.sql = sql
+        self.state = state
+        self.elapsed = elapsed
+        self.pages = pages
+        self.rows = rows
+        self.bytes = bytes
+        self.fetch_seconds = fetch_seconds
+        self.decode_seconds = decode_seconds
+        self.stats = stats
+        self.error = error
+
+    @property
+    def queued_seconds(self):
+        # type: () -> Optional[float]
+        millis = self.stats.get("queuedTimeMillis")
+        return millis / 1000.0 if millis is not None else None
+
+    @property
+    def client_seconds(self):
+        # type: () -> float
+        return max(0.0, self.elapsed - self.fetch_seconds - self.decode_seconds)
+
+    def __repr__(self):
+        return "QueryEvent(query_id={}, state={}, elapsed={}, pages={}, rows={}, error={!r})".format(
+            self.query_id, self.state, self.elapsed, self.pages, self.rows, self.error
+        )
+
+
+class QueryHooks(object):
+    """Base class of the hooks, whose methods do nothing. Subclasses override
+    the methods of the events they handle."""
+
+    def on_request_start(self, event):
+        # type: (RequestEvent) -> None
+        pass
+
+    def on_request_end(self, event):
+        # type: (RequestEvent) -> None
+        pass
+
+    def on_retry(self, event):
+        # type: (RetryEvent) -> None
+        pass
+
+    def on_page(self, event):
+        # type: (PageEvent) -> None
+        pass
+
+    def on_query_finish(self, event):
+        # type: (QueryEvent) -> None
+        pass
+
+
+class HookDispatcher(object):
+    """
+    Call the methods of several hooks for each event.
+
+    Only the methods that are implemented, i.e. not inherited from
+    :class:`QueryHooks`, are called. The errors raised by the hooks are
+    logged and ignored. A dispatcher is shared by the requests of a
+    connection and is not copied by ``copy.deepcopy``.
+    """
+
+    def __init__(self, hooks):
+        # type: (Sequence[Any]) -> None
+        self.hooks = list(hooks)
+        self._handlers = {}  # type: Dict[str, List[Callable[[Any], None]]]
+        for name in EVENTS:
+            default = getattr(QueryHooks, name)
+            # unbound method in Python 2
+            default = getattr(default, "__func__", default)
+            handlers = []
+            for hook in self.hooks:
+                method = getattr(hook, name, None)
+                if method is None or getattr(method, "__func__", None) is default:
+                    continue
+                handlers.append(method)
+            self._handlers[name] = handlers
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def handles(self, name):
+        # type: (str) -> bool
+        return bool(self._handlers[name])
+
+    def emit(self, name, event):
+        # type: (str, Any) -> None
+        for handler in self._handlers[name]:
+            try:
+                handler(event)
+            except Exception:
+                logger.exception("hook %s failed", handler)
+
+    def wrap_send(self, send, method):
+        # type: (Callable[..., Any], Text) -> Callable[..., Any]
+        """Emit the request events around each call of ``send``"""
+        if not self.handles("on_request_start") and not self.handles("on_request_end"):
+            return send
+
+        @functools.wraps(send)
+        def instrumented(url, *args, **kwargs):
+            event = RequestEvent(method, url)
+            self.emit("on_request_start", event)
+            try:
+                response = send(url, *args, **kwargs)
+            except Exception as err:
+                event.error = err
+                raise
+            else:
+                event.status_code = getattr(response, "status_code", None)
+                event.bytes = content_length(response)
+            finally:
+                event.elapsed = time.time() - event.start
+                self.emit("on_request_end", event)
+            return response
+
+        return instrumented
+
+    def wrap_retry(self, handle_retry):
+        # type: (Any) -> Any
+        """Return a retry handler emitting a retry event for each failed
+        attempt handled by ``handle_retry``"""
+        if not self.handles("on_retry"):
+            return handle_retry
+        return _RetryHooks(handle_retry, self)
+
+
+class _RetryHooks(object):
+    """Retry handler of :func:`trino.exceptions.retry_with` delegating to
+    another one"""
+
+    def __init__(self, handler, dispatcher):
+        self._handler = handler
+        self._dispatcher = dispatcher
+
+    def start(self, max_attempts):
+        start = getattr(self._handler, "start", None)
+        if start is None:
+            return self
+        return _RetryHooks(start(max_attempts), self._dispatcher)
+
+    def __getattr__(self, name):
+        # before_attempt() and on_success() are optional
+        return getattr(self._handler, name)
+
+    def retry(self, func, args, kwargs, err, attempt):
+        start = time.time()
+        retried = self._handler.retry(func, args, kwargs, err, attempt)
+        self._dispatcher.emit("on_retry", RetryEvent(
+            url=args[0] if args else kwargs.get("url"),
+            attempt=attempt,
+            error=err,
+            backoff=time.time() - start,
+            retried=retried is not False,
+        ))
+        return retried
+
+
+class QueryTracker(object):
+    """Emit the page and query events of a query, accumulating its
+    timings"""
+
+    def __init__(self, dispatcher, sql):
+        # type: (HookDispatcher, Text) -> None
+        self._dispatcher = dispatcher
+        self.sql = sql
+        self.start = time.time()
+        self.pages = 0
+        self.rows = 0  # type: Optional[int]
+        self.bytes = 0
+        self.fetch_seconds = 0.0
+        self.decode_seconds = 0.0
+        self.finished = False
+
+    def page(self, query_id, stats, rows, response, fetch_seconds, decode_seconds):
+        # type: (Optional[Text], Dict[Text, Any], Any, Any, float, float) -> None
+        """Emit the event of a page whose rows are ``rows``, a list or a
+        stream of rows"""
+        row_count = len(rows) if isinstance(rows, list) else None
+        size = content_length(response)
+        if size is None and row_count is not None:
+            content = getattr(response, "content", None)
+            size = len(content) if isinstance(content, bytes) else None
+        self.pages += 1
+        if row_count is None or self.rows is None:
+            self.rows = None
+        else:
+            self.rows += row_count
+        self.bytes += size or 0
+        self.fetch_seconds += fetch_seconds
+        self.decode_seconds += decode_seconds
+        self._dispatcher.emit("on_page", PageEvent(
+            query_id, self.pages, row_count, size, fetch_seconds, decode_seconds, dict(stats)
+        ))
+
+    def finish(self, query_id, stats, error=None, state=None):
+        # type: (Optional[Text], Dict[Text, Any], Optional[Exception], Optional[Text]) -> None
+        """Emit the event of the query, once"""
+        if self.finished:
+            return
+        self.finished = True
+        if state is None:
+            state = "FAILED" if error is not None else stats.get("state")
+        self._dispatcher.emit("on_query_finish", QueryEvent(
+            query_id=query_id,
+            sql=self.sql,
+            state=state,
+            elapsed=time.time() - self.start,
+            pages=self.pages,
+            rows=self.rows,
+            bytes=self.bytes,
+            fetch_seconds=self.fetch_seconds,
+            decode_seconds=self.decode_seconds,
+            stats=dict(stats),
+            error=error,
+        ))
+
+
+def content_length(response):
+    # type: (Any) -> Optional[int]
+    headers = getattr(response, "headers", None)
+    length = headers.get("Content-Length") if headers is not None else None
+    try:
+        return int(length) if length is not None else None
+    except ValueError:
+        return None
+
+
+class Histogram(object):
+    """Count of the observed values in cumulative buckets, as in Prometheus.
+    Not thread-safe."""
+
+    def __init__(self, buckets):
+        # type: (Sequence[float]) -> None
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        # type: (float) -> None
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative_counts(self):
+        # type: () -> List[Tuple[float, int]]
+        """Return the ``(upper bound, count)`` of each bucket, the last one
+        being ``(inf, count)``"""
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def percentile(self, percentile):
+        # type: (float) -> Optional[float]
+        """Upper bound of the bucket of the given percentile"""
+        if not self.count:
+            return None
+        rank = self.count * percentile / 100.0
+        for bound, total in self.cumulative_counts():
+            if total >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self):
+        # type: () -> Dict[str, Any]
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+
+COUNTERS = (
+    ("requests", "HTTP requests sent to the coordinator"),
+    ("request_errors", "HTTP requests that failed with an error or a 5xx status"),
+    ("retries", "failed attempts of the HTTP requests"),
+    ("pages", "pages of the queries"),
+    ("rows", "rows of the pages"),
+    ("bytes", "bytes of the responses of the pages"),
+    ("queries", "finished, failed or cancelled queries"),
+    ("query_errors", "failed queries"),
+)
+
+HISTOGRAMS = (
+    ("request_seconds", SECONDS_BUCKETS, "time taken by the HTTP requests"),
+    ("retry_backoff_seconds", SECONDS_BUCKETS, "time waited before retrying a request"),
+    ("page_fetch_seconds", SECONDS_BUCKETS, "time taken to fetch a page, retries included"),
+    ("page_decode_seconds", SECONDS_BUCKETS, "time taken to decode a page"),
+    ("page_rows", ROWS_BUCKETS, "rows per page"),
+    ("page_bytes", BYTES_BUCKETS, "bytes per page"),
+    ("query_seconds", SECONDS_BUCKETS, "time taken by the queries"),
+    ("query_queued_seconds", SECONDS_BUCKETS, "time the queries waited in the queue of the coordinator"),
+    ("query_client_seconds", SECONDS_BUCKETS, "time spent by the application handling the rows of the queries"),
+)
+
+
+class MetricsCollector(QueryHooks):
+    """
+    Hook aggregating the events into counters and histograms.
+
+    It is thread-safe and can be shared by several connections.
+    :meth:`snapshot` returns the current values.
+    """
+
+    def __init__(self):
+        # type: () -> None
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        # type: () -> None
+        with self._lock:
+            self.counters = dict((name, 0) for name, _ in COUNTERS)  # type: Dict[str, int]
+            self.histograms = dict(
+                (name, Histogram(buckets)) for name, buckets, _ in HISTOGRAMS
+            )  # type: Dict[str, Histogram]
+
+    def on_request_end(self, event):
+        # type: (RequestEvent) -> None
+        with self._lock:
+            self.counters["requests"] += 1
+            if event.error is not None or (event.status_code or 0) >= 500:
+                self.counters["request_errors"] += 1
+            self.histograms["request_seconds"].observe(event.elapsed)
+
+    def on_retry(self, event):
+        # type: (RetryEvent) -> None
+        with self._lock:
+            self.counters["retries"] += 1
+            self.histograms["retry_backoff_seconds"].observe(event.backoff)
+
+    def on_page(self, event):
+        # type: (PageEvent) -> None
+        with self._lock:
+            self.counters["pages"] += 1
+            self.histograms["page_fetch_seconds"].observe(event.fetch_seconds)
+            self.histograms["page_decode_seconds"].observe(event.decode_seconds)
+            if event.rows is not None:
+                self.counters["rows"] += event.rows
+                self.histograms["page_rows"].observe(event.rows)
+            if event.bytes is not None:
+                self.counters["bytes"] += event.bytes
+                self.histograms["page_bytes"].observe(event.bytes)
+
+    def on_query_finish(self, event):
+        # type: (QueryEvent) -> None
+        with self._lock:
+            self.counters["queries"] += 1
+            if event.error is not None:
+                self.counters["query_errors"] += 1
+            self.histograms["query_seconds"].observe(event.elapsed)
+            self.histograms["query_client_seconds"].observe(event.client_seconds)
+            if event.queued_seconds is not None:
+                self.histograms["query_queued_seconds"].observe(event.queued_seconds)
+
+    def snapshot(self):
+        # type: () -> Dict[str, Any]
+        """Return the counters and a summary of the histograms"""
+        with self._lock:
+            result = dict(self.counters)  # type: Dict[str, Any]
+            for name, histogram in self.histograms.items():
+                result[name] = histogram.snapshot()
+            return result
+
+    def collect(self):
+        # type: () -> List[Tuple[str, str, str, Any]]
+        """Return the ``(name, type, description, value)`` of each metric.
+        The value of a histogram is a copy of the :class:`Histogram`."""
+        metrics = []
+        with self._lock:
+            for name, description in COUNTERS:
+                metrics.append((name, "counter", description, self.counters[name]))
+            for name, _, description in HISTOGRAMS:
+                histogram = self.histograms[name]
+                copy = Histogram(histogram.buckets)
+                copy.counts = list(histogram.counts)
+                copy.count = histogram.count
+                copy.sum = histogram.sum
+                metrics.append((name, "histogram", description, copy))
+        return metrics
+
+
+def _format_value(value):
+    # type: (float) -> str
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def prometheus_text(collector, prefix="trino_client_"):
+    # type: (MetricsCollector, str) -> str
+    """Return the metrics of ``collector`` in the Prometheus text exposition
+    format"""
+    lines = []
+    for name, kind, description, value in collector.collect():
+        name = prefix + name
+        if kind == "counter":
+            name += "_total"
+        lines.append("# HELP {} {}".format(name, description))
+        lines.append("# TYPE {} {}".format(name, kind))
+        if kind == "counter":
+            lines.append("{} {}".format(name, value))
+            continue
+        for bound, count in value.cumulative_counts():
+            lines.append('{}_bucket{{le="{}"}} {}'.format(name, _format_value(bound), count))
+        lines.append("{}_sum {}".format(name, _format_value(value.sum)))
+        lines.append("{}_count {}".format(name, value.count))
+    return "\n".join(lines) + "\n"
+
+
+def _unit(name):
+    # type: (str) -> str
+    if name.endswith("_seconds"):
+        return "s"
+    if name.endswith("_bytes"):
+        return "By"
+    return "1"
+
+
+class OpenTelemetryHooks(QueryHooks):
+    """
+    Hook recording the events with the counters and histograms of an
+    OpenTelemetry ``Meter``, e.g. returned by
+    ``opentelemetry.metrics.get_meter("trino")``. The metrics are those of
+    :class:`MetricsCollector`.
+    """
+
+    def __init__(self, meter, prefix="trino.client."):
+        self._counters = dict(
+            (name, meter.create_counter(prefix + name, description=description))
+            for name, description in COUNTERS
+        )
+        self._histograms = dict(
+            (name, meter.create_histogram(prefix + name, unit=_unit(name), description=description))
+            for name, _, description in HISTOGRAMS
+        )
+
+    def on_request_end(self, event):
+        # type: (RequestEvent) -> None
+        attributes = {"http.method": event.method}
+        self._counters["requests"].add(1, attributes)
+        if event.error is not None or (event.status_code or 0) >= 500:
+            self._counters["request_errors"].add(1, attributes)
+        self._histograms["request_seconds"].record(event.elapsed, attributes)
+
+    def on_retry(self, event):
+        # type: (RetryEvent) -> None
+        self._counters["retries"].add(1)
+        self._histograms["retry_backoff_seconds"].record(event.backoff)
+
+    def on_page(self, event):
+        # type: (PageEvent) -> None
+        self._counters["pages"].add(1)
+        self._histograms["page_fetch_seconds"].record(event.fetch_seconds)
+        self._histograms["page_decode_seconds"].record(event.decode_seconds)
+        if event.rows is not None:
+            self._counters["rows"].add(event.rows)
+            self._histograms["page_rows"].record(event.rows)
+        if event.bytes is not None:
+            self._counters["bytes"].add(event.bytes)
+            self._histograms["page_bytes"].record(event.bytes)
+
+    def on_query_finish(self, event):
+        # type: (QueryEvent) -> None
+        attributes = {"trino.query.state": event.state or "UNKNOWN"}
+        self._counters["queries"].add(1, attributes)
+        if event.error is not None:
+            self._counters["query_errors"].add(1, attributes)
+        self._histograms["query_seconds"].record(event.elapsed, attributes)
+        self._histograms["query_client_seconds"].record(event.client_seconds, attributes)
+        if event.queued_seconds is not None:
+            self._histograms["query_queued_seconds"].record(event.queued_seconds, attributes)
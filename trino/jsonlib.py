@@ -0,0 +1,247 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+This module provides the JSON decoders that can parse the responses of the
+coordinator.
+
+A decoder is a function that takes the body of an HTTP response as ``bytes``
+and returns the decoded object. The following decoders are available when
+their library is installed:
+
+- ``"orjson"``: https://github.com/ijl/orjson
+- ``"ujson"``: https://github.com/ultrajson/ultrajson
+- ``"simdjson"``: https://github.com/TkTech/pysimdjson
+- ``"json"``: the standard library
+
+``"auto"`` picks the first one that is installed in this order.
+
+:class:`JSONObjectStream` parses a JSON object from chunks of ``bytes`` one
+member at a time, and the items of an array member one at a time, so that a
+response can be processed while it is being received.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import codecs
+import importlib
+import json
+import re
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Text, Union  # NOQA for mypy types
+
+
+__all__ = ["JSONObjectStream", "get_decoder"]
+
+
+AUTO = "auto"
+
+
+def _load_stdlib_decoder():
+    def decode(content):
+        return json.loads(content.decode("utf-8"))
+
+    return decode
+
+
+def _load_module_decoder(name):
+    def load():
+        try:
+            module = importlib.import_module(name)
+        except ImportError:
+            raise RuntimeError("unable to import {}".format(name))
+        return module.loads
+
+    return load
+
+
+DECODERS = OrderedDict([
+    ("orjson", _load_module_decoder("orjson")),
+    ("ujson", _load_module_decoder("ujson")),
+    ("simdjson", _load_module_decoder("simdjson")),
+    ("json", _load_stdlib_decoder),
+])
+
+
+def get_decoder(decoder=AUTO):
+    # type: (Union[Text, Callable[[bytes], Any]]) -> Callable[[bytes], Any]
+    """
+    Return a function that decodes JSON from ``bytes``.
+
+    :param decoder: name of a decoder, ``"auto"``, or a function which is then
+                    returned as is.
+    """
+    if callable(decoder):
+        return decoder
+    if decoder == AUTO:
+        for load in DECODERS.values():
+            try:
+                return load()
+            except RuntimeError:
+                continue
+    if decoder not in DECODERS:
+        raise ValueError("invalid JSON decoder {}".format(decoder))
+    return DECODERS[decoder]()
+
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+class JSONObjectStream(object):
+    """
+    Parse a JSON object from an iterable of ``bytes`` chunks, such as
+    ``requests.Response.iter_content()``.
+
+    :meth:`read_members` decodes the members of the object up to a given
+    member, whose value is an array that :meth:`iter_array` then decodes one
+    item at a time. :meth:`read_members` can be called again to decode the
+    members that follow the array. Only the chunks that hold the value being
+    decoded are kept in memory.
+
+    Values are decoded with the scanner of the standard library ``json``
+    module.
+    """
+
+    def __init__(self, chunks):
+        # type: (Iterable[bytes]) -> None
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._scan = json.JSONDecoder().raw_decode
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self._started = False
+        self._separator = False
+        self._finished = False
+
+    @property
+    def finished(self):
+        # type: () -> bool
+        """Whether the end of the object has been reached"""
+        return self._finished
+
+    def _fill(self):
+        # type: () -> bool
+        """Append the next chunk to the buffer, return false at the end of
+        the stream"""
+        if self._eof:
+            return False
+        for chunk in self._chunks:
+            text = self._decoder.decode(chunk)
+            if text:
+                self._buffer = self._buffer[self._pos:] + text
+                self._pos = 0
+                return True
+        self._decoder.decode(b"", final=True)
+        self._eof = True
+        return False
+
+    def _skip_whitespace(self):
+        if self._pos < len(self._buffer) and self._buffer[self._pos] not in " \t\n\r":
+            return
+        while True:
+            self._pos = WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer) or not self._fill():
+                return
+
+    def _next_char(self):
+        # type: () -> Text
+        self._skip_whitespace()
+        if self._pos >= len(self._buffer):
+            raise ValueError("unexpected end of JSON object")
+        char = self._buffer[self._pos]
+        self._pos += 1
+        return char
+
+    def _expect(self, expected):
+        # type: (Text) -> None
+        char = self._next_char()
+        if char != expected:
+            raise ValueError("expected {!r} but found {!r}".format(expected, char))
+
+    def _peek(self):
+        # type: () -> Text
+        char = self._next_char()
+        self._pos -= 1
+        return char
+
+    def _decode_value(self):
+        # type: () -> Any
+        self._skip_whitespace()
+        while True:
+            try:
+                value, end = self._scan(self._buffer, self._pos)
+            except ValueError:
+                # the value may continue in the next chunk
+                if not self._fill():
+                    raise
+                continue
+            # a number that ends with the buffer may continue in the next chunk
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def read_members(self, stop_at=None):
+        # type: (Optional[Text]) -> Dict[Text, Any]
+        """
+        Decode the members of the object until the end of the object or
+        until the member named ``stop_at``, whose value is left to
+        :meth:`iter_array`.
+        """
+        members = {}  # type: Dict[Text, Any]
+        if not self._started:
+            self._expect("{")
+            self._started = True
+            if self._peek() == "}":
+                self._pos += 1
+                self._finished = True
+        while not self._finished:
+            if self._separator:
+                char = self._next_char()
+                if char == "}":
+                    self._finished = True
+                    break
+                if char != ",":
+                    raise ValueError("expected ',' or '}}' but found {!r}".format(char))
+            key = self._decode_value()
+            self._expect(":")
+            self._separator = True
+            if key == stop_at:
+                break
+            members[key] = self._decode_value()
+        return members
+
+    def iter_array(self):
+        # type: () -> Iterator[Any]
+        """Decode the items of the array of the member where
+        :meth:`read_members` stopped"""
+        if self._peek() != "[":
+            # e.g. null
+            self._decode_value()
+            return
+        self._pos += 1
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self._decode_value()
+            # most items are directly followed by a separator
+            if self._buffer.startswith(",", self._pos):
+                self._pos += 1
+                continue
+            char = self._next_char()
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError("expected ',' or ']' but found {!r}".format(char))
@@ -0,0 +1,343 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+This module balances queries between several coordinators.
+
+A :class:`LoadBalancer` picks a :class:`Coordinator` for each query with a
+policy:
+
+- :class:`RoundRobinPolicy` cycles through the coordinators
+- :class:`LeastOutstandingPolicy` picks the coordinator running the fewest
+  queries sent by this client
+- :class:`LowestLatencyPolicy` picks the coordinator with the lowest observed
+  HTTP round trip time
+
+A coordinator is ejected after ``max_failures`` consecutive connection errors
+or ``503`` responses, and comes back once a health check of its
+``/v1/info`` endpoint succeeds. Health checks run in a background thread,
+which stops when the load balancer is closed or garbage collected.
+
+Only the initial POST of a query goes through the load balancer: the
+following requests go to the ``nextUri`` returned by the coordinator that
+accepted the query.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import itertools
+import threading
+import weakref
+from typing import Any, List, Optional, Text, Tuple, Union  # NOQA for mypy types
+
+import trino.logging
+from trino import constants
+
+
+__all__ = [
+    "Coordinator",
+    "Lease",
+    "LeastOutstandingPolicy",
+    "LoadBalancer",
+    "LowestLatencyPolicy",
+    "RoundRobinPolicy",
+]
+
+
+logger = trino.logging.get_logger(__name__)
+
+
+URL_INFO_PATH = "/v1/info"
+
+
+class Coordinator(object):
+    """State of a coordinator as observed by the client"""
+
+    # weight of the last observation in the average latency
+    LATENCY_SMOOTHING = 0.2
+
+    def __init__(self, host, port):
+        # type: (Text, int) -> None
+        self.host = host
+        self.port = port
+        self.outstanding = 0
+        self.latency = None  # type: Optional[float]
+        self.failures = 0
+        self.available = True
+
+    def record_latency(self, latency):
+        # type: (float) -> None
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += self.LATENCY_SMOOTHING * (latency - self.latency)
+
+    def __repr__(self):
+        return (
+            "Coordinator(host={}, port={}, outstanding={}, latency={}, "
+            "failures={}, available={})".format(
+                self.host,
+                self.port,
+                self.outstanding,
+                self.latency,
+                self.failures,
+                self.available,
+            )
+        )
+
+
+class RoundRobinPolicy(object):
+    def __init__(self):
+        self._counter = itertools.count()
+
+    def select(self, coordinators):
+        # type: (List[Coordinator]) -> Coordinator
+        return coordinators[next(self._counter) % len(coordinators)]
+
+
+class LeastOutstandingPolicy(RoundRobinPolicy):
+    def select(self, coordinators):
+        # type: (List[Coordinator]) -> Coordinator
+        least = min(coordinator.outstanding for coordinator in coordinators)
+        # cycle through the coordinators that have as few queries
+        return super(LeastOutstandingPolicy, self).select(
+            [coordinator for coordinator in coordinators if coordinator.outstanding == least]
+        )
+
+
+class LowestLatencyPolicy(RoundRobinPolicy):
+    def select(self, coordinators):
+        # type: (List[Coordinator]) -> Coordinator
+        # measure the latency of every coordinator first
+        unknown = [coordinator for coordinator in coordinators if coordinator.latency is None]
+        if unknown:
+            return super(LowestLatencyPolicy, self).select(unknown)
+        return min(coordinators, key=lambda coordinator: coordinator.latency)
+
+
+POLICIES = {
+    "round_robin": RoundRobinPolicy,
+    "least_outstanding": LeastOutstandingPolicy,
+    "lowest_latency": LowestLatencyPolicy,
+}
+
+
+def parse_coordinators(hosts, default_port):
+    # type: (List[Union[Text, Tuple[Text, int]]], int) -> List[Coordinator]
+    """Parse a list of ``host``, ``host:port`` or ``(host, port)`` values.
+    IPv6 addresses are given either alone or in brackets, e.g.
+    ``[::1]:8080``, and are kept in brackets, as in URLs."""
+    coordinators = []
+    for host in hosts:
+        port = default_port
+        if isinstance(host, tuple):
+            host, port = host
+        elif host.startswith("["):
+            host, _, port_text = host.partition("]")
+            host += "]"
+            if port_text:
+                port = port_text[1:]
+        elif host.count(":") == 1:
+            host, port = host.split(":")
+        if ":" in host and not host.startswith("["):
+            host = "[{}]".format(host)
+        coordinators.append(Coordinator(host, int(port)))
+    return coordinators
+
+
+class Lease(object):
+    """
+    Coordinator picked for a query by :meth:`LoadBalancer.lease`.
+
+    The query is no longer counted as outstanding once the lease is
+    released, or garbage collected when the query is abandoned before it
+    completes. A lease is not copied by ``copy.deepcopy``.
+    """
+
+    def __init__(self, load_balancer, coordinator):
+        # type: (LoadBalancer, Coordinator) -> None
+        self.coordinator = coordinator
+        self._load_balancer = load_balancer
+        self._released = False
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def release(self):
+        # type: () -> None
+        if not self._released:
+            self._released = True
+            self._load_balancer.release(self.coordinator)
+
+    def __del__(self):
+        self.release()
+
+
+def _run_health_checks(load_balancer_ref, stopped, interval):
+    # the thread does not keep the load balancer alive, so that it stops
+    # once the load balancer of a connection that is never closed is garbage
+    # collected
+    while not stopped.wait(interval):
+        load_balancer = load_balancer_ref()
+        if load_balancer is None:
+            return
+        load_balancer.check_all()
+        del load_balancer
+
+
+class LoadBalancer(object):
+    """
+    Pick a coordinator for each query and track the health of coordinators.
+
+    :param coordinators: list of :class:`Coordinator`.
+    :param policy: one of ``"round_robin"``, ``"least_outstanding"``,
+                   ``"lowest_latency"`` or an object with a
+                   ``select(coordinators)`` method.
+    :param max_failures: number of consecutive failures after which a
+                         coordinator is ejected.
+    :param health_check_interval: seconds between two rounds of health checks.
+                                  ``None`` disables health checks: ejected
+                                  coordinators are then only tried again
+                                  once all of them are ejected.
+    :param http_session: ``requests.Session`` used to send health checks.
+    :param http_scheme: "http" or "https"
+    :param request_timeout: timeout of the health checks in seconds.
+
+    When all the coordinators are ejected, queries are balanced between all of
+    them rather than failing without a request.
+
+    A load balancer is meant to be shared by the requests of a connection. It
+    is thread safe and is not copied by ``copy.deepcopy``.
+    """
+
+    def __init__(
+        self,
+        coordinators,  # type: List[Coordinator]
+        policy="round_robin",  # type: Any
+        max_failures=constants.DEFAULT_MAX_COORDINATOR_FAILURES,  # type: int
+        health_check_interval=constants.DEFAULT_HEALTH_CHECK_INTERVAL,  # type: Optional[float]
+        http_session=None,  # type: Any
+        http_scheme=constants.HTTP,  # type: Text
+        request_timeout=constants.DEFAULT_REQUEST_TIMEOUT,  # type: float
+    ):
+        # type: (...) -> None
+        if not coordinators:
+            raise ValueError("at least one coordinator is required")
+        if isinstance(policy, str):
+            if policy not in POLICIES:
+                raise ValueError("invalid load balancing policy {}".format(policy))
+            policy = POLICIES[policy]()
+        self.coordinators = coordinators
+        self._policy = policy
+        self._max_failures = max_failures
+        self._http_session = http_session
+        self._http_scheme = http_scheme
+        self._request_timeout = request_timeout
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._health_checker = None  # type: Optional[threading.Thread]
+        if health_check_interval is not None and http_session is not None:
+            self._health_checker = threading.Thread(
+                target=_run_health_checks,
+                args=(weakref.ref(self), self._stopped, health_check_interval),
+                name="trino-health-check",
+            )
+            self._health_checker.daemon = True
+            self._health_checker.start()
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def acquire(self):
+        # type: () -> Coordinator
+        """Pick a coordinator for a new query"""
+        with self._lock:
+            available = [coordinator for coordinator in self.coordinators if coordinator.available]
+            if not available:
+                logger.warning("no coordinator available, trying all of them")
+                available = self.coordinators
+            coordinator = self._policy.select(available)
+            coordinator.outstanding += 1
+            return coordinator
+
+    def lease(self, coordinator=None):
+        # type: (Optional[Coordinator]) -> Lease
+        """Pick a coordinator for a new query, or use ``coordinator`` when
+        given, released with the returned :class:`Lease`"""
+        if coordinator is None:
+            return Lease(self, self.acquire())
+        with self._lock:
+            coordinator.outstanding += 1
+        return Lease(self, coordinator)
+
+    def release(self, coordinator):
+        # type: (Coordinator) -> None
+        """Notify that a query picked by :meth:`acquire` is done"""
+        with self._lock:
+            coordinator.outstanding = max(0, coordinator.outstanding - 1)
+
+    def record_success(self, coordinator, latency=None):
+        # type: (Coordinator, Optional[float]) -> None
+        with self._lock:
+            coordinator.failures = 0
+            coordinator.available = True
+            if latency is not None:
+                coordinator.record_latency(latency)
+
+    def record_failure(self, coordinator):
+        # type: (Coordinator) -> None
+        with self._lock:
+            coordinator.failures += 1
+            if coordinator.available and coordinator.failures >= self._max_failures:
+                logger.warning(
+                    "ejecting coordinator %s:%s after %s failures",
+                    coordinator.host,
+                    coordinator.port,
+                    coordinator.failures,
+                )
+                coordinator.available = False
+
+    def check_health(self, coordinator):
+        # type: (Coordinator) -> bool
+        """Send a request to the ``/v1/info`` endpoint of a coordinator and
+        record its outcome"""
+        url = "{}://{}:{}{}".format(
+            self._http_scheme, coordinator.host, coordinator.port, URL_INFO_PATH
+        )
+        try:
+            response = self._http_session.get(url, timeout=self._request_timeout)
+            healthy = response.ok and not response.json().get("starting", False)
+        except Exception as err:
+            logger.debug("health check of %s failed: %s", url, err)
+            healthy = False
+        if healthy:
+            if not coordinator.available:
+                logger.info("coordinator %s:%s is back", coordinator.host, coordinator.port)
+            self.record_success(coordinator)
+        else:
+            self.record_failure(coordinator)
+        return healthy
+
+    def check_all(self):
+        # type: () -> None
+        """Check the health of every coordinator, until the load balancer is
+        closed"""
+        for coordinator in self.coordinators:
+            if self._stopped.is_set():
+                return
+            self.check_health(coordinator)
+
+    def close(self):
+        # type: () -> None
+        """Stop the health checks"""
+        self._stopped.set()
@@ -0,0 +1,262 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+This module converts the values of a query result from their JSON
+representation into Python objects.
+
+A :class:`RowMapper` is compiled once per query from the ``typeSignature``
+of its columns. It holds one converter per column that needs one and
+applies them column by column to each page. The values of the other
+columns, e.g. ``bigint`` or ``varchar``, are left untouched.
+
+=============================  ============================================
+Trino type                     Python type
+=============================  ============================================
+``real``, ``double``           ``float``, including NaN and infinity
+``decimal``                    ``decimal.Decimal``
+``varbinary``                  ``bytes``
+``date``                       ``datetime.date``
+``time``                       ``datetime.time``
+``time with time zone``        ``datetime.time`` with a fixed offset
+``timestamp``                  ``datetime.datetime``
+``timestamp with time zone``   ``datetime.datetime`` with a time zone
+``interval year to month``     ``int``, the number of months
+``interval day to second``     ``datetime.timedelta``
+``uuid``                       ``uuid.UUID``
+``ipaddress``                  ``ipaddress.IPv4Address`` or ``IPv6Address``
+``array``                      ``list``
+``map``                        ``dict``
+``row``                        ``tuple``
+=============================  ============================================
+
+Fractions of seconds are truncated to microseconds. Named time zones
+require ``pytz``. Other types are returned as decoded from JSON.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import datetime
+import decimal
+import ipaddress
+import uuid
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Text, Tuple  # NOQA for mypy types
+
+try:
+    import pytz
+except ImportError:
+    pytz = None
+
+from trino import datatypes
+
+
+__all__ = ["RowMapper", "create_row_mapper"]
+
+
+Converter = Callable[[Any], Any]
+
+
+class _FixedOffset(datetime.tzinfo):
+    """Time zone at a fixed offset from UTC, for Python 2 which does not have
+    ``datetime.timezone``"""
+
+    def __init__(self, offset):
+        # type: (datetime.timedelta) -> None
+        self._offset = offset
+
+    def utcoffset(self, dt):
+        return self._offset
+
+    def dst(self, dt):
+        return datetime.timedelta(0)
+
+    def tzname(self, dt):
+        return None
+
+    def __repr__(self):
+        return "_FixedOffset({!r})".format(self._offset)
+
+
+_timezone = getattr(datetime, "timezone", _FixedOffset)
+
+
+def _parse_offset(value):
+    # type: (Text) -> datetime.tzinfo
+    sign = -1 if value[0] == "-" else 1
+    hours, minutes = value[1:].split(":")
+    return _timezone(sign * datetime.timedelta(hours=int(hours), minutes=int(minutes)))
+
+
+def _split_time_and_offset(value):
+    # type: (Text) -> Tuple[Text, Text]
+    # e.g. 01:02:03.456+05:30 or 01:02:03.456-08:00
+    position = max(value.rfind("+"), value.rfind("-"))
+    return value[:position], value[position:]
+
+
+def _parse_time_with_time_zone(value):
+    # type: (Text) -> datetime.time
+    time, offset = _split_time_and_offset(value)
+    return datetime.time(*datatypes.parse_time_fields(time), tzinfo=_parse_offset(offset))
+
+
+def _parse_timestamp_with_time_zone(value):
+    # type: (Text) -> datetime.datetime
+    # e.g. 2001-08-22 03:04:05.321 America/Los_Angeles or 2001-08-22 03:04:05.321 +05:30
+    timestamp, _, zone = value.rpartition(" ")
+    naive = datatypes.parse_timestamp(timestamp)
+    if zone[0] in "+-":
+        return naive.replace(tzinfo=_parse_offset(zone))
+    if pytz is None:
+        raise RuntimeError("unable to import pytz")
+    return pytz.timezone(zone).localize(naive)
+
+
+def _parse_interval_day_to_second(value):
+    # type: (Text) -> datetime.timedelta
+    # e.g. 2 03:04:05.678 or -2 03:04:05.678
+    sign = -1 if value.startswith("-") else 1
+    days, _, time = value.lstrip("-").partition(" ")
+    hours, minutes, seconds, microseconds = datatypes.parse_time_fields(time)
+    return sign * datetime.timedelta(
+        days=int(days), hours=hours, minutes=minutes, seconds=seconds, microseconds=microseconds
+    )
+
+
+def _parse_interval_year_to_month(value):
+    # type: (Text) -> int
+    # e.g. 1-2 or -1-2
+    sign = -1 if value.startswith("-") else 1
+    years, _, months = value.lstrip("-").partition("-")
+    return sign * (int(years) * 12 + int(months))
+
+
+def _parse_boolean_key(value):
+    # type: (Text) -> bool
+    return value == "true"
+
+
+CONVERTERS = {
+    # Trino sends NaN and infinity values as strings
+    "real": float,
+    "double": float,
+    "decimal": decimal.Decimal,
+    "varbinary": datatypes.parse_binary,
+    "date": datatypes.parse_date,
+    "time": datatypes.parse_time,
+    "time with time zone": _parse_time_with_time_zone,
+    "timestamp": datatypes.parse_timestamp,
+    "timestamp with time zone": _parse_timestamp_with_time_zone,
+    "interval year to month": _parse_interval_year_to_month,
+    "interval day to second": _parse_interval_day_to_second,
+    "uuid": uuid.UUID,
+    "ipaddress": ipaddress.ip_address,
+}  # type: Dict[Text, Converter]
+
+# map keys are always JSON strings
+KEY_CONVERTERS = {
+    "tinyint": int,
+    "smallint": int,
+    "integer": int,
+    "bigint": int,
+    "boolean": _parse_boolean_key,
+}  # type: Dict[Text, Converter]
+
+
+def _convert_optional(convert):
+    # type: (Optional[Converter]) -> Converter
+    if convert is None:
+        return lambda value: value
+    return lambda value: None if value is None else convert(value)
+
+
+def get_converter(signature):
+    # type: (Dict[Text, Any]) -> Optional[Converter]
+    """Return a function converting a non NULL value of the type of
+    ``signature``, or ``None`` when values are used as is"""
+    raw_type = signature["rawType"]
+    if raw_type in CONVERTERS:
+        return CONVERTERS[raw_type]
+    if raw_type == "array":
+        element_converter = get_converter(datatypes.get_type_arguments(signature)[0])
+        if element_converter is None:
+            return None
+        convert_element = _convert_optional(element_converter)
+        return lambda value: [convert_element(element) for element in value]
+    if raw_type == "map":
+        key_signature, value_signature = datatypes.get_type_arguments(signature)
+        convert_key = KEY_CONVERTERS.get(key_signature["rawType"]) or get_converter(key_signature)
+        value_converter = get_converter(value_signature)
+        if convert_key is None and value_converter is None:
+            return None
+        convert_key = _convert_optional(convert_key)
+        convert_value = _convert_optional(value_converter)
+        return lambda value: {
+            convert_key(key): convert_value(item) for key, item in value.items()
+        }
+    if raw_type == "row":
+        field_converters = [
+            _convert_optional(get_converter(field_signature))
+            for _, field_signature in datatypes.get_fields(signature)
+        ]
+        return lambda value: tuple(
+            convert(item) for convert, item in zip(field_converters, value)
+        )
+    return None
+
+
+class RowMapper(object):
+    """
+    Convert the values of the rows of a query in place.
+
+    :param converters: one function per column converting its non NULL
+                       values, ``None`` for the columns whose values are
+                       used as is.
+    """
+
+    def __init__(self, converters):
+        # type: (List[Optional[Converter]]) -> None
+        self._converters = [
+            (index, convert) for index, convert in enumerate(converters) if convert is not None
+        ]
+
+    def map_rows(self, rows):
+        # type: (List[List[Any]]) -> List[List[Any]]
+        """Convert the rows of a page column by column"""
+        for index, convert in self._converters:
+            for row in rows:
+                value = row[index]
+                if value is not None:
+                    row[index] = convert(value)
+        return rows
+
+    def map_row(self, row):
+        # type: (List[Any]) -> List[Any]
+        for index, convert in self._converters:
+            value = row[index]
+            if value is not None:
+                row[index] = convert(value)
+        return row
+
+    def iter_rows(self, rows):
+        # type: (Iterable[List[Any]]) -> Iterator[List[Any]]
+        """Convert rows one at a time as they are iterated"""
+        map_row = self.map_row
+        for row in rows:
+            yield map_row(row)
+
+
+def create_row_mapper(columns):
+    # type: (List[Dict[Text, Any]]) -> RowMapper
+    """Compile the :class:`RowMapper` of the ``columns`` of a query"""
+    return RowMapper([get_converter(datatypes.get_signature(column)) for column in columns])
@@ -0,0 +1,353 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+This module reads the result of one large query through several
+concurrent queries.
+
+The query is split into partitions filtered on a column of its result,
+either by ranges of values or by a hash of the values, with
+:func:`partition_statements`. A :class:`PartitionedQuery` runs one
+:class:`trino.client.TrinoQuery` per partition, each fetching its pages in a
+worker thread, and merges their pages into one result. The merged pages
+follow the order of the partitions when ``ordered`` is true, or the order
+in which they are fetched otherwise: ::
+
+    >> statements = partition_statements(
+    ..     "SELECT * FROM orders", "orderkey", lower=0, upper=6000000, partitions=8)
+    >> query = PartitionedQuery(create_request, statements, ordered=False)
+    >> rows = list(query.execute())
+
+It is used by :meth:`trino.dbapi.Cursor.execute_partitioned`.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Text, Union  # NOQA for mypy types
+
+from trino import constants, exceptions
+import trino.client
+import trino.logging
+
+try:
+    import queue
+except ImportError:
+    # Python 2
+    import Queue as queue  # type: ignore
+
+
+__all__ = ["PartitionedQuery", "partition_statements"]
+
+
+logger = trino.logging.get_logger(__name__)
+
+RANGE = "range"
+HASH = "hash"
+
+Number = Union[int, float]
+
+
+def _format_number(value):
+    # type: (Number) -> Text
+    if isinstance(value, float):
+        return "DOUBLE '{!r}'".format(value)
+    return "{:d}".format(value)
+
+
+def _range_predicates(column, lower, upper, partitions):
+    # type: (Text, Number, Number, int) -> List[Text]
+    """Return the predicates of ``partitions`` ranges of equal width. The
+    first and last ranges are open so that all the values are covered."""
+    if upper <= lower:
+        raise ValueError("upper must be greater than lower")
+    if isinstance(lower, int) and isinstance(upper, int):
+        bounds = [lower + (upper - lower) * number // partitions for number in range(1, partitions)]
+    else:
+        bounds = [lower + (upper - lower) * number / partitions for number in range(1, partitions)]
+    if partitions == 1:
+        return ["TRUE"]
+    predicates = ["{column} < {bound} OR {column} IS NULL".format(column=column, bound=_format_number(bounds[0]))]
+    for start, end in zip(bounds, bounds[1:]):
+        predicates.append("{column} >= {start} AND {column} < {end}".format(
+            column=column, start=_format_number(start), end=_format_number(end)
+        ))
+    predicates.append("{column} >= {bound}".format(column=column, bound=_format_number(bounds[-1])))
+    return predicates
+
+
+def _hash_predicates(column, partitions):
+    # type: (Text, int) -> List[Text]
+    # NULL values are hashed as the empty string
+    hashed = (
+        "bitwise_and(from_big_endian_64(xxhash64(to_utf8(coalesce(CAST({} AS varchar), ''))))"
+        ", 9223372036854775807) % {}"
+    ).format(column, partitions)
+    return ["{} = {}".format(hashed, number) for number in range(partitions)]
+
+
+def partition_statements(
+    sql,  # type: Text
+    column,  # type: Text
+    lower=None,  # type: Optional[Number]
+    upper=None,  # type: Optional[Number]
+    partitions=constants.DEFAULT_PARTITIONS,  # type: int
+    method=RANGE,  # type: Text
+    ordered=False,  # type: bool
+):
+    # type: (...) -> List[Text]
+    """
+    Split ``sql`` into one statement per partition.
+
+    :param column: column of the result of ``sql``, or SQL expression on its
+                   columns, whose values are partitioned.
+    :param lower: lower bound of the values with the ``range`` method.
+    :param upper: upper bound of the values with the ``range`` method. The
+                  values out of the bounds belong to the first or to the last
+                  partition.
+    :param partitions: number of partitions.
+    :param method: ``range`` to split ``[lower, upper)`` into ranges of equal
+                   width or ``hash`` to partition on a hash of the values.
+    :param ordered: sort the rows of each partition by ``column``, so that
+                    the partitions of the ``range`` method are sorted as a
+                    whole.
+    """
+    if partitions < 1:
+        raise ValueError("partitions must be at least 1")
+    if method == RANGE:
+        if lower is None or upper is None:
+            raise ValueError("the range method requires lower and upper bounds")
+        predicates = _range_predicates(column, lower, upper, partitions)
+    elif method == HASH:
+        predicates = _hash_predicates(column, partitions)
+    else:
+        raise ValueError("method must be {!r} or {!r}".format(RANGE, HASH))
+    sql = sql.strip().rstrip(";")
+    order_by = " ORDER BY {}".format(column) if ordered else ""
+    return [
+        "SELECT * FROM (\n{sql}\n) AS partitioned WHERE {predicate}{order_by}".format(
+            sql=sql, predicate=predicate, order_by=order_by
+        )
+        for predicate in predicates
+    ]
+
+
+class _Done(object):
+    pass
+
+
+class _Error(object):
+    def __init__(self, error):
+        self.error = error
+
+
+class PartitionedResult(trino.client.TrinoResult):
+    """
+    Merged result of the queries of a :class:`PartitionedQuery`, with the
+    interface of :class:`trino.client.TrinoResult`.
+    """
+
+    def iter_pages(self, stream=False, convert=True):
+        """Yield the rows of each page as a list, converted by the query of
+        its partition unless ``convert`` is false"""
+        for index, rows in self._iter_all_pages():
+            if convert:
+                rows = self._query.queries[index].map_rows(rows)
+            self._rownumber += len(rows)
+            yield rows
+
+    def _fetch_all_pages(self):
+        return self._query._iter_pages()
+
+    def prefetch(self):
+        # type: () -> None
+        # the queries of the partitions already run in the background
+        pass
+
+    def close(self):
+        # type: () -> None
+        self._query.close()
+
+    @property
+    def response_headers(self):
+        return None
+
+
+class PartitionedQuery(object):
+    """
+    Run the queries of the partitions of a result concurrently and merge
+    their pages, with the interface of :class:`trino.client.TrinoQuery`.
+
+    :param create_request: function returning a new
+                           :class:`trino.client.TrinoRequest` for each query.
+    :param statements: one SQL statement per partition, see
+                       :func:`partition_statements`.
+    :param ordered: yield the pages of the partitions in the order of
+                    ``statements`` instead of as soon as they are fetched.
+    :param max_pages: pages buffered per partition. A query waits for its
+                      pages to be consumed once its buffer is full.
+    """
+
+    POLL_INTERVAL = 0.1  # seconds
+
+    def __init__(
+        self,
+        create_request,  # type: Callable[[], trino.client.TrinoRequest]
+        statements,  # type: List[Text]
+        ordered=False,  # type: bool
+        max_pages=constants.DEFAULT_PARTITION_BUFFER_PAGES,  # type: int
+        experimental_python_types=False,  # type: bool
+    ):
+        # type: (...) -> None
+        if max_pages < 1:
+            raise ValueError("max_pages must be at least 1")
+        self.queries = [
+            trino.client.TrinoQuery(create_request(), sql, experimental_python_types=experimental_python_types)
+            for sql in statements
+        ]
+        self.ordered = ordered
+        if ordered:
+            self._queues = [queue.Queue(maxsize=max_pages) for _ in statements]
+        else:
+            shared = queue.Queue(maxsize=max_pages * len(statements))  # type: queue.Queue
+            self._queues = [shared] * len(statements)
+        self._stopped = threading.Event()
+        self._cancelled = False
+        self._result = PartitionedResult(self)
+
+    @property
+    def query_id(self):
+        # type: () -> Optional[Text]
+        return self.queries[0].query_id if self.queries else None
+
+    @property
+    def columns(self):
+        for query in self.queries:
+            if query.columns is not None:
+                return query.columns
+        return None
+
+    @property
+    def stats(self):
+        # type: () -> Dict[Text, Any]
+        return {"partitions": [query.stats for query in self.queries]}
+
+    @property
+    def warnings(self):
+        # type: () -> List[Dict[Any, Any]]
+        return [warning for query in self.queries for warning in query.warnings]
+
+    @property
+    def progress(self):
+        # type: () -> trino.client.QueryProgress
+        return trino.client.QueryProgress.combine([query.progress for query in self.queries])
+
+    @property
+    def result(self):
+        return self._result
+
+    @property
+    def cancelled(self):
+        # type: () -> bool
+        return self._cancelled
+
+    def iter_pages(self):
+        """Yield a :class:`trino.client.Page` for each page of the merged
+        result"""
+        for rows in self._result.iter_pages():
+            if not rows:
+                continue
+            if self._cancelled:
+                raise exceptions.TrinoUserError("Query has been cancelled", self.query_id)
+            yield trino.client.Page(rows, self.columns, self.stats)
+
+    def execute(self):
+        # type: () -> PartitionedResult
+        """Start the queries of all the partitions"""
+        for index, query in enumerate(self.queries):
+            thread = threading.Thread(
+                target=self._run, args=(index,), name="trino-partition-{}".format(index)
+            )
+            thread.daemon = True
+            thread.start()
+        return self._result
+
+    def _put(self, index, item):
+        # type: (int, Any) -> bool
+        while not self._stopped.is_set():
+            try:
+                self._queues[index].put((index, item), timeout=self.POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self, index):
+        # type: (int) -> None
+        query = self.queries[index]
+        try:
+            result = query.execute()
+            for rows in result.iter_pages(convert=False):
+                if self._stopped.is_set():
+                    return
+                if not self._put(index, rows):
+                    return
+        except Exception as err:
+            self._put(index, _Error(err))
+            return
+        self._put(index, _Done())
+
+    def _iter_pages(self):
+        """Yield the partition and the rows of each page as they are
+        merged"""
+        try:
+            if self.ordered:
+                partitions = [[index] for index in range(len(self.queries))]
+            else:
+                partitions = [list(range(len(self.queries)))]
+            for indexes in partitions:
+                pending = len(indexes)
+                pages = self._queues[indexes[0]]
+                while pending:
+                    index, item = pages.get()
+                    if isinstance(item, _Done):
+                        pending -= 1
+                    elif isinstance(item, _Error):
+                        raise item.error
+                    else:
+                        yield index, item
+        finally:
+            self.close()
+
+    def close(self):
+        # type: () -> None
+        """Stop the worker threads and cancel the queries that are still
+        running"""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        for query in self.queries:
+            if query.query_id is not None and not query.is_finished():
+                try:
+                    query.cancel()
+                except Exception as err:
+                    logger.debug("failed to cancel query %s: %s", query.query_id, err)
+
+    def cancel(self):
+        # type: () -> None
+        self._cancelled = True
+        self.close()
+
+    def is_finished(self):
+        # type: () -> bool
+        return all(query.is_finished() for query in self.queries)
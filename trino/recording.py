@@ -0,0 +1,352 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+This module records the HTTP exchanges of the client with a coordinator and
+replays them without a cluster, e.g. to profile the decoding and the
+iteration of results on production-shaped data.
+
+A :class:`RecordingSession` is a ``requests.Session`` that keeps each request
+it sends with its response. Once they are saved, a :class:`ReplaySession`
+answers the same requests from the file, at full speed or at the recorded
+timing: ::
+
+    >> session = RecordingSession()
+    >> conn = trino.dbapi.connect(host="coordinator", http_session=session)
+    >> ...
+    >> session.save("traffic.jsonl.gz")
+
+    >> session = ReplaySession.load("traffic.jsonl.gz")
+    >> conn = trino.dbapi.connect(host="coordinator", http_session=session)
+
+A recording is a file of JSON lines, one per exchange, compressed with gzip
+when its name ends with ``.gz``. The ``X-Trino-*`` headers of the requests
+and the headers of the responses, e.g. ``X-Trino-Set-Session`` or
+``X-Trino-Added-Prepare``, are kept, but not the credentials or the cookies.
+The bodies are stored decompressed.
+
+Requests are answered by method and path, in the order they were recorded:
+the statements are answered in the order they were sent, whatever their
+text, since the names of the prepared statements are random.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import base64
+import datetime
+import gzip
+import io
+import json
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Text, Tuple  # NOQA for mypy types
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from trino import exceptions
+
+try:
+    from urllib.parse import urlsplit
+except ImportError:
+    from urlparse import urlsplit  # type: ignore
+
+
+__all__ = ["Exchange", "RecordingSession", "ReplaySession", "load", "save"]
+
+
+# request headers holding credentials
+_SECRET_REQUEST_HEADERS = frozenset(["x-trino-extra-credential"])
+
+# response headers that no longer apply to the stored body, or hold
+# credentials
+_DROPPED_RESPONSE_HEADERS = frozenset(["content-encoding", "content-length", "transfer-encoding", "set-cookie"])
+
+
+def _text(data):
+    # type: (Any) -> Optional[Text]
+    if data is None or isinstance(data, str):
+        return data
+    if isinstance(data, bytes):
+        return data.decode("utf-8", "replace")
+    # a file or an iterator is not kept
+    return None
+
+
+class Exchange(object):
+    """
+    Request sent to the coordinator and its response.
+
+    :param start: seconds from the first exchange of the recording to the
+                  request.
+    :param elapsed: seconds from the request to the end of the response.
+    """
+
+    def __init__(
+        self,
+        method,  # type: Text
+        url,  # type: Text
+        status_code,  # type: int
+        body,  # type: bytes
+        headers=None,  # type: Optional[Dict[Text, Text]]
+        reason=None,  # type: Optional[Text]
+        request_headers=None,  # type: Optional[Dict[Text, Text]]
+        data=None,  # type: Optional[Text]
+        start=0.0,  # type: float
+        elapsed=0.0,  # type: float
+    ):
+        # type: (...) -> None
+        self.method = method
+        self.url = url
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+        self.reason = reason
+        self.request_headers = request_headers or {}
+        self.data = data
+        self.start = start
+        self.elapsed = elapsed
+
+    @property
+    def key(self):
+        # type: () -> Tuple[Text, Text]
+        return request_key(self.method, self.url)
+
+    @classmethod
+    def from_response(cls, response, url=None, start=0.0, elapsed=0.0):
+        # type: (requests.Response, Optional[Text], float, float) -> Exchange
+        """Return the exchange of ``response``, whose body has been read.
+        ``url`` is that of the request, before the redirects followed by
+        ``requests``."""
+        request = response.request
+        request_headers = {
+            name: value
+            for name, value in request.headers.items()
+            if name.lower().startswith("x-trino-") and name.lower() not in _SECRET_REQUEST_HEADERS
+        }
+        headers = {
+            name: value
+            for name, value in response.headers.items()
+            if name.lower() not in _DROPPED_RESPONSE_HEADERS
+        }
+        return cls(
+            method=request.method,
+            url=url or request.url,
+            status_code=response.status_code,
+            body=response.content or b"",
+            headers=headers,
+            reason=response.reason,
+            request_headers=request_headers,
+            data=_text(request.body),
+            start=start,
+            elapsed=elapsed,
+        )
+
+    def to_response(self, url=None):
+        # type: (Optional[Text]) -> requests.Response
+        response = requests.Response()
+        response.status_code = self.status_code
+        response.reason = self.reason
+        response.headers = CaseInsensitiveDict(self.headers)
+        response.headers["Content-Length"] = str(len(self.body))
+        response.raw = io.BytesIO(self.body)
+        response.url = url or self.url
+        response.elapsed = datetime.timedelta(seconds=self.elapsed)
+        return response
+
+    def to_dict(self):
+        # type: () -> Dict[Text, Any]
+        exchange = {
+            "method": self.method,
+            "url": self.url,
+            "request_headers": self.request_headers,
+            "data": self.data,
+            "status_code": self.status_code,
+            "reason": self.reason,
+            "headers": self.headers,
+            "start": round(self.start, 6),
+            "elapsed": round(self.elapsed, 6),
+        }  # type: Dict[Text, Any]
+        try:
+            exchange["body"] = self.body.decode("utf-8")
+        except UnicodeDecodeError:
+            exchange["body_base64"] = base64.b64encode(self.body).decode("ascii")
+        return exchange
+
+    @classmethod
+    def from_dict(cls, exchange):
+        # type: (Dict[Text, Any]) -> Exchange
+        if "body_base64" in exchange:
+            body = base64.b64decode(exchange["body_base64"])
+        else:
+            body = exchange.get("body", "").encode("utf-8")
+        return cls(
+            method=exchange["method"],
+            url=exchange["url"],
+            status_code=exchange["status_code"],
+            body=body,
+            headers=exchange.get("headers"),
+            reason=exchange.get("reason"),
+            request_headers=exchange.get("request_headers"),
+            data=exchange.get("data"),
+            start=exchange.get("start", 0.0),
+            elapsed=exchange.get("elapsed", 0.0),
+        )
+
+    def __repr__(self):
+        return "Exchange({} {}, status_code={}, bytes={}, elapsed={:.3f})".format(
+            self.method, self.url, self.status_code, len(self.body), self.elapsed
+        )
+
+
+def request_key(method, url):
+    # type: (Text, Text) -> Tuple[Text, Text]
+    """Return the key matching a request with the recorded ones: its method
+    and the path of its URL, the host possibly differing"""
+    parts = urlsplit(url)
+    path = parts.path + ("?" + parts.query if parts.query else "")
+    return method.upper(), path
+
+
+def _open(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode)
+    return io.open(path, mode)
+
+
+def save(exchanges, path):
+    # type: (Iterable[Exchange], Text) -> None
+    """Write ``exchanges`` to the file ``path``, compressed with gzip if its
+    name ends with ``.gz``"""
+    with _open(path, "wb") as recording:
+        for exchange in exchanges:
+            line = json.dumps(exchange.to_dict(), separators=(",", ":"), sort_keys=True)
+            recording.write(line.encode("utf-8") + b"\n")
+
+
+def load(path):
+    # type: (Text) -> List[Exchange]
+    """Return the exchanges saved in the file ``path``"""
+    with _open(path, "rb") as recording:
+        return [Exchange.from_dict(json.loads(line.decode("utf-8"))) for line in recording if line.strip()]
+
+
+class RecordingSession(requests.Session):
+    """
+    ``requests.Session`` keeping the exchanges of the requests it sends.
+
+    The body of each response is read before it is returned, including with
+    ``stream_rows``, so that its time is recorded. The session is thread
+    safe and is not copied by ``copy.deepcopy``, so that the requests of the
+    prepared statements are recorded with the others.
+    """
+
+    def __init__(self):
+        # type: () -> None
+        super(RecordingSession, self).__init__()
+        self._exchanges = []  # type: List[Exchange]
+        self._first_start = None  # type: Optional[float]
+        self._lock = threading.Lock()
+
+    def __deepcopy__(self, memo):
+        return self
+
+    @property
+    def exchanges(self):
+        # type: () -> List[Exchange]
+        with self._lock:
+            return list(self._exchanges)
+
+    def request(self, method, url, *args, **kwargs):
+        start = time.time()
+        response = super(RecordingSession, self).request(method, url, *args, **kwargs)
+        # iter_content() then returns the body that has been read
+        response.content
+        elapsed = time.time() - start
+        with self._lock:
+            if self._first_start is None:
+                self._first_start = start
+            self._exchanges.append(Exchange.from_response(response, url, start - self._first_start, elapsed))
+        return response
+
+    def clear(self):
+        # type: () -> None
+        with self._lock:
+            self._exchanges = []
+            self._first_start = None
+
+    def save(self, path):
+        # type: (Text) -> None
+        save(self.exchanges, path)
+
+
+class ReplaySession(requests.Session):
+    """
+    ``requests.Session`` answering the requests with recorded exchanges,
+    without sending them.
+
+    :param exchanges: recorded exchanges, e.g. returned by :func:`load`.
+    :param speed: ``None`` to answer at once, or the factor by which the
+                  recorded time of each response is divided before answering,
+                  1 answering at the recorded timing.
+    :param cycle: whether to answer the exchanges of a request again once
+                  they have all been used, e.g. to run the recorded queries
+                  several times. Otherwise an
+                  :class:`trino.exceptions.HttpError` is raised.
+
+    The session is thread safe and is not copied by ``copy.deepcopy``.
+    """
+
+    def __init__(self, exchanges, speed=None, cycle=False):
+        # type: (Iterable[Exchange], Optional[float], bool) -> None
+        super(ReplaySession, self).__init__()
+        if speed is not None and speed <= 0:
+            raise ValueError("speed must be positive")
+        self.exchanges = list(exchanges)
+        self.speed = speed
+        self.cycle = cycle
+        self._recorded = {}  # type: Dict[Tuple[Text, Text], List[Exchange]]
+        for exchange in self.exchanges:
+            self._recorded.setdefault(exchange.key, []).append(exchange)
+        self._lock = threading.Lock()
+        self.reset()
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        # type: (Text, Any) -> ReplaySession
+        return cls(load(path), **kwargs)
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def reset(self):
+        # type: () -> None
+        """Answer the requests from the first recorded exchanges again"""
+        with self._lock:
+            self._pending = {
+                key: deque(exchanges) for key, exchanges in self._recorded.items()
+            }  # type: Dict[Tuple[Text, Text], deque]
+
+    def request(self, method, url, *args, **kwargs):
+        key = request_key(method, url)
+        with self._lock:
+            pending = self._pending.get(key)
+            if not pending and self.cycle and key in self._recorded:
+                pending.extend(self._recorded[key])
+            if not pending:
+                raise exceptions.HttpError("no recorded response to {} {}".format(method, url))
+            exchange = pending.popleft()
+        if self.speed is not None and exchange.elapsed:
+            time.sleep(exchange.elapsed / self.speed)
+        return exchange.to_response(url)
@@ -0,0 +1,456 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+This module implements a client-side cache of query results.
+
+A :class:`ResultCache` given to a :class:`trino.dbapi.Connection` stores the
+rows of the ``SELECT`` statements executed by its cursors once they have
+all been fetched. The next execution of the same statement, with the same
+parameters, coordinator, user, catalog, schema and session properties, is
+then answered from the cache without sending any HTTP request, until the
+entry expires or is evicted: ::
+
+    >> cache = ResultCache(ttl=30, max_bytes=256 * 1024 * 1024)
+    >> conn = trino.dbapi.connect(host="coordinator", result_cache=cache)
+
+Only statements starting with ``SELECT``, ``WITH``, ``VALUES`` or ``TABLE``
+that do not call a non-deterministic function, e.g. ``random()`` or
+``now()``, are cached. Statements executed within a transaction are not.
+
+Entries are pickled, so that their size is known and the rows returned by
+a hit are not shared with other cursors. They are kept in memory by a
+:class:`MemoryBackend` or in files by a :class:`DiskBackend`.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import hashlib
+import json
+import os
+import pickle
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Text, Tuple  # NOQA for mypy types
+
+from trino import constants
+import trino.client
+import trino.logging
+
+
+try:
+    from os import replace as _replace_file
+except ImportError:
+    # Python 2, which replaces an existing file on POSIX systems only
+    from os import rename as _replace_file
+
+
+__all__ = ["DiskBackend", "MemoryBackend", "ResultCache"]
+
+
+logger = trino.logging.get_logger(__name__)
+
+_CACHEABLE_STATEMENT_RE = re.compile(r"^\(*\s*(select|with|values|table)\b")
+
+_NON_DETERMINISTIC_RE = re.compile(
+    r"\b(random|rand|uuid|shuffle|now|current_timestamp|current_time|current_date"
+    r"|current_timezone|localtime|localtimestamp)\b"
+)
+
+# rows are pickled by chunks while they are fetched
+RECORD_CHUNK_ROWS = 1000
+
+
+def normalize_sql(sql):
+    # type: (Text) -> Text
+    """
+    Return ``sql`` without comments and trailing semicolon, with its
+    whitespaces collapsed and in lower case outside of string literals and
+    quoted identifiers.
+    """
+    parts = []
+    position = 0
+    length = len(sql)
+    space = False
+    while position < length:
+        char = sql[position]
+        if char in ("'", '"'):
+            end = position + 1
+            while end < length:
+                if sql[end] == char:
+                    # a doubled quote is an escaped quote
+                    if end + 1 < length and sql[end + 1] == char:
+                        end += 2
+                        continue
+                    break
+                end += 1
+            token = sql[position:end + 1]
+            position = end + 1
+        elif sql.startswith("--", position):
+            end = sql.find("\n", position)
+            position = length if end == -1 else end + 1
+            space = True
+            continue
+        elif sql.startswith("/*", position):
+            end = sql.find("*/", position + 2)
+            position = length if end == -1 else end + 2
+            space = True
+            continue
+        elif char.isspace():
+            position += 1
+            space = True
+            continue
+        else:
+            token = char.lower()
+            position += 1
+        if space and parts:
+            parts.append(" ")
+        space = False
+        parts.append(token)
+    return "".join(parts).rstrip("; ")
+
+
+def is_cacheable(sql):
+    # type: (Text) -> bool
+    """Return whether the result of the normalized ``sql`` can be cached"""
+    return (
+        _CACHEABLE_STATEMENT_RE.match(sql) is not None
+        and _NON_DETERMINISTIC_RE.search(sql) is None
+    )
+
+
+def make_key(sql, params=None, **context):
+    # type: (Text, Optional[Any], **Any) -> Text
+    """Return the cache key of the normalized ``sql`` executed with
+    ``params`` in ``context``, e.g. the catalog and the schema"""
+    value = json.dumps([sql, params, context], sort_keys=True, default=repr)
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+class MemoryBackend(object):
+    """Keep the entries of a :class:`ResultCache` in memory. The entries
+    of a backend are reused by a new cache given the same backend."""
+
+    def __init__(self):
+        self._entries = {}  # type: Dict[Text, Tuple[bytes, float]]
+
+    def entries(self):
+        # type: () -> List[Tuple[Text, int, float]]
+        """Return the key, size and creation time of the existing entries"""
+        return [(key, len(data), created) for key, (data, created) in list(self._entries.items())]
+
+    def get(self, key):
+        # type: (Text) -> Optional[bytes]
+        entry = self._entries.get(key)
+        return entry[0] if entry is not None else None
+
+    def put(self, key, data):
+        # type: (Text, bytes) -> None
+        self._entries[key] = (data, time.time())
+
+    def delete(self, key):
+        # type: (Text) -> None
+        self._entries.pop(key, None)
+
+
+class DiskBackend(object):
+    """
+    Keep the entries of a :class:`ResultCache` in files of ``directory``.
+
+    The entries found in ``directory`` are reused by a new cache, e.g. after
+    a restart. A directory must not be shared by several caches at once.
+    """
+
+    SUFFIX = ".entry"
+
+    def __init__(self, directory):
+        # type: (Text) -> None
+        self.directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _path(self, key):
+        # type: (Text) -> Text
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def entries(self):
+        # type: () -> List[Tuple[Text, int, float]]
+        """Return the key, size and modification time of the existing entries"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.SUFFIX):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            entries.append((name[:-len(self.SUFFIX)], stat.st_size, stat.st_mtime))
+        return entries
+
+    def get(self, key):
+        # type: (Text) -> Optional[bytes]
+        try:
+            with open(self._path(key), "rb") as entry_file:
+                return entry_file.read()
+        except (IOError, OSError):
+            return None
+
+    def put(self, key, data):
+        # type: (Text, bytes) -> None
+        # write a temporary file first so that entries are never partial
+        file_descriptor, path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(file_descriptor, "wb") as entry_file:
+            entry_file.write(data)
+        _replace_file(path, self._path(key))
+
+    def delete(self, key):
+        # type: (Text) -> None
+        try:
+            os.remove(self._path(key))
+        except (IOError, OSError):
+            pass
+
+
+class ResultCache(object):
+    """
+    Cache of query results with a time to live and LRU eviction.
+
+    It is thread-safe and can be shared by several connections.
+
+    :param backend: :class:`MemoryBackend` by default, or :class:`DiskBackend`.
+    :param ttl: seconds after which an entry expires.
+    :param max_entries: maximum number of entries.
+    :param max_bytes: maximum total size of the pickled entries. The least
+                      recently used entries are evicted to respect both
+                      bounds.
+    :param max_entry_bytes: results that are larger once pickled are not
+                            cached. ``max_bytes`` by default.
+
+    ``hits``, ``misses``, ``evictions`` and ``hit_ratio`` count the lookups
+    and ``size`` and ``bytes`` measure the entries currently cached.
+    """
+
+    def __init__(
+        self,
+        backend=None,  # type: Optional[Any]
+        ttl=constants.DEFAULT_RESULT_CACHE_TTL,  # type: float
+        max_entries=constants.DEFAULT_RESULT_CACHE_MAX_ENTRIES,  # type: int
+        max_bytes=constants.DEFAULT_RESULT_CACHE_MAX_BYTES,  # type: int
+        max_entry_bytes=None,  # type: Optional[int]
+    ):
+        # type: (...) -> None
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(max_entry_bytes or max_bytes, max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._bytes = 0
+        self._index = OrderedDict()  # type: OrderedDict
+        self._lock = threading.Lock()
+        with self._lock:
+            # reuse the entries of a persistent backend, oldest first
+            for key, size, created in sorted(self.backend.entries(), key=lambda entry: entry[2]):
+                self._index[key] = (size, created + ttl)
+                self._bytes += size
+            self._evict(time.time())
+
+    @property
+    def size(self):
+        # type: () -> int
+        return len(self._index)
+
+    @property
+    def bytes(self):
+        # type: () -> int
+        return self._bytes
+
+    @property
+    def hit_ratio(self):
+        # type: () -> float
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def _remove(self, key):
+        # type: (Text) -> None
+        size, _ = self._index.pop(key)
+        self._bytes -= size
+        self.backend.delete(key)
+
+    def _evict(self, now):
+        # type: (float) -> None
+        for key, (_, expires_at) in list(self._index.items()):
+            if expires_at <= now:
+                self._remove(key)
+        while self._index and (len(self._index) > self.max_entries or self._bytes > self.max_bytes):
+            self._remove(next(iter(self._index)))
+            self.evictions += 1
+
+    def get(self, key):
+        # type: (Text) -> Optional[Tuple[Optional[List[Dict[Text, Any]]], List[Any]]]
+        """Return the columns and rows cached for ``key``, or ``None``"""
+        with self._lock:
+            data = None
+            entry = self._index.get(key)
+            if entry is not None:
+                if entry[1] > time.time():
+                    data = self.backend.get(key)
+                if data is None:
+                    self._remove(key)
+                else:
+                    # the entry becomes the most recently used
+                    self._index[key] = self._index.pop(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        columns, chunks = pickle.loads(data)
+        return columns, [row for chunk in chunks for row in pickle.loads(chunk)]
+
+    def put(self, key, columns, chunks):
+        # type: (Text, Optional[List[Dict[Text, Any]]], List[bytes]) -> bool
+        """Cache the ``columns`` and the pickled chunks of rows of a result.
+        Return whether it is cached."""
+        data = pickle.dumps((columns, chunks), pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.max_entry_bytes or self.ttl <= 0:
+            return False
+        with self._lock:
+            if key in self._index:
+                self._remove(key)
+            now = time.time()
+            self.backend.put(key, data)
+            self._index[key] = (len(data), now + self.ttl)
+            self._bytes += len(data)
+            self._evict(now)
+        return True
+
+    def clear(self):
+        # type: () -> None
+        with self._lock:
+            for key in list(self._index):
+                self._remove(key)
+
+    def record(self, key, query, result):
+        # type: (Text, trino.client.TrinoQuery, trino.client.TrinoResult) -> trino.client.TrinoResult
+        """Return a result that caches the rows of ``result`` once they are
+        all fetched, and that becomes the result of ``query``"""
+        recording = RecordingResult(query, result._rows, self, key)
+        query._result = recording
+        return recording
+
+
+class RecordingResult(trino.client.TrinoResult):
+    """
+    :class:`trino.client.TrinoResult` that caches its rows once they are all
+    iterated. Rows are pickled by chunks as they are iterated, and the
+    recording stops when they exceed the ``max_entry_bytes`` of the cache.
+    """
+
+    def __init__(self, query, rows, cache, key):
+        # type: (trino.client.TrinoQuery, Optional[List[Any]], ResultCache, Text) -> None
+        super(RecordingResult, self).__init__(query, rows)
+        self._cache = cache
+        self._key = key
+
+    def iter_pages(self, stream=False, convert=True):
+        # only a complete iteration of the result is cached, with the rows
+        # converted by the query as they are read back from the cache
+        recorder = None
+        if self._rownumber == 0 and convert:
+            recorder = _Recorder(self._cache.max_entry_bytes)
+        for rows in super(RecordingResult, self).iter_pages(stream, convert):
+            if recorder is not None:
+                if isinstance(rows, list):
+                    recorder.add(rows)
+                else:
+                    rows = recorder.iter_rows(rows)
+            yield rows
+        if recorder is not None:
+            # the rows that are still buffered may exceed the limit as well
+            chunks = recorder.finish()
+            if not recorder.too_large:
+                self._cache.put(self._key, self._query.columns, chunks)
+
+
+class _Recorder(object):
+    """Pickle rows by chunks of :data:`RECORD_CHUNK_ROWS` until they exceed
+    ``max_bytes``"""
+
+    def __init__(self, max_bytes):
+        # type: (int) -> None
+        self._max_bytes = max_bytes
+        self._chunks = []  # type: List[bytes]
+        self._bytes = 0
+        self._rows = []  # type: List[Any]
+        self.too_large = False
+
+    def add(self, rows):
+        # type: (List[Any]) -> None
+        if self.too_large:
+            return
+        self._rows.extend(rows)
+        if len(self._rows) >= RECORD_CHUNK_ROWS:
+            self._flush()
+
+    def iter_rows(self, rows):
+        # type: (Any) -> Iterator[Any]
+        for row in rows:
+            self.add([row])
+            yield row
+
+    def _flush(self):
+        # type: () -> None
+        chunk = pickle.dumps(self._rows, pickle.HIGHEST_PROTOCOL)
+        self._rows = []
+        self._chunks.append(chunk)
+        self._bytes += len(chunk)
+        if self._bytes > self._max_bytes:
+            logger.debug("result is too large to be cached")
+            self.too_large = True
+            self._chunks = []
+
+    def finish(self):
+        # type: () -> List[bytes]
+        if self._rows:
+            self._flush()
+        return self._chunks
+
+
+class CachedQuery(trino.client.TrinoQuery):
+    """:class:`trino.client.TrinoQuery` whose result is read from a
+    :class:`ResultCache` entry without sending any request"""
+
+    def __init__(self, request, sql, columns, rows):
+        # type: (trino.client.TrinoRequest, Text, Optional[List[Dict[Text, Any]]], List[Any]) -> None
+        super(CachedQuery, self).__init__(request, sql)
+        self._columns = columns
+        self._rows = rows
+        self._finished = True
+
+    @property
+    def prefetch_pages(self):
+        # type: () -> int
+        return 0
+
+    def execute(self, additional_http_headers=None):
+        # type: (Optional[Dict[Text, Text]]) -> trino.client.TrinoResult
+        self._result = trino.client.TrinoResult(self, self._rows)
+        return self._result
+
+    def cancel(self):
+        # type: () -> None
+        pass
@@ -0,0 +1,216 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+This module spools the result of a query to a local file as its pages are
+fetched, and reads it back through a memory map.
+
+Only the page being written is held in memory. The file can then be
+iterated several times, sliced or accessed by row number without keeping
+the rows in memory and without running the query again. The file layout
+is: ::
+
+    MAGIC | rows | row offsets | columns | footer
+
+Each row is encoded with :mod:`marshal`, the offsets of the rows are
+unsigned 64-bit integers and the columns are encoded as JSON. The footer
+holds the position of the offsets and of the columns, and the number of
+rows. Spool files are meant to be read by the Python version that wrote
+them and must not be read from untrusted sources.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import json
+import marshal
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Text  # NOQA for mypy types
+
+from trino import mapper
+
+
+__all__ = ["SpooledRows", "SpoolWriter", "spool"]
+
+
+MAGIC = b"TRINOSP1"
+FOOTER = struct.Struct("<QQQ8s")  # offsets position, columns position, row count, magic
+OFFSET = struct.Struct("=Q")
+
+
+class SpoolWriter(object):
+    """
+    Write rows to a spool file one page at a time.
+
+    The offsets of the rows are buffered in a temporary file and copied
+    after the rows by :meth:`finish`.
+    """
+
+    def __init__(self, path):
+        # type: (Text) -> None
+        self.path = path
+        self._file = open(path, "wb")
+        self._offsets = tempfile.TemporaryFile()
+        self._file.write(MAGIC)
+        self._position = len(MAGIC)
+        self.row_count = 0
+
+    def write_rows(self, rows):
+        # type: (Iterable[List[Any]]) -> None
+        chunks = []
+        offsets = []
+        position = self._position
+        for row in rows:
+            data = marshal.dumps(row)
+            offsets.append(position)
+            chunks.append(data)
+            position += len(data)
+        self._file.write(b"".join(chunks))
+        self._offsets.write(struct.pack("={}Q".format(len(offsets)), *offsets))
+        self.row_count += len(offsets)
+        self._position = position
+
+    def finish(self, columns):
+        # type: (Optional[List[Dict[Text, Any]]]) -> None
+        """Append the offsets, the columns and the footer, and close the
+        file"""
+        offsets_position = self._position
+        self._offsets.seek(0)
+        shutil.copyfileobj(self._offsets, self._file)
+        columns_position = offsets_position + self.row_count * OFFSET.size
+        self._file.write(json.dumps(columns).encode("utf-8"))
+        self._file.write(FOOTER.pack(offsets_position, columns_position, self.row_count, MAGIC))
+        self.close()
+
+    def close(self):
+        # type: () -> None
+        self._offsets.close()
+        self._file.close()
+
+
+class SpooledRows(object):
+    """
+    Rows of a spool file, read through a memory map.
+
+    It supports ``len()``, iteration, indexing by row number and slicing.
+    Rows are decoded when they are accessed.
+
+    :param path: path of the spool file.
+    :param experimental_python_types: convert the values into Python types
+                                      with a :class:`trino.mapper.RowMapper`.
+    :param delete: remove the file when this object is closed.
+    """
+
+    def __init__(self, path, experimental_python_types=False, delete=False):
+        # type: (Text, bool, bool) -> None
+        self.path = path
+        self._delete = delete
+        with open(path, "rb") as spool_file:
+            self._mmap = mmap.mmap(spool_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC or len(self._mmap) < len(MAGIC) + FOOTER.size:
+            self._mmap.close()
+            raise ValueError("{} is not a spool file".format(path))
+        footer_position = len(self._mmap) - FOOTER.size
+        offsets_position, columns_position, row_count, magic = FOOTER.unpack_from(
+            self._mmap, footer_position
+        )
+        if magic != MAGIC:
+            self._mmap.close()
+            raise ValueError("{} is an incomplete spool file".format(path))
+        self.columns = json.loads(
+            self._mmap[columns_position:footer_position].decode("utf-8")
+        )  # type: Optional[List[Dict[Text, Any]]]
+        self._row_count = row_count
+        self._rows_end = offsets_position
+        self._closed = False
+        self._row_mapper = None  # type: Optional[mapper.RowMapper]
+        if experimental_python_types:
+            self._row_mapper = mapper.create_row_mapper(self.columns or [])
+
+    def __len__(self):
+        return self._row_count
+
+    def _offset(self, index):
+        # type: (int) -> int
+        # the offsets of the rows follow the rows, and the end of the last
+        # row is the position of the offsets
+        if index < self._row_count:
+            return OFFSET.unpack_from(self._mmap, self._rows_end + index * OFFSET.size)[0]
+        return self._rows_end
+
+    def _read(self, index):
+        # type: (int) -> List[Any]
+        row = marshal.loads(self._mmap[self._offset(index):self._offset(index + 1)])
+        if self._row_mapper is not None:
+            row = self._row_mapper.map_row(row)
+        return row
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._read(position) for position in range(*index.indices(self._row_count))]
+        if index < 0:
+            index += self._row_count
+        if not 0 <= index < self._row_count:
+            raise IndexError("row index out of range")
+        return self._read(index)
+
+    def __iter__(self):
+        # type: () -> Iterator[List[Any]]
+        for index in range(self._row_count):
+            yield self._read(index)
+
+    def close(self):
+        # type: () -> None
+        if self._closed:
+            return
+        self._closed = True
+        self._mmap.close()
+        if self._delete:
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def spool(query, pages, path=None, experimental_python_types=False):
+    # type: (Any, Iterable[List[List[Any]]], Optional[Text], bool) -> SpooledRows
+    """
+    Write the rows of ``pages`` to a spool file and return its
+    :class:`SpooledRows`.
+
+    :param query: :class:`trino.client.TrinoQuery` that returns the pages.
+    :param pages: iterable on the lists of rows of each page.
+    :param path: path of the spool file. By default a temporary file is
+                 created and removed when the :class:`SpooledRows` is
+                 closed.
+    """
+    delete = path is None
+    if path is None:
+        file_descriptor, path = tempfile.mkstemp(suffix=".trino-spool")
+        os.close(file_descriptor)
+    writer = SpoolWriter(path)
+    try:
+        for rows in pages:
+            writer.write_rows(rows)
+    except Exception:
+        writer.close()
+        os.remove(path)
+        raise
+    writer.finish(query.columns)
+    return SpooledRows(path, experimental_python_types, delete)
@@ -0,0 +1,211 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+
+This module configures the HTTP transport of the requests sent to the
+coordinator: the pools of keep-alive connections, the options of their
+sockets and the compression of the responses.
+
+A :class:`TransportConfig` is applied to a ``requests.Session`` by mounting a
+:class:`TransportAdapter` for ``http://`` and ``https://`` URLs: ::
+
+    >> transport = TransportConfig(pool_maxsize=32, compression=["zstd", "gzip"])
+    >> conn = trino.dbapi.connect(host="coordinator", transport=transport)
+
+Responses compressed with an encoding that has a decompressor are
+decompressed while they are read, which also works with ``stream_rows``.
+``gzip`` and ``deflate`` are decompressed by ``urllib3``.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import socket
+from typing import Any, Callable, Dict, List, Optional, Text, Tuple  # NOQA for mypy types
+
+import requests
+import requests.adapters
+from urllib3.connection import HTTPConnection
+
+from trino import constants
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+__all__ = ["TransportAdapter", "TransportConfig"]
+
+
+def get_keepalive_socket_options(idle=60, interval=10, count=6):
+    # type: (int, int, int) -> List[Tuple[int, int, int]]
+    """Return the socket options enabling TCP keep-alive probes after
+    ``idle`` seconds, on the platforms that support them"""
+    options = [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+    for name, value in (("TCP_KEEPIDLE", idle), ("TCP_KEEPINTVL", interval), ("TCP_KEEPCNT", count)):
+        if hasattr(socket, name):
+            options.append((socket.IPPROTO_TCP, getattr(socket, name), value))
+    return options
+
+
+def _zstd_decompressor():
+    if zstandard is None:
+        raise RuntimeError("unable to import zstandard")
+    return zstandard.ZstdDecompressor().decompressobj()
+
+
+# functions returning an object with a ``decompress(data)`` method, and
+# optionally a ``flush()`` method, such as ``zlib.decompressobj()``
+DECOMPRESSORS = {
+    "zstd": _zstd_decompressor,
+}  # type: Dict[Text, Callable[[], Any]]
+
+
+class DecompressingReader(object):
+    """Wrap the ``urllib3`` response of a compressed body to decompress it
+    while it is read by ``requests``"""
+
+    def __init__(self, raw, decompressor):
+        self._raw = raw
+        self._decompressor = decompressor
+
+    def stream(self, amt=2 ** 16, decode_content=None):
+        for chunk in self._raw.stream(amt, decode_content=False):
+            data = self._decompressor.decompress(chunk)
+            if data:
+                yield data
+        flush = getattr(self._decompressor, "flush", None)
+        if flush is not None:
+            data = flush()
+            if data:
+                yield data
+
+    def read(self, amt=None, decode_content=None, cache_content=False):
+        # decompress the whole body, ``requests`` reads with stream()
+        return b"".join(self.stream())
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+class TransportAdapter(requests.adapters.HTTPAdapter):
+    """
+    ``HTTPAdapter`` whose connections are created with ``socket_options``
+    and whose responses are decompressed by ``decompressors``, a dict
+    mapping a ``Content-Encoding`` to a function returning a decompressor.
+    """
+
+    # pickled and copied attributes, e.g. when a request is copied by
+    # ``copy.deepcopy`` for a prepared statement
+    __attrs__ = requests.adapters.HTTPAdapter.__attrs__ + ["socket_options", "decompressors"]
+
+    def __init__(self, socket_options=None, decompressors=None, **kwargs):
+        # set before HTTPAdapter.__init__ calls init_poolmanager()
+        self.socket_options = socket_options
+        self.decompressors = decompressors or {}
+        super(TransportAdapter, self).__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.socket_options is not None:
+            kwargs["socket_options"] = self.socket_options
+        super(TransportAdapter, self).init_poolmanager(*args, **kwargs)
+
+    def build_response(self, req, resp):
+        encoding = (resp.headers.get("Content-Encoding") or "").strip().lower()
+        create_decompressor = self.decompressors.get(encoding)
+        if create_decompressor is None:
+            return super(TransportAdapter, self).build_response(req, resp)
+        # keep urllib3 from decoding the body
+        del resp.headers["Content-Encoding"]
+        response = super(TransportAdapter, self).build_response(req, resp)
+        response.headers["Content-Encoding"] = encoding
+        response.raw = DecompressingReader(resp, create_decompressor())
+        return response
+
+
+class TransportConfig(object):
+    """
+    Configuration of the HTTP transport of a ``requests.Session``.
+
+    :param pool_connections: number of hosts whose connections are kept.
+    :param pool_maxsize: maximum number of idle connections kept per host.
+                         Set it to the number of threads that send requests
+                         at once.
+    :param pool_block: wait for a connection to be released instead of
+                       opening one more than ``pool_maxsize`` connections.
+    :param socket_options: options of the sockets, as a list of
+                           ``(level, option, value)``. The default disables
+                           Nagle's algorithm and enables TCP keep-alive
+                           probes so that idle connections are kept open
+                           through firewalls and NAT.
+    :param compression: content encodings to accept, in order of
+                        preference, e.g. ``["zstd", "gzip"]``. ``None``
+                        keeps the ``Accept-Encoding`` header of ``requests``
+                        and ``[]`` asks for uncompressed responses.
+    :param decompressors: functions creating a decompressor for a content
+                          encoding, which override :data:`DECOMPRESSORS`
+                          for the encodings of ``compression``. A
+                          decompressor has a ``decompress(data)`` method and
+                          optionally a ``flush()`` method.
+    """
+
+    def __init__(
+        self,
+        pool_connections=constants.DEFAULT_HTTP_POOL_CONNECTIONS,  # type: int
+        pool_maxsize=constants.DEFAULT_HTTP_POOL_MAXSIZE,  # type: int
+        pool_block=False,  # type: bool
+        socket_options=None,  # type: Optional[List[Tuple[int, int, int]]]
+        compression=None,  # type: Optional[List[Text]]
+        decompressors=None,  # type: Optional[Dict[Text, Callable[[], Any]]]
+    ):
+        # type: (...) -> None
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        if socket_options is None:
+            socket_options = HTTPConnection.default_socket_options + get_keepalive_socket_options()
+        self.socket_options = socket_options
+        self.compression = compression
+        if compression is None:
+            self.decompressors = dict(decompressors or {})
+        else:
+            # only decompress the encodings that are accepted
+            self.decompressors = {
+                encoding: create_decompressor
+                for encoding, create_decompressor in dict(DECOMPRESSORS, **(decompressors or {})).items()
+                if encoding in compression
+            }
+        if "zstd" in self.decompressors:
+            # raise early when zstandard is missing
+            self.decompressors["zstd"]()
+
+    def create_adapter(self):
+        # type: () -> TransportAdapter
+        return TransportAdapter(
+            socket_options=self.socket_options,
+            decompressors=self.decompressors,
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block,
+        )
+
+    def configure(self, http_session):
+        # type: (requests.Session) -> requests.Session
+        """Mount an adapter on ``http_session`` and set the
+        ``Accept-Encoding`` header of its requests"""
+        adapter = self.create_adapter()
+        http_session.mount("http://", adapter)
+        http_session.mount("https://", adapter)
+        if self.compression is not None:
+            http_session.headers["Accept-Encoding"] = ", ".join(self.compression) or "identity"
+        return http_session